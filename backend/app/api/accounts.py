@@ -1,14 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy import text
-from app.db.database import engine
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import get_db
 from app.models.schemas import AccountResponse, AccountCreateRequest, AccountUpdateRequest
 from app.auth import get_current_user
+from app.cache import commit_ledger_changes, mark_ledger_changed
 
 router = APIRouter(prefix="/api/accounts", tags=["accounts"])
 
 
 @router.get("", response_model=list[AccountResponse])
-async def get_all_accounts(current_user: dict = Depends(get_current_user)):
+async def get_all_accounts(current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get all accounts for the current user."""
     try:
         query = text("""
@@ -18,24 +20,23 @@ async def get_all_accounts(current_user: dict = Depends(get_current_user)):
             ORDER BY account_name
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"user_id": current_user["user_id"]})
-            accounts = []
-            for row in result:
-                accounts.append(AccountResponse(
-                    account_id=row[0],
-                    account_name=row[1],
-                    account_type=row[2],
-                    institution=row[3],
-                    currency_code=row[4]
-                ))
-            return accounts
+        result = await conn.execute(query, {"user_id": current_user["user_id"]})
+        accounts = []
+        for row in result:
+            accounts.append(AccountResponse(
+                account_id=row[0],
+                account_name=row[1],
+                account_type=row[2],
+                institution=row[3],
+                currency_code=row[4]
+            ))
+        return accounts
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("", response_model=AccountResponse)
-async def create_account(account: AccountCreateRequest, current_user: dict = Depends(get_current_user)):
+async def create_account(account: AccountCreateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Create a new account for the current user."""
     try:
         query = text("""
@@ -44,30 +45,30 @@ async def create_account(account: AccountCreateRequest, current_user: dict = Dep
             RETURNING account_id, account_name, account_type, institution, currency_code
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {
-                "account_name": account.account_name,
-                "account_type": account.account_type,
-                "institution": account.institution,
-                "currency_code": account.currency_code.upper(),
-                "user_id": current_user["user_id"]
-            })
-            conn.commit()
-            row = result.fetchone()
-            
-            return AccountResponse(
-                account_id=row[0],
-                account_name=row[1],
-                account_type=row[2],
-                institution=row[3],
-                currency_code=row[4]
-            )
+        result = await conn.execute(query, {
+            "account_name": account.account_name,
+            "account_type": account.account_type,
+            "institution": account.institution,
+            "currency_code": account.currency_code.upper(),
+            "user_id": current_user["user_id"]
+        })
+        mark_ledger_changed(conn, [current_user["user_id"]])
+        await commit_ledger_changes(conn)
+        row = result.fetchone()
+        
+        return AccountResponse(
+            account_id=row[0],
+            account_name=row[1],
+            account_type=row[2],
+            institution=row[3],
+            currency_code=row[4]
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{account_id}", response_model=AccountResponse)
-async def update_account(account_id: int, account: AccountUpdateRequest, current_user: dict = Depends(get_current_user)):
+async def update_account(account_id: int, account: AccountUpdateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Update an existing account (only if owned by current user)."""
     try:
         # Build dynamic update query
@@ -100,21 +101,22 @@ async def update_account(account_id: int, account: AccountUpdateRequest, current
             RETURNING account_id, account_name, account_type, institution, currency_code
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, params)
-            conn.commit()
-            row = result.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"Account with ID {account_id} not found or you don't have permission")
-            
-            return AccountResponse(
-                account_id=row[0],
-                account_name=row[1],
-                account_type=row[2],
-                institution=row[3],
-                currency_code=row[4]
-            )
+        result = await conn.execute(query, params)
+        # Names, types and currencies appear in cached balances/metrics responses
+        mark_ledger_changed(conn, [current_user["user_id"]])
+        await commit_ledger_changes(conn)
+        row = result.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Account with ID {account_id} not found or you don't have permission")
+        
+        return AccountResponse(
+            account_id=row[0],
+            account_name=row[1],
+            account_type=row[2],
+            institution=row[3],
+            currency_code=row[4]
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -122,37 +124,37 @@ async def update_account(account_id: int, account: AccountUpdateRequest, current
 
 
 @router.delete("/{account_id}")
-async def delete_account(account_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_account(account_id: int, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Delete an account (only if owned by current user)."""
     try:
-        with engine.connect() as conn:
-            # Check if account exists and belongs to user
-            check_query = text("""
-                SELECT account_id FROM accounts.list 
-                WHERE account_id = :account_id AND user_id = :user_id
-            """)
-            result = conn.execute(check_query, {
-                "account_id": account_id,
-                "user_id": current_user["user_id"]
-            })
-            if not result.fetchone():
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Account with ID {account_id} not found or you don't have permission"
-                )
-            
-            # Delete the account (cascade will handle related transactions)
-            delete_query = text("""
-                DELETE FROM accounts.list 
-                WHERE account_id = :account_id AND user_id = :user_id
-            """)
-            conn.execute(delete_query, {
-                "account_id": account_id,
-                "user_id": current_user["user_id"]
-            })
-            conn.commit()
-            
-            return {"message": f"Account {account_id} deleted successfully"}
+        # Check if account exists and belongs to user
+        check_query = text("""
+            SELECT account_id FROM accounts.list 
+            WHERE account_id = :account_id AND user_id = :user_id
+        """)
+        result = await conn.execute(check_query, {
+            "account_id": account_id,
+            "user_id": current_user["user_id"]
+        })
+        if not result.fetchone():
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Account with ID {account_id} not found or you don't have permission"
+            )
+        
+        # Delete the account (cascade will handle related transactions)
+        delete_query = text("""
+            DELETE FROM accounts.list 
+            WHERE account_id = :account_id AND user_id = :user_id
+        """)
+        await conn.execute(delete_query, {
+            "account_id": account_id,
+            "user_id": current_user["user_id"]
+        })
+        mark_ledger_changed(conn, [current_user["user_id"]])
+        await commit_ledger_changes(conn)
+        
+        return {"message": f"Account {account_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
@@ -6,6 +6,7 @@ import httpx
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
 from app.auth import get_current_user
+from app.http_client import get_http_client
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
@@ -56,37 +57,37 @@ async def signup(request: SignUpRequest):
         )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/signup",
-                json={
-                    "email": request.email,
-                    "password": request.password
-                },
-                headers={
-                    "apikey": SUPABASE_ANON_KEY,
-                    "Content-Type": "application/json",
-                    "X-Client-Info": "finance-dashboard"
-                }
-            )
+        client = get_http_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/auth/v1/signup",
+            json={
+                "email": request.email,
+                "password": request.password
+            },
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Content-Type": "application/json",
+                "X-Client-Info": "finance-dashboard"
+            }
+        )
 
-            if response.status_code != 200:
-                error_data = response.json() if response.content else {}
-                error_msg = error_data.get("error_description") or error_data.get("message") or error_data.get("error") or "Signup failed"
-                
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=error_msg
-                )
+        if response.status_code != 200:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description") or error_data.get("message") or error_data.get("error") or "Signup failed"
+            
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=error_msg
+            )
 
-            data = response.json()
+        data = response.json()
 
-            return AuthResponse(
-                access_token=data.get("access_token", ""),
-                refresh_token=data.get("refresh_token"),
-                token_type="bearer",
-                user=data.get("user", {})
-            )
+        return AuthResponse(
+            access_token=data.get("access_token", ""),
+            refresh_token=data.get("refresh_token"),
+            token_type="bearer",
+            user=data.get("user", {})
+        )
     except HTTPException:
         raise
     except httpx.RequestError as e:
@@ -107,43 +108,43 @@ async def signin(request: SignInRequest):
         )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/token?grant_type=password",
-                json={
-                    "email": request.email,
-                    "password": request.password
-                },
-                headers={
-                    "apikey": SUPABASE_ANON_KEY,
-                    "Content-Type": "application/json",
-                    "X-Client-Info": "finance-dashboard"
-                }
-            )
+        client = get_http_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/auth/v1/token?grant_type=password",
+            json={
+                "email": request.email,
+                "password": request.password
+            },
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Content-Type": "application/json",
+                "X-Client-Info": "finance-dashboard"
+            }
+        )
 
-            if response.status_code != 200:
-                error_data = response.json() if response.content else {}
-                error_msg = error_data.get("error_description") or error_data.get("message") or error_data.get("error") or "Invalid email or password"
-                
-                if "email" in error_msg.lower() and ("confirm" in error_msg.lower() or "verify" in error_msg.lower()):
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Please verify your email address before signing in. Check your inbox for a verification email."
-                    )
-                
+        if response.status_code != 200:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description") or error_data.get("message") or error_data.get("error") or "Invalid email or password"
+            
+            if "email" in error_msg.lower() and ("confirm" in error_msg.lower() or "verify" in error_msg.lower()):
                 raise HTTPException(
                     status_code=401,
-                    detail=error_msg
+                    detail="Please verify your email address before signing in. Check your inbox for a verification email."
                 )
+            
+            raise HTTPException(
+                status_code=401,
+                detail=error_msg
+            )
 
-            data = response.json()
+        data = response.json()
 
-            return AuthResponse(
-                access_token=data.get("access_token", ""),
-                refresh_token=data.get("refresh_token"),
-                token_type="bearer",
-                user=data.get("user", {})
-            )
+        return AuthResponse(
+            access_token=data.get("access_token", ""),
+            refresh_token=data.get("refresh_token"),
+            token_type="bearer",
+            user=data.get("user", {})
+        )
     except HTTPException:
         raise
     except httpx.RequestError as e:
@@ -175,27 +176,27 @@ async def reset_password(request: ResetPasswordRequest):
         )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/recover",
-                json={
-                    "email": request.email
-                },
-                headers={
-                    "apikey": SUPABASE_ANON_KEY,
-                    "Content-Type": "application/json"
-                }
-            )
+        client = get_http_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/auth/v1/recover",
+            json={
+                "email": request.email
+            },
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Content-Type": "application/json"
+            }
+        )
 
-            if response.status_code not in [200, 201]:
-                error_data = response.json() if response.content else {}
-                error_msg = error_data.get("error_description") or error_data.get("message") or "Failed to send reset email"
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=error_msg
-                )
+        if response.status_code not in [200, 201]:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description") or error_data.get("message") or "Failed to send reset email"
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=error_msg
+            )
 
-            return {"message": "Password reset email sent"}
+        return {"message": "Password reset email sent"}
     except HTTPException:
         raise
     except httpx.RequestError as e:
@@ -216,34 +217,34 @@ async def confirm_reset_password(request: ConfirmResetPasswordRequest):
         )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/user",
-                json={
-                    "password": request.new_password
-                },
-                headers={
-                    "apikey": SUPABASE_ANON_KEY,
-                    "Authorization": f"Bearer {request.token}",
-                    "Content-Type": "application/json"
-                }
-            )
+        client = get_http_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/auth/v1/user",
+            json={
+                "password": request.new_password
+            },
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {request.token}",
+                "Content-Type": "application/json"
+            }
+        )
 
-            if response.status_code != 200:
-                error_data = response.json() if response.content else {}
-                error_msg = error_data.get("error_description") or error_data.get("message") or "Failed to reset password"
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=error_msg
-                )
+        if response.status_code != 200:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description") or error_data.get("message") or "Failed to reset password"
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=error_msg
+            )
 
-            data = response.json()
+        data = response.json()
 
-            return {
-                "message": "Password reset successfully",
-                "access_token": data.get("access_token", ""),
-                "user": data.get("user", {})
-            }
+        return {
+            "message": "Password reset successfully",
+            "access_token": data.get("access_token", ""),
+            "user": data.get("user", {})
+        }
     except HTTPException:
         raise
     except httpx.RequestError as e:
@@ -268,33 +269,33 @@ async def refresh_token(request: dict):
         raise HTTPException(status_code=400, detail="refresh_token is required")
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/token?grant_type=refresh_token",
-                json={
-                    "refresh_token": refresh_token_value
-                },
-                headers={
-                    "apikey": SUPABASE_ANON_KEY,
-                    "Content-Type": "application/json"
-                }
-            )
+        client = get_http_client()
+        response = await client.post(
+            f"{SUPABASE_URL}/auth/v1/token?grant_type=refresh_token",
+            json={
+                "refresh_token": refresh_token_value
+            },
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Content-Type": "application/json"
+            }
+        )
 
-            if response.status_code != 200:
-                error_data = response.json() if response.content else {}
-                error_msg = error_data.get("error_description") or error_data.get("message") or "Token refresh failed"
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=error_msg
-                )
+        if response.status_code != 200:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description") or error_data.get("message") or "Token refresh failed"
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=error_msg
+            )
 
-            data = response.json()
+        data = response.json()
 
-            return {
-                "access_token": data.get("access_token", ""),
-                "refresh_token": data.get("refresh_token"),
-                "token_type": "bearer"
-            }
+        return {
+            "access_token": data.get("access_token", ""),
+            "refresh_token": data.get("refresh_token"),
+            "token_type": "bearer"
+        }
     except HTTPException:
         raise
     except httpx.RequestError as e:
@@ -1,116 +1,115 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+import numpy as np
 import pandas as pd
 from typing import Optional
 from datetime import date as date_class
-from app.db.database import engine
-from app.models.schemas import BalanceResponse, BalanceHistoryResponse
+from app.db.database import get_db, read_sql
+from app.db.balance_snapshots import AS_OF_BALANCES_SQL
+from app.db.rate_index import ensure_rate_index, lookup_rates
+from app.models.schemas import BalanceResponse, BalanceHistoryResponse, BalanceHistorySeriesResponse
 from app.auth import get_current_user
+from app.cache import response_cache, response_cache_key
 
 router = APIRouter(prefix="/api/balances", tags=["balances"])
 
 
-def load_balances_from_transactions(target_currency: str = 'EUR', balance_date: Optional[date_class] = None, user_id: Optional[str] = None):
+def parse_currency_list(currencies: str) -> list[str]:
+    """Parse a comma-separated currency list ('EUR,GBP,USD') into unique upper-case codes."""
+    parsed = []
+    for code in currencies.split(','):
+        code = code.strip().upper()
+        if code and code not in parsed:
+            parsed.append(code)
+    return parsed
+
+
+def convert_balance_currencies(df: pd.DataFrame, target_currencies=('EUR',)) -> pd.DataFrame:
+    """
+    Adds 'balance_eur' (amount converted at the EUR rate in effect on balance_date) and a
+    'balance_<target>' column per target currency, using the shared as-of exchange rate index.
+    target_currencies may be a single code or a list of codes. Missing rates fall back to 1.0.
+    """
+    if isinstance(target_currencies, str):
+        target_currencies = [target_currencies]
+    
+    df['amount'] = df['amount'].astype(float)
+    
+    rate_to_eur = np.ones(len(df))
+    for currency_code in df['currency_code'].unique():
+        if currency_code == 'EUR':
+            continue
+        mask = (df['currency_code'] == currency_code).to_numpy()
+        rates = lookup_rates('EUR', currency_code, df.loc[mask, 'balance_date'])
+        rate_to_eur[mask] = np.where(np.isnan(rates), 1.0, 1.0 / rates)
+    
+    df['balance_eur'] = df['amount'] * rate_to_eur
+    
+    for target_currency in target_currencies:
+        if target_currency.upper() == 'EUR':
+            continue
+        dynamic_col = f"balance_{target_currency.lower()}"
+        rates = lookup_rates('EUR', target_currency, df['balance_date'])
+        df[dynamic_col] = df['balance_eur'] * np.nan_to_num(rates, nan=1.0)
+    
+    return df
+
+
+async def load_balances_from_transactions(conn: AsyncConnection, target_currency: str = 'EUR', balance_date: Optional[date_class] = None, user_id: Optional[str] = None):
     """
     Loads balances by aggregating transactions, converts non-EUR holdings to a standard 'balance_eur',
     and then converts 'balance_eur' to the selected target currency.
     Filters by user_id if provided.
-    """
-    date_filter = ""
-    if balance_date:
-        date_filter = f"AND t.transaction_date <= '{balance_date}'"
-    
-    user_filter_transactions = ""
-    if user_id:
-        user_filter_transactions = f"AND t.user_id = '{user_id}'"
     
+    Current balances (no balance_date) are read from the maintained balances.current store;
+    historical balances come from the latest end-of-day snapshot plus any later ledger rows.
+    """
     user_filter_accounts = ""
     if user_id:
         user_filter_accounts = f"AND a.user_id = '{user_id}'"
     
+    params = {}
+    if balance_date:
+        account_balances = f"{AS_OF_BALANCES_SQL} {user_filter_accounts}"
+        params["as_of_date"] = balance_date
+    else:
+        account_balances = """
+        SELECT c.account_id, c.amount, c.balance_date
+        FROM balances.current c
+        WHERE c.balance_date IS NOT NULL
+        """
+    
     query = f"""
-    WITH account_balances AS (
-        SELECT
-            t.account_id,
-            SUM(t.amount) as amount,
-            MAX(t.transaction_date) as balance_date
-        FROM transactions.ledger t
-        WHERE 1=1 {date_filter} {user_filter_transactions}
-        GROUP BY t.account_id
-    )
+    WITH account_balances AS ({account_balances})
     SELECT
         ab.balance_date,
         a.account_name,
         a.account_type,
         a.institution,
         a.currency_code,
-        ab.amount,
-        COALESCE(r_te.rate_to_eur, 1.0) AS rate_to_eur
+        ab.amount
     FROM account_balances ab
     JOIN accounts.list a ON ab.account_id = a.account_id
-    LEFT JOIN LATERAL (
-        SELECT 1.0 / r_te.rate AS rate_to_eur
-        FROM exchange_rates.rate_history r_te
-        WHERE r_te.base_currency = 'EUR' 
-          AND r_te.target_currency = a.currency_code 
-          AND r_te.rate_date <= ab.balance_date
-        ORDER BY r_te.rate_date DESC
-        LIMIT 1
-    ) r_te ON a.currency_code != 'EUR'
     WHERE 1=1 {user_filter_accounts}
     ORDER BY ab.balance_date DESC, a.account_id;
     """
     
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn)
-        
-        if df.empty:
-            return df
-        
-        # Calculate EUR equivalent
-        df['balance_eur'] = df['amount'] * df['rate_to_eur']
-        
-        # Convert to target currency
-        dynamic_col = f"balance_{target_currency.lower()}"
-        df[dynamic_col] = df['balance_eur']
-        
-        if target_currency.upper() != 'EUR':
-            rate_query = text("""
-                SELECT rate_date, rate
-                FROM exchange_rates.rate_history
-                WHERE base_currency = 'EUR' AND target_currency = :target_currency
-                ORDER BY rate_date DESC
-            """)
-            
-            df_rates = pd.read_sql(rate_query, conn, params={"target_currency": target_currency.upper()})
-            if not df_rates.empty:
-                df_rates['rate_date'] = pd.to_datetime(df_rates['rate_date']).dt.date
-                
-                df['balance_date_dt'] = pd.to_datetime(df['balance_date'])
-                df_rates['rate_date_dt'] = pd.to_datetime(df_rates['rate_date'])
-                
-                df = df.sort_values('balance_date_dt')
-                df_rates = df_rates.sort_values('rate_date_dt')
-                
-                df = pd.merge_asof(
-                    df,
-                    df_rates[['rate_date_dt', 'rate']],
-                    left_on='balance_date_dt',
-                    right_on='rate_date_dt',
-                    direction='backward'
-                )
-                
-                df[dynamic_col] = df['balance_eur'] * df['rate'].fillna(1.0)
-                df = df.drop(columns=['balance_date_dt', 'rate_date_dt', 'rate'])
-        
+    df = await read_sql(conn, text(query), params)
+    
+    if df.empty:
         return df
+    
+    await ensure_rate_index(conn)
+    return convert_balance_currencies(df, target_currency)
 
 
 @router.get("", response_model=list[BalanceResponse])
 async def get_balances(
     currency: str = 'EUR',
     date: Optional[str] = Query(None, description="Date in format YYYY-MM-DD"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Get all account balances for the current user, aggregated from transactions."""
     try:
@@ -121,13 +120,20 @@ async def get_balances(
             except ValueError:
                 raise HTTPException(status_code=422, detail="Invalid date format. Use YYYY-MM-DD")
         
-        df = load_balances_from_transactions(
+        cache_key = response_cache_key("balances", current_user["user_id"], currency.upper(), parsed_date)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        df = await load_balances_from_transactions(
+            conn,
             target_currency=currency, 
             balance_date=parsed_date,
             user_id=current_user["user_id"]
         )
         
         if df.empty:
+            response_cache.set(cache_key, [])
             return []
         
         records = df.to_dict('records')
@@ -150,7 +156,218 @@ async def get_balances(
             
             results.append(BalanceResponse(**result))
         
+        response_cache.set(cache_key, results)
         return results
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+HISTORY_RESOLUTIONS = {'day': None, 'week': 'W', 'month': 'M'}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling: pick `threshold` indices of the series that
+    preserve its visual shape. The first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold <= 2:
+        return np.array([0, n - 1][:threshold])
+    
+    x = x.astype(float)
+    y = y.astype(float)
+    bucket_size = (n - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        
+        # Triangle between the previously selected point, each candidate and the next bucket's average
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected.append(previous)
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def downsample_balance_history(df: pd.DataFrame, resolution: str = 'day', max_points: Optional[int] = None) -> pd.DataFrame:
+    """
+    Reduce per-account history rows (sorted by account and date):
+    - resolution 'week'/'month' keeps the last balance of each period (end-of-period balance)
+    - max_points caps each account's series using LTTB on the native-currency amount
+    """
+    period = HISTORY_RESOLUTIONS[resolution]
+    if period:
+        periods = pd.to_datetime(df['balance_date']).dt.to_period(period)
+        df = df[~pd.DataFrame({'account_id': df['account_id'], 'period': periods}).duplicated(keep='last')]
+    
+    if max_points:
+        keep = []
+        for _, account_df in df.groupby('account_id', sort=False):
+            x = pd.to_datetime(account_df['balance_date']).to_numpy(dtype='datetime64[D]').astype(np.int64)
+            y = account_df['amount'].astype(float).to_numpy()
+            keep.extend(account_df.index[lttb_indices(x, y, max_points)])
+        df = df.loc[keep]
+    
+    return df
+
+
+async def load_balance_history(
+    conn: AsyncConnection,
+    user_id: str,
+    account_names: Optional[list[str]] = None,
+    target_currencies=('EUR',),
+    resolution: str = 'day',
+    max_points: Optional[int] = None,
+    end_date: Optional[date_class] = None
+) -> pd.DataFrame:
+    """
+    Loads end-of-day running balances for all of a user's accounts (or only the named ones)
+    in one query: ledger rows are summed per account and day, then accumulated with a window
+    partitioned by account. One row per account per day with activity, ordered by account and date.
+    
+    Bucketing/downsampling (see downsample_balance_history) runs before currency conversion,
+    so payload size and conversion work stay bounded regardless of history length.
+    """
+    account_filter = ""
+    params = {"user_id": user_id}
+    if account_names:
+        account_filter = "AND a.account_name = ANY(:account_names)"
+        params["account_names"] = list(account_names)
+    
+    date_filter = ""
+    if end_date:
+        date_filter = "AND t.transaction_date <= :end_date"
+        params["end_date"] = end_date
+    
+    query = text(f"""
+    WITH daily_amounts AS (
+        SELECT
+            t.account_id,
+            t.transaction_date,
+            SUM(t.amount) AS day_amount
+        FROM transactions.ledger t
+        JOIN accounts.list a ON t.account_id = a.account_id
+        WHERE t.user_id = :user_id
+          AND a.user_id = :user_id
+          {account_filter}
+          {date_filter}
+        GROUP BY t.account_id, t.transaction_date
+    )
+    SELECT
+        d.transaction_date AS balance_date,
+        a.account_id,
+        a.account_name,
+        a.account_type,
+        a.institution,
+        a.currency_code,
+        SUM(d.day_amount) OVER (
+            PARTITION BY d.account_id
+            ORDER BY d.transaction_date
+        ) AS amount
+    FROM daily_amounts d
+    JOIN accounts.list a ON d.account_id = a.account_id
+    ORDER BY a.account_name, a.account_id, d.transaction_date;
+    """)
+    
+    df = await read_sql(conn, query, params)
+    
+    if df.empty:
+        return df
+    
+    df = downsample_balance_history(df, resolution=resolution, max_points=max_points)
+    
+    await ensure_rate_index(conn)
+    return convert_balance_currencies(df.reset_index(drop=True), target_currencies)
+
+
+def history_records_to_responses(df: pd.DataFrame, target_currencies: list[str]) -> list[BalanceHistoryResponse]:
+    """Convert balance history rows into response objects, including each requested currency column."""
+    results = []
+    for record in df.to_dict('records'):
+        result = {
+            "balance_date": record['balance_date'],
+            "account_name": record['account_name'],
+            "account_type": record['account_type'],
+            "institution": record['institution'],
+            "currency_code": record['currency_code'],
+            "amount": float(record['amount']),
+            "balance_eur": float(record['balance_eur']),
+        }
+        
+        for target_currency in target_currencies:
+            balance_col = f"balance_{target_currency.lower()}"
+            if target_currency != 'EUR' and balance_col in record:
+                result[balance_col] = float(record[balance_col])
+        
+        results.append(BalanceHistoryResponse(**result))
+    return results
+
+
+@router.get("/history", response_model=list[BalanceHistorySeriesResponse])
+async def get_balance_histories(
+    accounts: Optional[list[str]] = Query(None, description="Account names to include (repeat the parameter). Defaults to all accounts"),
+    currency: str = Query('EUR', description="Target currency for conversion"),
+    currencies: Optional[str] = Query(None, description="Comma-separated target currencies (e.g. EUR,GBP,USD). Overrides currency"),
+    resolution: str = Query('day', description="Bucket size: day, week or month (end-of-period balance)"),
+    max_points: Optional[int] = Query(None, ge=2, description="Maximum points per account, downsampled with LTTB"),
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
+):
+    """Get the balance history of every account (or the listed accounts) in one response, one series per account."""
+    try:
+        target_currencies = parse_currency_list(currencies) if currencies else [currency.upper()]
+        if resolution not in HISTORY_RESOLUTIONS:
+            raise HTTPException(status_code=422, detail=f"resolution must be one of: {', '.join(HISTORY_RESOLUTIONS)}")
+        
+        cache_key = response_cache_key(
+            "balance_histories", current_user["user_id"],
+            tuple(accounts) if accounts else None, tuple(target_currencies), resolution, max_points
+        )
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        df = await load_balance_history(
+            conn,
+            current_user["user_id"],
+            account_names=accounts,
+            target_currencies=target_currencies,
+            resolution=resolution,
+            max_points=max_points
+        )
+        
+        if df.empty:
+            response_cache.set(cache_key, [])
+            return []
+        
+        series = []
+        for account_id, account_df in df.groupby('account_id', sort=False):
+            first = account_df.iloc[0]
+            series.append(BalanceHistorySeriesResponse(
+                account_id=account_id,
+                account_name=first['account_name'],
+                account_type=first['account_type'],
+                institution=first['institution'],
+                currency_code=first['currency_code'],
+                history=history_records_to_responses(account_df, target_currencies)
+            ))
+        
+        response_cache.set(cache_key, series)
+        return series
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -159,128 +376,52 @@ async def get_balances(
 async def get_account_balance_history(
     account_name: str,
     currency: str = Query('EUR', description="Target currency for conversion"),
-    current_user: dict = Depends(get_current_user)
+    currencies: Optional[str] = Query(None, description="Comma-separated target currencies (e.g. EUR,GBP,USD). Overrides currency"),
+    resolution: str = Query('day', description="Bucket size: day, week or month (end-of-period balance)"),
+    max_points: Optional[int] = Query(None, ge=2, description="Maximum points per account, downsampled with LTTB"),
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
-    """Get balance history for a specific account."""
+    """
+    Get balance history for a specific account.
+    With `currencies`, every requested balance_<currency> column is returned in one response.
+    """
     try:
+        target_currencies = parse_currency_list(currencies) if currencies else [currency.upper()]
+        if resolution not in HISTORY_RESOLUTIONS:
+            raise HTTPException(status_code=422, detail=f"resolution must be one of: {', '.join(HISTORY_RESOLUTIONS)}")
+        
         # URL decode account name
         account_name = account_name.replace('_', ' ').replace('%2F', '/')
         
-        # Use transaction-based aggregation for history
-        # Generate running totals from transactions (one row per transaction date)
-        query = text("""
-        WITH transaction_balances AS (
-            SELECT
-                t.account_id,
-                t.transaction_date,
-                SUM(t.amount) OVER (
-                    PARTITION BY t.account_id 
-                    ORDER BY t.transaction_date 
-                    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
-                ) as running_balance
-            FROM transactions.ledger t
-            JOIN accounts.list a ON t.account_id = a.account_id
-            WHERE a.account_name = :account_name
-              AND t.user_id = :user_id 
-              AND a.user_id = :user_id
-        ),
-        daily_balances AS (
-            SELECT DISTINCT ON (transaction_date)
-                account_id,
-                transaction_date as balance_date,
-                running_balance as amount
-            FROM transaction_balances
-            ORDER BY transaction_date, account_id
+        cache_key = response_cache_key(
+            "account_balance_history", current_user["user_id"],
+            account_name, tuple(target_currencies), resolution, max_points
         )
-        SELECT
-            db.balance_date,
-            a.account_name,
-            a.account_type,
-            a.institution,
-            a.currency_code,
-            db.amount,
-            COALESCE(r_te.rate_to_eur, 1.0) AS rate_to_eur
-        FROM daily_balances db
-        JOIN accounts.list a ON db.account_id = a.account_id
-        LEFT JOIN LATERAL (
-            SELECT 1.0 / r_te.rate AS rate_to_eur
-            FROM exchange_rates.rate_history r_te
-            WHERE r_te.base_currency = 'EUR' 
-              AND r_te.target_currency = a.currency_code 
-              AND r_te.rate_date <= db.balance_date
-            ORDER BY r_te.rate_date DESC
-            LIMIT 1
-        ) r_te ON a.currency_code != 'EUR'
-        ORDER BY db.balance_date ASC;
-        """)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        with engine.connect() as conn:
-            df = pd.read_sql(query, conn, params={
-                "account_name": account_name,
-                "user_id": current_user["user_id"]
-            })
-            
-            if df.empty:
-                return []
-            
-            # Calculate EUR equivalent
-            df['balance_eur'] = df['amount'] * df['rate_to_eur']
-            
-            # Convert to target currency
-            dynamic_col = f"balance_{currency.lower()}"
-            df[dynamic_col] = df['balance_eur']
-            
-            if currency.upper() != 'EUR':
-                rate_query = text("""
-                    SELECT rate_date, rate
-                    FROM exchange_rates.rate_history
-                    WHERE base_currency = 'EUR' AND target_currency = :target_currency
-                    ORDER BY rate_date DESC
-                """)
-                
-                df_rates = pd.read_sql(rate_query, conn, params={"target_currency": currency.upper()})
-                if not df_rates.empty:
-                    df_rates['rate_date'] = pd.to_datetime(df_rates['rate_date']).dt.date
-                    
-                    df['balance_date_dt'] = pd.to_datetime(df['balance_date'])
-                    df_rates['rate_date_dt'] = pd.to_datetime(df_rates['rate_date'])
-                    
-                    df = df.sort_values('balance_date_dt')
-                    df_rates = df_rates.sort_values('rate_date_dt')
-                    
-                    df = pd.merge_asof(
-                        df,
-                        df_rates[['rate_date_dt', 'rate']],
-                        left_on='balance_date_dt',
-                        right_on='rate_date_dt',
-                        direction='backward'
-                    )
-                    
-                    df[dynamic_col] = df['balance_eur'] * df['rate'].fillna(1.0)
-                    df = df.drop(columns=['balance_date_dt', 'rate_date_dt', 'rate'])
-            
-            # Convert to response format
-            records = df.to_dict('records')
-            results = []
-            for record in records:
-                result = {
-                    "balance_date": record['balance_date'],
-                    "account_name": record['account_name'],
-                    "account_type": record['account_type'],
-                    "institution": record['institution'],
-                    "currency_code": record['currency_code'],
-                    "amount": float(record['amount']),
-                    "balance_eur": float(record['balance_eur']),
-                }
-                
-                if currency.upper() != 'EUR':
-                    balance_col = f"balance_{currency.lower()}"
-                    if balance_col in record:
-                        result[balance_col] = float(record[balance_col])
-                
-                results.append(BalanceHistoryResponse(**result))
-            
-            return results
+        # One row per transaction date with the end-of-day running balance
+        df = await load_balance_history(
+            conn,
+            current_user["user_id"],
+            account_names=[account_name],
+            target_currencies=target_currencies,
+            resolution=resolution,
+            max_points=max_points
+        )
+        
+        if df.empty:
+            response_cache.set(cache_key, [])
+            return []
+        
+        df = df.sort_values('balance_date', kind='stable')
+        
+        history = history_records_to_responses(df, target_currencies)
+        response_cache.set(cache_key, history)
+        return history
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy import text
-from app.db.database import engine
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import get_db
 from app.models.schemas import BudgetResponse, BudgetCreateRequest, BudgetUpdateRequest
 from app.auth import get_current_user
 import json
@@ -9,7 +10,7 @@ router = APIRouter(prefix="/api/budgets", tags=["budgets"])
 
 
 @router.get("", response_model=list[BudgetResponse])
-async def get_all_budgets(current_user: dict = Depends(get_current_user)):
+async def get_all_budgets(current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get all budgets for the authenticated user."""
     try:
         query = text("""
@@ -19,26 +20,25 @@ async def get_all_budgets(current_user: dict = Depends(get_current_user)):
             ORDER BY name
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"user_id": current_user["user_id"]})
-            budgets = []
-            for row in result:
-                budgets.append(BudgetResponse(
-                    budget_id=row[0],
-                    name=row[1],
-                    currency=row[2],
-                    income_sources=row[3] if row[3] else [],
-                    categories=row[4] if row[4] else [],
-                    created_at=str(row[5]),
-                    updated_at=str(row[6])
-                ))
-            return budgets
+        result = await conn.execute(query, {"user_id": current_user["user_id"]})
+        budgets = []
+        for row in result:
+            budgets.append(BudgetResponse(
+                budget_id=row[0],
+                name=row[1],
+                currency=row[2],
+                income_sources=row[3] if row[3] else [],
+                categories=row[4] if row[4] else [],
+                created_at=str(row[5]),
+                updated_at=str(row[6])
+            ))
+        return budgets
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{budget_id}", response_model=BudgetResponse)
-async def get_budget(budget_id: int, current_user: dict = Depends(get_current_user)):
+async def get_budget(budget_id: int, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get a specific budget by ID (only if owned by current user)."""
     try:
         query = text("""
@@ -47,22 +47,21 @@ async def get_budget(budget_id: int, current_user: dict = Depends(get_current_us
             WHERE budget_id = :budget_id AND user_id = :user_id
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"budget_id": budget_id, "user_id": current_user["user_id"]})
-            row = result.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"Budget ID {budget_id} not found")
-            
-            return BudgetResponse(
-                budget_id=row[0],
-                name=row[1],
-                currency=row[2],
-                income_sources=row[3] if row[3] else [],
-                categories=row[4] if row[4] else [],
-                created_at=str(row[5]),
-                updated_at=str(row[6])
-            )
+        result = await conn.execute(query, {"budget_id": budget_id, "user_id": current_user["user_id"]})
+        row = result.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Budget ID {budget_id} not found")
+        
+        return BudgetResponse(
+            budget_id=row[0],
+            name=row[1],
+            currency=row[2],
+            income_sources=row[3] if row[3] else [],
+            categories=row[4] if row[4] else [],
+            created_at=str(row[5]),
+            updated_at=str(row[6])
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -70,7 +69,7 @@ async def get_budget(budget_id: int, current_user: dict = Depends(get_current_us
 
 
 @router.post("", response_model=BudgetResponse)
-async def create_budget(budget: BudgetCreateRequest, current_user: dict = Depends(get_current_user)):
+async def create_budget(budget: BudgetCreateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Create a new budget for the authenticated user."""
     try:
         income_sources = json.dumps(budget.income_sources if budget.income_sources is not None else [])
@@ -82,32 +81,31 @@ async def create_budget(budget: BudgetCreateRequest, current_user: dict = Depend
             RETURNING budget_id, name, currency, income_sources, categories, created_at, updated_at
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {
-                "name": budget.name,
-                "currency": budget.currency.upper(),
-                "income_sources": income_sources,
-                "categories": categories,
-                "user_id": current_user["user_id"]
-            })
-            conn.commit()
-            row = result.fetchone()
-            
-            return BudgetResponse(
-                budget_id=row[0],
-                name=row[1],
-                currency=row[2],
-                income_sources=row[3] if row[3] else [],
-                categories=row[4] if row[4] else [],
-                created_at=str(row[5]),
-                updated_at=str(row[6])
-            )
+        result = await conn.execute(query, {
+            "name": budget.name,
+            "currency": budget.currency.upper(),
+            "income_sources": income_sources,
+            "categories": categories,
+            "user_id": current_user["user_id"]
+        })
+        await conn.commit()
+        row = result.fetchone()
+        
+        return BudgetResponse(
+            budget_id=row[0],
+            name=row[1],
+            currency=row[2],
+            income_sources=row[3] if row[3] else [],
+            categories=row[4] if row[4] else [],
+            created_at=str(row[5]),
+            updated_at=str(row[6])
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{budget_id}", response_model=BudgetResponse)
-async def update_budget(budget_id: int, budget: BudgetUpdateRequest, current_user: dict = Depends(get_current_user)):
+async def update_budget(budget_id: int, budget: BudgetUpdateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Update an existing budget (only if owned by current user)."""
     try:
         # Build update query dynamically based on provided fields
@@ -142,26 +140,25 @@ async def update_budget(budget_id: int, budget: BudgetUpdateRequest, current_use
             RETURNING budget_id, name, currency, income_sources, categories, created_at, updated_at
         """)
         
-        with engine.connect() as conn:
-            # Check if budget exists and belongs to user
-            check_query = text("SELECT budget_id FROM budgets.list WHERE budget_id = :budget_id AND user_id = :user_id")
-            check_result = conn.execute(check_query, {"budget_id": budget_id, "user_id": current_user["user_id"]}).fetchone()
-            if not check_result:
-                raise HTTPException(status_code=404, detail=f"Budget ID {budget_id} not found or you don't have permission")
-            
-            result = conn.execute(query, params)
-            conn.commit()
-            row = result.fetchone()
-            
-            return BudgetResponse(
-                budget_id=row[0],
-                name=row[1],
-                currency=row[2],
-                income_sources=row[3] if row[3] else [],
-                categories=row[4] if row[4] else [],
-                created_at=str(row[5]),
-                updated_at=str(row[6])
-            )
+        # Check if budget exists and belongs to user
+        check_query = text("SELECT budget_id FROM budgets.list WHERE budget_id = :budget_id AND user_id = :user_id")
+        check_result = (await conn.execute(check_query, {"budget_id": budget_id, "user_id": current_user["user_id"]})).fetchone()
+        if not check_result:
+            raise HTTPException(status_code=404, detail=f"Budget ID {budget_id} not found or you don't have permission")
+        
+        result = await conn.execute(query, params)
+        await conn.commit()
+        row = result.fetchone()
+        
+        return BudgetResponse(
+            budget_id=row[0],
+            name=row[1],
+            currency=row[2],
+            income_sources=row[3] if row[3] else [],
+            categories=row[4] if row[4] else [],
+            created_at=str(row[5]),
+            updated_at=str(row[6])
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -169,20 +166,19 @@ async def update_budget(budget_id: int, budget: BudgetUpdateRequest, current_use
 
 
 @router.delete("/{budget_id}")
-async def delete_budget(budget_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_budget(budget_id: int, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Delete a budget (only if owned by current user)."""
     try:
         query = text("DELETE FROM budgets.list WHERE budget_id = :budget_id AND user_id = :user_id RETURNING budget_id")
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"budget_id": budget_id, "user_id": current_user["user_id"]})
-            conn.commit()
-            row = result.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"Budget ID {budget_id} not found or you don't have permission")
-            
-            return {"message": f"Budget {budget_id} deleted successfully"}
+        result = await conn.execute(query, {"budget_id": budget_id, "user_id": current_user["user_id"]})
+        await conn.commit()
+        row = result.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Budget ID {budget_id} not found or you don't have permission")
+        
+        return {"message": f"Budget {budget_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy import text
-from app.db.database import engine
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import get_db
 from pydantic import BaseModel
 from typing import Optional
 
@@ -21,7 +22,7 @@ class CategoryResponse(BaseModel):
 
 
 @router.get("", response_model=list[CategoryResponse])
-async def get_categories(category_type: Optional[str] = None):
+async def get_categories(category_type: Optional[str] = None, conn: AsyncConnection = Depends(get_db)):
     """Get all categories, optionally filtered by type (expense or income)."""
     try:
         query = """
@@ -41,18 +42,17 @@ async def get_categories(category_type: Optional[str] = None):
         
         query += " ORDER BY category_type, category_name"
         
-        with engine.connect() as conn:
-            result = conn.execute(text(query), params)
-            categories = []
-            for row in result:
-                categories.append(CategoryResponse(
-                    category_id=row[0],
-                    category_name=row[1],
-                    category_type=row[2],
-                    created_at=str(row[3]) if row[3] else "",
-                    updated_at=str(row[4]) if row[4] else ""
-                ))
-            return categories
+        result = await conn.execute(text(query), params)
+        categories = []
+        for row in result:
+            categories.append(CategoryResponse(
+                category_id=row[0],
+                category_name=row[1],
+                category_type=row[2],
+                created_at=str(row[3]) if row[3] else "",
+                updated_at=str(row[4]) if row[4] else ""
+            ))
+        return categories
     except HTTPException:
         raise
     except Exception as e:
@@ -60,7 +60,7 @@ async def get_categories(category_type: Optional[str] = None):
 
 
 @router.post("", response_model=CategoryResponse)
-async def create_category(category: CategoryCreateRequest):
+async def create_category(category: CategoryCreateRequest, conn: AsyncConnection = Depends(get_db)):
     """Create a new category."""
     try:
         # Validate category_type
@@ -76,35 +76,34 @@ async def create_category(category: CategoryCreateRequest):
             WHERE LOWER(category_name) = LOWER(:category_name)
         """)
         
-        with engine.connect() as conn:
-            existing = conn.execute(check_query, {"category_name": category.category_name}).fetchone()
-            if existing:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Category '{category.category_name}' already exists"
-                )
-            
-            # Insert new category
-            insert_query = text("""
-                INSERT INTO categories.list (category_name, category_type)
-                VALUES (:category_name, :category_type)
-                RETURNING category_id, category_name, category_type, created_at, updated_at
-            """)
-            
-            result = conn.execute(insert_query, {
-                "category_name": category.category_name,
-                "category_type": category.category_type
-            })
-            conn.commit()
-            row = result.fetchone()
-            
-            return CategoryResponse(
-                category_id=row[0],
-                category_name=row[1],
-                category_type=row[2],
-                created_at=str(row[3]) if row[3] else "",
-                updated_at=str(row[4]) if row[4] else ""
+        existing = (await conn.execute(check_query, {"category_name": category.category_name})).fetchone()
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Category '{category.category_name}' already exists"
             )
+        
+        # Insert new category
+        insert_query = text("""
+            INSERT INTO categories.list (category_name, category_type)
+            VALUES (:category_name, :category_type)
+            RETURNING category_id, category_name, category_type, created_at, updated_at
+        """)
+        
+        result = await conn.execute(insert_query, {
+            "category_name": category.category_name,
+            "category_type": category.category_type
+        })
+        await conn.commit()
+        row = result.fetchone()
+        
+        return CategoryResponse(
+            category_id=row[0],
+            category_name=row[1],
+            category_type=row[2],
+            created_at=str(row[3]) if row[3] else "",
+            updated_at=str(row[4]) if row[4] else ""
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -112,7 +111,7 @@ async def create_category(category: CategoryCreateRequest):
 
 
 @router.get("/grouped", response_model=dict)
-async def get_categories_grouped():
+async def get_categories_grouped(conn: AsyncConnection = Depends(get_db)):
     """Get categories grouped by type (for backward compatibility with existing API)."""
     try:
         query = text("""
@@ -121,21 +120,20 @@ async def get_categories_grouped():
             ORDER BY category_type, category_name
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query)
-            expense_categories = []
-            income_categories = []
-            
-            for row in result:
-                if row[1] == 'expense':
-                    expense_categories.append(row[0])
-                else:
-                    income_categories.append(row[0])
-            
-            return {
-                "expense_categories": expense_categories,
-                "income_categories": income_categories
-            }
+        result = await conn.execute(query)
+        expense_categories = []
+        income_categories = []
+        
+        for row in result:
+            if row[1] == 'expense':
+                expense_categories.append(row[0])
+            else:
+                income_categories.append(row[0])
+        
+        return {
+            "expense_categories": expense_categories,
+            "income_categories": income_categories
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
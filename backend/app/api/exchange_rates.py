@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from sqlalchemy import text
-from app.db.database import engine
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import get_db
+from app.db.rate_index import invalidate_rate_index
 from app.models.schemas import ExchangeRateRequest
 from typing import Optional, Dict
 from datetime import date
@@ -11,7 +13,8 @@ router = APIRouter(prefix="/api/exchange-rates", tags=["exchange-rates"])
 @router.get("/latest")
 async def get_latest_exchange_rates(
     base_currency: str = Query('EUR', description="Base currency"),
-    target_date: Optional[str] = Query(None, description="Date to get rates for (YYYY-MM-DD). If not provided, uses latest available.")
+    target_date: Optional[str] = Query(None, description="Date to get rates for (YYYY-MM-DD). If not provided, uses latest available."),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Get the latest exchange rates for converting from base_currency to all other currencies."""
     try:
@@ -28,13 +31,12 @@ async def get_latest_exchange_rates(
                 FROM exchange_rates.rate_history
                 WHERE base_currency = :base_currency
             """)
-            with engine.connect() as conn:
-                result = conn.execute(latest_date_query, {"base_currency": base_currency.upper()})
-                row = result.fetchone()
-                if row and row[0]:
-                    date_filter = "AND rate_date = :target_date"
-                    params["target_date"] = row[0]
-        
+            result = await conn.execute(latest_date_query, {"base_currency": base_currency.upper()})
+            row = result.fetchone()
+            if row and row[0]:
+                date_filter = "AND rate_date = :target_date"
+                params["target_date"] = row[0]
+
         query = text(f"""
             SELECT DISTINCT ON (target_currency)
                 target_currency,
@@ -45,30 +47,29 @@ async def get_latest_exchange_rates(
             ORDER BY target_currency, rate_date DESC
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, params)
-            rows = result.fetchall()
-            
-            rates: Dict[str, float] = {}
-            # Base currency always has rate of 1.0
-            rates[base_currency.upper()] = 1.0
-            
-            for row in rows:
-                target_curr = row[0]
-                rate = float(row[1])
-                rates[target_curr] = rate
-            
-            return {
-                "base_currency": base_currency.upper(),
-                "rates": rates,
-                "date": params.get("target_date") if "target_date" in params else None
-            }
+        result = await conn.execute(query, params)
+        rows = result.fetchall()
+        
+        rates: Dict[str, float] = {}
+        # Base currency always has rate of 1.0
+        rates[base_currency.upper()] = 1.0
+        
+        for row in rows:
+            target_curr = row[0]
+            rate = float(row[1])
+            rates[target_curr] = rate
+        
+        return {
+            "base_currency": base_currency.upper(),
+            "rates": rates,
+            "date": params.get("target_date") if "target_date" in params else None
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("")
-async def create_exchange_rate(entry: ExchangeRateRequest):
+async def create_exchange_rate(entry: ExchangeRateRequest, conn: AsyncConnection = Depends(get_db)):
     """Create a new exchange rate entry."""
     try:
         if entry.rate <= 0:
@@ -81,14 +82,15 @@ async def create_exchange_rate(entry: ExchangeRateRequest):
             DO UPDATE SET rate = EXCLUDED.rate
         """)
         
-        with engine.connect() as conn:
-            conn.execute(query, {
-                "base_currency": entry.base_currency.upper(),
-                "target_currency": entry.target_currency.upper(),
-                "rate": entry.rate,
-                "rate_date": entry.rate_date
-            })
-            conn.commit()
+        await conn.execute(query, {
+            "base_currency": entry.base_currency.upper(),
+            "target_currency": entry.target_currency.upper(),
+            "rate": entry.rate,
+            "rate_date": entry.rate_date
+        })
+        await conn.commit()
+
+        invalidate_rate_index()
         
         return {"message": "Exchange rate created successfully"}
     except Exception as e:
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy import text
-from app.db.database import engine
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import get_db
 from app.models.schemas import GoalResponse, GoalCreateRequest, GoalUpdateRequest
 from app.auth import get_current_user
 
@@ -8,7 +9,7 @@ router = APIRouter(prefix="/api/goals", tags=["goals"])
 
 
 @router.get("", response_model=list[GoalResponse])
-async def get_all_goals(current_user: dict = Depends(get_current_user)):
+async def get_all_goals(current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get all goals for the authenticated user."""
     try:
         query = text("""
@@ -19,30 +20,29 @@ async def get_all_goals(current_user: dict = Depends(get_current_user)):
             ORDER BY created_at DESC
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"user_id": current_user["user_id"]})
-            goals = []
-            for row in result:
-                goals.append(GoalResponse(
-                    goal_id=row[0],
-                    name=row[1],
-                    goal_type=row[2],
-                    target_amount=float(row[3]),
-                    current_amount=float(row[4]),
-                    currency=row[5],
-                    target_date=row[6],
-                    description=row[7],
-                    icon=row[8],
-                    created_at=str(row[9]),
-                    updated_at=str(row[10])
-                ))
-            return goals
+        result = await conn.execute(query, {"user_id": current_user["user_id"]})
+        goals = []
+        for row in result:
+            goals.append(GoalResponse(
+                goal_id=row[0],
+                name=row[1],
+                goal_type=row[2],
+                target_amount=float(row[3]),
+                current_amount=float(row[4]),
+                currency=row[5],
+                target_date=row[6],
+                description=row[7],
+                icon=row[8],
+                created_at=str(row[9]),
+                updated_at=str(row[10])
+            ))
+        return goals
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{goal_id}", response_model=GoalResponse)
-async def get_goal(goal_id: int, current_user: dict = Depends(get_current_user)):
+async def get_goal(goal_id: int, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get a specific goal by ID (only if owned by current user)."""
     try:
         query = text("""
@@ -52,26 +52,25 @@ async def get_goal(goal_id: int, current_user: dict = Depends(get_current_user))
             WHERE goal_id = :goal_id AND user_id = :user_id
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"goal_id": goal_id, "user_id": current_user["user_id"]})
-            row = result.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"Goal ID {goal_id} not found")
-            
-            return GoalResponse(
-                goal_id=row[0],
-                name=row[1],
-                goal_type=row[2],
-                target_amount=float(row[3]),
-                current_amount=float(row[4]),
-                currency=row[5],
-                target_date=row[6],
-                description=row[7],
-                icon=row[8],
-                created_at=str(row[9]),
-                updated_at=str(row[10])
-            )
+        result = await conn.execute(query, {"goal_id": goal_id, "user_id": current_user["user_id"]})
+        row = result.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Goal ID {goal_id} not found")
+        
+        return GoalResponse(
+            goal_id=row[0],
+            name=row[1],
+            goal_type=row[2],
+            target_amount=float(row[3]),
+            current_amount=float(row[4]),
+            currency=row[5],
+            target_date=row[6],
+            description=row[7],
+            icon=row[8],
+            created_at=str(row[9]),
+            updated_at=str(row[10])
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -79,7 +78,7 @@ async def get_goal(goal_id: int, current_user: dict = Depends(get_current_user))
 
 
 @router.post("", response_model=GoalResponse)
-async def create_goal(goal: GoalCreateRequest, current_user: dict = Depends(get_current_user)):
+async def create_goal(goal: GoalCreateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Create a new goal for the authenticated user."""
     try:
         query = text("""
@@ -89,40 +88,39 @@ async def create_goal(goal: GoalCreateRequest, current_user: dict = Depends(get_
                       target_date, description, icon, created_at, updated_at
         """)
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {
-                "name": goal.name,
-                "goal_type": goal.goal_type,
-                "target_amount": goal.target_amount,
-                "current_amount": goal.current_amount,
-                "currency": goal.currency.upper(),
-                "target_date": goal.target_date,
-                "description": goal.description,
-                "icon": goal.icon,
-                "user_id": current_user["user_id"]
-            })
-            conn.commit()
-            row = result.fetchone()
-            
-            return GoalResponse(
-                goal_id=row[0],
-                name=row[1],
-                goal_type=row[2],
-                target_amount=float(row[3]),
-                current_amount=float(row[4]),
-                currency=row[5],
-                target_date=row[6],
-                description=row[7],
-                icon=row[8],
-                created_at=str(row[9]),
-                updated_at=str(row[10])
-            )
+        result = await conn.execute(query, {
+            "name": goal.name,
+            "goal_type": goal.goal_type,
+            "target_amount": goal.target_amount,
+            "current_amount": goal.current_amount,
+            "currency": goal.currency.upper(),
+            "target_date": goal.target_date,
+            "description": goal.description,
+            "icon": goal.icon,
+            "user_id": current_user["user_id"]
+        })
+        await conn.commit()
+        row = result.fetchone()
+        
+        return GoalResponse(
+            goal_id=row[0],
+            name=row[1],
+            goal_type=row[2],
+            target_amount=float(row[3]),
+            current_amount=float(row[4]),
+            currency=row[5],
+            target_date=row[6],
+            description=row[7],
+            icon=row[8],
+            created_at=str(row[9]),
+            updated_at=str(row[10])
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{goal_id}", response_model=GoalResponse)
-async def update_goal(goal_id: int, goal: GoalUpdateRequest, current_user: dict = Depends(get_current_user)):
+async def update_goal(goal_id: int, goal: GoalUpdateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Update an existing goal (only if owned by current user)."""
     try:
         # Build update query dynamically based on provided fields
@@ -174,30 +172,29 @@ async def update_goal(goal_id: int, goal: GoalUpdateRequest, current_user: dict
                       target_date, description, icon, created_at, updated_at
         """)
         
-        with engine.connect() as conn:
-            # Check if goal exists and belongs to user
-            check_query = text("SELECT goal_id FROM goals.list WHERE goal_id = :goal_id AND user_id = :user_id")
-            check_result = conn.execute(check_query, {"goal_id": goal_id, "user_id": current_user["user_id"]}).fetchone()
-            if not check_result:
-                raise HTTPException(status_code=404, detail=f"Goal ID {goal_id} not found or you don't have permission")
-            
-            result = conn.execute(query, params)
-            conn.commit()
-            row = result.fetchone()
-            
-            return GoalResponse(
-                goal_id=row[0],
-                name=row[1],
-                goal_type=row[2],
-                target_amount=float(row[3]),
-                current_amount=float(row[4]),
-                currency=row[5],
-                target_date=row[6],
-                description=row[7],
-                icon=row[8],
-                created_at=str(row[9]),
-                updated_at=str(row[10])
-            )
+        # Check if goal exists and belongs to user
+        check_query = text("SELECT goal_id FROM goals.list WHERE goal_id = :goal_id AND user_id = :user_id")
+        check_result = (await conn.execute(check_query, {"goal_id": goal_id, "user_id": current_user["user_id"]})).fetchone()
+        if not check_result:
+            raise HTTPException(status_code=404, detail=f"Goal ID {goal_id} not found or you don't have permission")
+        
+        result = await conn.execute(query, params)
+        await conn.commit()
+        row = result.fetchone()
+        
+        return GoalResponse(
+            goal_id=row[0],
+            name=row[1],
+            goal_type=row[2],
+            target_amount=float(row[3]),
+            current_amount=float(row[4]),
+            currency=row[5],
+            target_date=row[6],
+            description=row[7],
+            icon=row[8],
+            created_at=str(row[9]),
+            updated_at=str(row[10])
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -205,20 +202,19 @@ async def update_goal(goal_id: int, goal: GoalUpdateRequest, current_user: dict
 
 
 @router.delete("/{goal_id}")
-async def delete_goal(goal_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_goal(goal_id: int, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Delete a goal (only if owned by current user)."""
     try:
         query = text("DELETE FROM goals.list WHERE goal_id = :goal_id AND user_id = :user_id RETURNING goal_id")
         
-        with engine.connect() as conn:
-            result = conn.execute(query, {"goal_id": goal_id, "user_id": current_user["user_id"]})
-            conn.commit()
-            row = result.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"Goal ID {goal_id} not found or you don't have permission")
-            
-            return {"message": f"Goal {goal_id} deleted successfully"}
+        result = await conn.execute(query, {"goal_id": goal_id, "user_id": current_user["user_id"]})
+        await conn.commit()
+        row = result.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Goal ID {goal_id} not found or you don't have permission")
+        
+        return {"message": f"Goal {goal_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
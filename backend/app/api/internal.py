@@ -0,0 +1,134 @@
+"""
+Internal monitoring endpoints.
+
+Not meant for the frontend: every route requires the INTERNAL_API_TOKEN environment variable,
+sent as the X-Internal-Token header (or as a bearer token, for scrapers that cannot set custom
+headers). The router is disabled (404) when the variable is unset.
+"""
+import hmac
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import PlainTextResponse
+from app.cache import cache_stats
+from app.db.database import pool_stats
+from app.http_client import http_client_stats
+from app.monitoring.metrics import Counter, Gauge, generate_latest, register_collector, CONTENT_TYPE_LATEST
+from app.monitoring.profiling import profile_store, profiling_settings
+
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+
+def internal_token_matches(token: Optional[str]) -> bool:
+    """Whether `token` is the configured internal token (always False when none is configured)."""
+    return bool(INTERNAL_API_TOKEN and token and hmac.compare_digest(token, INTERNAL_API_TOKEN))
+
+
+async def require_internal_token(
+    x_internal_token: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None)
+):
+    """FastAPI dependency guarding the internal endpoints."""
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token and authorization and authorization.lower().startswith("bearer "):
+        x_internal_token = authorization[7:]
+    if not internal_token_matches(x_internal_token):
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Entry counts, hit/miss/eviction counters and hit ratio of the in-process caches."""
+    return {"caches": cache_stats()}
+
+
+@router.get("/pool")
+async def get_pool_stats():
+    """Checked-out, idle and overflow connections of the database pools, and request wait times."""
+    return pool_stats()
+
+
+@router.get("/http")
+async def get_http_client_stats():
+    """Request counters and connection pool state of the shared Supabase HTTP client."""
+    return http_client_stats()
+
+
+@register_collector
+def _cache_and_pool_metrics():
+    """Cache counters and pool gauges, read from their owners at scrape time."""
+    cache_hits = Counter("app_cache_hits_total", "Cache hits by cache.", ("cache",))
+    cache_misses = Counter("app_cache_misses_total", "Cache misses by cache.", ("cache",))
+    cache_entries = Gauge("app_cache_entries", "Entries held by cache.", ("cache",))
+    for stats in cache_stats():
+        cache_hits.inc(stats["name"], amount=stats["hits"])
+        cache_misses.inc(stats["name"], amount=stats["misses"])
+        cache_entries.set(stats["name"], value=stats["entries"])
+
+    stats = pool_stats()
+    pool_connections = Gauge("db_pool_connections", "Database pool connections by pool and state.", ("pool", "state"))
+    for pool in ("async_pool", "sync_pool"):
+        for state in ("checked_out", "idle", "overflow"):
+            pool_connections.set(pool, state, value=stats[pool][state])
+    waits = stats["request_checkouts"]
+    checkouts = Counter("db_pool_checkouts_total", "Connections checked out by request handlers.")
+    checkouts.inc(amount=waits["checkouts"])
+    wait_seconds = Counter("db_pool_wait_seconds_total", "Time request handlers spent waiting for a connection.")
+    wait_seconds.inc(amount=waits["wait_seconds_total"])
+    timeouts = Counter("db_pool_timeouts_total", "Connection checkouts that timed out.")
+    timeouts.inc(amount=waits["timeouts"])
+
+    lines = []
+    for metric in (cache_hits, cache_misses, cache_entries, pool_connections, checkouts, wait_seconds, timeouts):
+        lines.extend(metric.expose())
+    return lines
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics_exposition():
+    """Request counts, latency histograms, errors and in-flight requests per route, in Prometheus text format."""
+    return PlainTextResponse(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/profiling")
+async def get_profiling_settings():
+    """Whether requests may ask to be profiled (X-Profile header plus X-Internal-Token)."""
+    return profiling_settings
+
+
+@router.put("/profiling")
+async def set_profiling_settings(enabled: bool = Query(..., description="Allow profiling requests in this process")):
+    """Switch per-request profiling on or off in this process."""
+    profiling_settings["enabled"] = enabled
+    return profiling_settings
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """Summaries of the stored request profiles, newest first."""
+    return [
+        {key: summary[key] for key in ("profile_id", "method", "path", "status_code", "started_at", "duration_ms", "samples")}
+        for summary in (profile.summary() for profile in profile_store.values())
+    ]
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Time per category (auth, sql, pandas, pydantic, app, framework) and the hottest stacks of a profile."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.summary()
+
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+async def get_profile_folded(profile_id: str):
+    """The profile as folded stacks (one "frame;frame;... count" line per stack) for flamegraph.pl or speedscope."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile.folded())
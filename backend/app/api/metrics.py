@@ -1,24 +1,41 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+import numpy as np
+import pandas as pd
 from typing import Optional
 from datetime import date
-from app.db.database import engine
+from app.db.database import get_db
 from app.models.schemas import BalanceResponse
-from app.api.balances import load_balances_from_transactions
+from app.api.balances import load_balances_from_transactions, load_balance_history, HISTORY_RESOLUTIONS
+from app.db.rate_index import lookup_rates
+from app.auth import get_current_user
+from app.cache import response_cache, response_cache_key
 
 router = APIRouter(prefix="/api/metrics", tags=["metrics"])
 
 
+# Default account types (can be expanded)
+CASH_TYPES = ['Cash', 'Current', 'Savings', 'Checking']
+INVESTMENT_TYPES = ['Investment', 'Pension', 'Stocks', 'ISA', 'Retirement']
+
+
+def classify_account_type(account_type: str) -> str:
+    """Classify an account_type as 'cash' or 'investment' (defaults to cash if unclear)."""
+    account_type_lower = account_type.lower()
+    if any(cash_type.lower() in account_type_lower for cash_type in CASH_TYPES):
+        return 'cash'
+    elif any(inv_type.lower() in account_type_lower for inv_type in INVESTMENT_TYPES):
+        return 'investment'
+    return 'cash'
+
+
 def calculate_metrics_from_balances(balances: list[BalanceResponse], target_currency: str = 'EUR') -> dict:
     """
     Calculate financial metrics from balance data.
     
     Categorizes accounts as 'Cash' or 'Investment' based on account_type.
     """
-    # Default account types (can be expanded)
-    CASH_TYPES = ['Cash', 'Current', 'Savings', 'Checking']
-    INVESTMENT_TYPES = ['Investment', 'Pension', 'Stocks', 'ISA', 'Retirement']
-    
     cash_total = 0.0
     investments_total = 0.0
     
@@ -32,13 +49,9 @@ def calculate_metrics_from_balances(balances: list[BalanceResponse], target_curr
             balance_value = getattr(balance, balance_col, balance.balance_eur)
         
         # Categorize by account_type
-        account_type_lower = balance.account_type.lower()
-        if any(cash_type.lower() in account_type_lower for cash_type in CASH_TYPES):
-            cash_total += balance_value
-        elif any(inv_type.lower() in account_type_lower for inv_type in INVESTMENT_TYPES):
+        if classify_account_type(balance.account_type) == 'investment':
             investments_total += balance_value
         else:
-            # Default to cash if unclear
             cash_total += balance_value
     
     net_worth = cash_total + investments_total
@@ -55,9 +68,11 @@ def calculate_metrics_from_balances(balances: list[BalanceResponse], target_curr
 @router.get("")
 async def get_metrics(
     currency: str = Query('EUR', description="Target currency for calculations"),
-    date: Optional[str] = Query(None, description="Date in format YYYY-MM-DD")
+    date: Optional[str] = Query(None, description="Date in format YYYY-MM-DD"),
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
-    """Get calculated financial metrics (net worth, cash, investments, cash/investment ratio)."""
+    """Get calculated financial metrics (net worth, cash, investments, cash/investment ratio) for the current user."""
     try:
         parsed_date = None
         if date:
@@ -67,9 +82,19 @@ async def get_metrics(
             except ValueError:
                 raise HTTPException(status_code=422, detail="Invalid date format. Use YYYY-MM-DD")
         
+        cache_key = response_cache_key("metrics", current_user["user_id"], currency.upper(), parsed_date)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         # Get balances
         balances_data = []
-        df = load_balances_from_transactions(target_currency=currency, balance_date=parsed_date)
+        df = await load_balances_from_transactions(
+            conn,
+            target_currency=currency,
+            balance_date=parsed_date,
+            user_id=current_user["user_id"]
+        )
         
         if not df.empty:
             records = df.to_dict('records')
@@ -93,16 +118,113 @@ async def get_metrics(
         
         # Calculate metrics
         if not balances_data:
-            return {
+            metrics = {
                 "cash": 0.0,
                 "investments": 0.0,
                 "net_worth": 0.0,
                 "cash_investment_ratio": 0.0
             }
+        else:
+            metrics = calculate_metrics_from_balances(balances_data, target_currency=currency)
         
-        metrics = calculate_metrics_from_balances(balances_data, target_currency=currency)
+        response_cache.set(cache_key, metrics)
         return metrics
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def calculate_metrics_history(df: pd.DataFrame, target_currency: str, start_date: Optional[date], end_date: date, interval: str = 'day') -> pd.DataFrame:
+    """
+    Daily cash, investments and net worth from per-account balance history rows
+    (as returned by load_balance_history). Each account's native balance is carried forward
+    to every day and converted at the rates in effect on that day, as in
+    calculate_metrics_from_balances. interval 'week'/'month' keeps the last day of each period.
+    Rates come from the index load_balance_history has loaded (ensure_rate_index).
+    """
+    df = df.assign(balance_date=pd.to_datetime(df['balance_date']), amount=df['amount'].astype(float))
+    amounts = df.pivot_table(index='balance_date', columns='account_id', values='amount', aggfunc='last')
+    
+    first_day = amounts.index.min() if start_date is None else min(amounts.index.min(), pd.Timestamp(start_date))
+    calendar = pd.date_range(first_day, pd.Timestamp(end_date), freq='D')
+    amounts = amounts.reindex(calendar).ffill().fillna(0.0)
+    if start_date is not None:
+        amounts = amounts.loc[pd.Timestamp(start_date):]
+    days = amounts.index
+    
+    # One as-of rate lookup per currency over the whole calendar (missing rates count as 1.0)
+    accounts = df.groupby('account_id')[['account_type', 'currency_code']].first()
+    to_target = np.nan_to_num(lookup_rates('EUR', target_currency, days), nan=1.0)
+    values = pd.DataFrame(index=days)
+    for currency_code, account_ids in accounts.groupby('currency_code').groups.items():
+        rates = lookup_rates('EUR', currency_code, days)
+        factor = np.where(np.isnan(rates), 1.0, 1.0 / rates) * to_target
+        for account_id in account_ids:
+            values[account_id] = amounts[account_id].to_numpy() * factor
+    
+    is_investment = accounts['account_type'].map(classify_account_type) == 'investment'
+    
+    history = pd.DataFrame(index=days)
+    history['cash'] = values[list(is_investment.index[~is_investment])].sum(axis=1)
+    history['investments'] = values[list(is_investment.index[is_investment])].sum(axis=1)
+    history['net_worth'] = history['cash'] + history['investments']
+    history['cash_investment_ratio'] = np.where(
+        history['net_worth'] > 0,
+        history['investments'] / history['net_worth'].where(history['net_worth'] != 0, 1.0) * 100,
+        0.0
+    )
+    
+    period = HISTORY_RESOLUTIONS[interval]
+    if period:
+        history = history[~history.index.to_period(period).duplicated(keep='last')]
+    
+    history = history.round(2)
+    history.insert(0, 'date', history.index.date)
+    return history.reset_index(drop=True)
+
+
+@router.get("/history")
+async def get_metrics_history(
+    from_date: Optional[str] = Query(None, alias="from", description="Start date in format YYYY-MM-DD (defaults to the first transaction)"),
+    to_date: Optional[str] = Query(None, alias="to", description="End date in format YYYY-MM-DD (defaults to today)"),
+    interval: str = Query('day', description="Sampling interval: day, week or month (last day of each period)"),
+    currency: str = Query('EUR', description="Target currency for calculations"),
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
+):
+    """Get cash, investments, net worth and cash/investment ratio over time, computed from one ledger scan."""
+    try:
+        try:
+            start_date = date.fromisoformat(from_date) if from_date else None
+            end_date = date.fromisoformat(to_date) if to_date else date.today()
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid date format. Use YYYY-MM-DD")
+        
+        if start_date and start_date > end_date:
+            raise HTTPException(status_code=422, detail="from must not be after to")
+        if interval not in HISTORY_RESOLUTIONS:
+            raise HTTPException(status_code=422, detail=f"interval must be one of: {', '.join(HISTORY_RESOLUTIONS)}")
+        
+        cache_key = response_cache_key(
+            "metrics_history", current_user["user_id"], currency.upper(), start_date, end_date, interval
+        )
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        df = await load_balance_history(conn, current_user["user_id"], end_date=end_date)
+        
+        if df.empty:
+            response_cache.set(cache_key, [])
+            return []
+        
+        history = calculate_metrics_history(df, currency.upper(), start_date, end_date, interval).to_dict('records')
+        response_cache.set(cache_key, history)
+        return history
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,28 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from sqlalchemy import text
-from app.db.database import engine
-from app.models.schemas import TransactionCreateRequest, TransactionUpdateRequest, TransactionResponse
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import async_engine, get_db
+from app.db.balance_store import apply_transaction_delta, refresh_account_balances
+from app.cache import commit_ledger_changes
+from app.models.schemas import TransactionCreateRequest, TransactionUpdateRequest, TransactionResponse, TransactionPageResponse
 from app.auth import get_current_user
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import date
+from decimal import Decimal
 from fastapi import Path
+from fastapi.responses import StreamingResponse
+import base64
+import csv
+import io
+import json
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 2000
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
 # Common expense categories (can be customized)
 EXPENSE_CATEGORIES = [
     "Groceries",
@@ -34,7 +48,7 @@ INCOME_CATEGORIES = [
 
 
 @router.post("", response_model=TransactionResponse)
-async def create_transaction(transaction: TransactionCreateRequest, current_user: dict = Depends(get_current_user)):
+async def create_transaction(transaction: TransactionCreateRequest, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """
     Create a new transaction.
     
@@ -61,175 +75,309 @@ async def create_transaction(transaction: TransactionCreateRequest, current_user
             SELECT account_id FROM accounts.list 
             WHERE account_id = :account_id AND user_id = :user_id
         """)
-        with engine.connect() as conn:
-            account_result = conn.execute(check_account, {
-                "account_id": transaction.account_id,
-                "user_id": current_user["user_id"]
-            }).fetchone()
-            if not account_result:
+        account_result = (await conn.execute(check_account, {
+            "account_id": transaction.account_id,
+            "user_id": current_user["user_id"]
+        })).fetchone()
+        if not account_result:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Account ID {transaction.account_id} does not exist or you don't have permission"
+            )
+        
+        # Check if this is an Initial Balance transaction and if one already exists
+        if transaction.category == 'Initial Balance':
+            check_existing = text("""
+                SELECT transaction_id 
+                FROM transactions.ledger 
+                WHERE account_id = :account_id 
+                AND category = 'Initial Balance'
+                LIMIT 1
+            """)
+            existing = (await conn.execute(check_existing, {"account_id": transaction.account_id})).fetchone()
+            if existing:
                 raise HTTPException(
-                    status_code=404, 
-                    detail=f"Account ID {transaction.account_id} does not exist or you don't have permission"
+                    status_code=400, 
+                    detail=f"Account {transaction.account_id} already has an Initial Balance transaction. Each account can only have one Initial Balance."
                 )
-            
-            # Check if this is an Initial Balance transaction and if one already exists
-            if transaction.category == 'Initial Balance':
-                check_existing = text("""
-                    SELECT transaction_id 
-                    FROM transactions.ledger 
-                    WHERE account_id = :account_id 
-                    AND category = 'Initial Balance'
-                    LIMIT 1
-                """)
-                existing = conn.execute(check_existing, {"account_id": transaction.account_id}).fetchone()
-                if existing:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Account {transaction.account_id} already has an Initial Balance transaction. Each account can only have one Initial Balance."
-                    )
-            
-            # Validate trip if provided
-            if transaction.trip_id:
-                check_trip = text("SELECT trip_id FROM trips.list WHERE trip_id = :trip_id")
-                trip_result = conn.execute(check_trip, {"trip_id": transaction.trip_id}).fetchone()
-                if not trip_result:
-                    raise HTTPException(status_code=404, detail=f"Trip ID {transaction.trip_id} does not exist")
-            
-            # Insert transaction
-            insert_query = text("""
-                INSERT INTO transactions.ledger 
-                (account_id, amount, transaction_type, category, transaction_date, description, merchant, trip_id, user_id)
-                VALUES (:account_id, :amount, :transaction_type, :category, :transaction_date, :description, :merchant, :trip_id, :user_id)
-                RETURNING transaction_id, account_id, amount, transaction_type, category, transaction_date, description, merchant, trip_id
-            """)
-            
-            result = conn.execute(insert_query, {
-                "account_id": transaction.account_id,
-                "amount": transaction.amount,
-                "transaction_type": transaction.transaction_type,
-                "category": transaction.category,
-                "transaction_date": transaction.transaction_date,
-                "description": transaction.description,
-                "merchant": transaction.merchant,
-                "trip_id": transaction.trip_id,
-                "user_id": current_user["user_id"]
-            })
-            conn.commit()
-            row = result.fetchone()
-            
-            return TransactionResponse(
-                transaction_id=row[0],
-                account_id=row[1],
-                amount=float(row[2]),
-                transaction_type=row[3],
-                category=row[4],
-                transaction_date=row[5],
-                description=row[6],
-                merchant=row[7] if row[7] else None,
-                trip_id=row[8] if row[8] else None
-            )
+        
+        # Validate trip if provided
+        if transaction.trip_id:
+            check_trip = text("SELECT trip_id FROM trips.list WHERE trip_id = :trip_id")
+            trip_result = (await conn.execute(check_trip, {"trip_id": transaction.trip_id})).fetchone()
+            if not trip_result:
+                raise HTTPException(status_code=404, detail=f"Trip ID {transaction.trip_id} does not exist")
+        
+        # Insert transaction
+        insert_query = text("""
+            INSERT INTO transactions.ledger 
+            (account_id, amount, transaction_type, category, transaction_date, description, merchant, trip_id, user_id)
+            VALUES (:account_id, :amount, :transaction_type, :category, :transaction_date, :description, :merchant, :trip_id, :user_id)
+            RETURNING transaction_id, account_id, amount, transaction_type, category, transaction_date, description, merchant, trip_id
+        """)
+        
+        result = await conn.execute(insert_query, {
+            "account_id": transaction.account_id,
+            "amount": transaction.amount,
+            "transaction_type": transaction.transaction_type,
+            "category": transaction.category,
+            "transaction_date": transaction.transaction_date,
+            "description": transaction.description,
+            "merchant": transaction.merchant,
+            "trip_id": transaction.trip_id,
+            "user_id": current_user["user_id"]
+        })
+        row = result.fetchone()
+        await conn.run_sync(apply_transaction_delta, row[1], row[2], row[5])
+        await commit_ledger_changes(conn)
+        
+        return TransactionResponse(
+            transaction_id=row[0],
+            account_id=row[1],
+            amount=float(row[2]),
+            transaction_type=row[3],
+            category=row[4],
+            transaction_date=row[5],
+            description=row[6],
+            merchant=row[7] if row[7] else None,
+            trip_id=row[8] if row[8] else None
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("", response_model=list[TransactionResponse])
+def encode_transaction_cursor(transaction_date: date, transaction_id: int) -> str:
+    """Opaque keyset cursor for the position after (transaction_date, transaction_id)."""
+    raw = f"{transaction_date.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_transaction_cursor(cursor: str) -> Tuple[date, int]:
+    """Inverse of encode_transaction_cursor. Raises 400 for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_date, cursor_id = raw.split("|")
+        return date.fromisoformat(cursor_date), int(cursor_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+TRANSACTION_SELECT_SQL = """
+    SELECT 
+        t.transaction_id, 
+        t.account_id, 
+        t.amount, 
+        t.transaction_type, 
+        t.category, 
+        t.transaction_date, 
+        t.description, 
+        t.merchant, 
+        t.trip_id,
+        a.account_name,
+        a.currency_code
+    FROM transactions.ledger t
+    LEFT JOIN accounts.list a ON t.account_id = a.account_id
+"""
+
+TRANSACTION_COLUMNS = [
+    "transaction_id", "account_id", "amount", "transaction_type", "category", "transaction_date",
+    "description", "merchant", "trip_id", "account_name", "currency_code"
+]
+
+
+def build_transaction_filters(
+    user_id: str,
+    account_id: Optional[int] = None,
+    transaction_type: Optional[str] = None,
+    trip_id: Optional[int] = None,
+    merchant: Optional[str] = None,
+    category: Optional[str] = None,
+    currency_code: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    has_trip: Optional[bool] = None
+) -> Tuple[list, dict]:
+    """WHERE conditions and parameters for TRANSACTION_SELECT_SQL shared by the list and export endpoints."""
+    params = {"user_id": user_id}
+    conditions = ["t.user_id = :user_id"]  # Always filter by user_id
+    
+    if account_id:
+        conditions.append("t.account_id = :account_id")
+        params["account_id"] = account_id
+    
+    if transaction_type:
+        if transaction_type not in ['income', 'expense', 'transfer']:
+            raise HTTPException(status_code=400, detail="transaction_type must be: income, expense, or transfer")
+        conditions.append("t.transaction_type = :transaction_type")
+        params["transaction_type"] = transaction_type
+    
+    if trip_id:
+        conditions.append("t.trip_id = :trip_id")
+        params["trip_id"] = trip_id
+    
+    if has_trip is not None:
+        conditions.append("t.trip_id IS NOT NULL" if has_trip else "t.trip_id IS NULL")
+    
+    if merchant:
+        conditions.append("t.merchant ILIKE :merchant")
+        params["merchant"] = f"%{merchant}%"
+    
+    if category:
+        conditions.append("t.category = :category")
+        params["category"] = category
+    
+    if currency_code:
+        conditions.append("a.currency_code = :currency_code")
+        params["currency_code"] = currency_code
+    
+    if start_date:
+        conditions.append("t.transaction_date >= :start_date")
+        params["start_date"] = start_date
+    
+    if end_date:
+        conditions.append("t.transaction_date <= :end_date")
+        params["end_date"] = end_date
+    
+    return conditions, params
+
+
+@router.get("", response_model=TransactionPageResponse)
 async def get_transactions(
     account_id: Optional[int] = Query(None, description="Filter by account ID"),
     transaction_type: Optional[str] = Query(None, description="Filter by transaction type (income, expense, transfer)"),
     trip_id: Optional[int] = Query(None, description="Filter by trip ID (for expense transactions)"),
+    has_trip: Optional[bool] = Query(None, description="Only transactions linked (true) or not linked (false) to a trip"),
     merchant: Optional[str] = Query(None, description="Filter by merchant (for expense transactions)"),
     category: Optional[str] = Query(None, description="Filter by category"),
     currency_code: Optional[str] = Query(None, description="Filter by currency code"),
     start_date: Optional[date] = Query(None, description="Filter by start date (inclusive)"),
     end_date: Optional[date] = Query(None, description="Filter by end date (inclusive)"),
-    current_user: dict = Depends(get_current_user)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
-    """Get all transactions for the current user, optionally filtered by account, transaction_type, trip_id, merchant, category, currency_code, or date range."""
+    """
+    Get one page of the current user's transactions, newest first, optionally filtered by account,
+    transaction_type, trip_id, has_trip, merchant, category, currency_code, or date range.
+    Pages are keyed on (transaction_date, transaction_id), so every page costs the same as the first.
+    """
     try:
-        query = """
-            SELECT 
-                t.transaction_id, 
-                t.account_id, 
-                t.amount, 
-                t.transaction_type, 
-                t.category, 
-                t.transaction_date, 
-                t.description, 
-                t.merchant, 
-                t.trip_id,
-                a.account_name,
-                a.currency_code
-            FROM transactions.ledger t
-            LEFT JOIN accounts.list a ON t.account_id = a.account_id
-        """
-        params = {"user_id": current_user["user_id"]}
-        conditions = ["t.user_id = :user_id"]  # Always filter by user_id
-        
-        if account_id:
-            conditions.append("t.account_id = :account_id")
-            params["account_id"] = account_id
-        
-        if transaction_type:
-            if transaction_type not in ['income', 'expense', 'transfer']:
-                raise HTTPException(status_code=400, detail="transaction_type must be: income, expense, or transfer")
-            conditions.append("t.transaction_type = :transaction_type")
-            params["transaction_type"] = transaction_type
-        
-        if trip_id:
-            conditions.append("t.trip_id = :trip_id")
-            params["trip_id"] = trip_id
-        
-        if merchant:
-            conditions.append("t.merchant ILIKE :merchant")
-            params["merchant"] = f"%{merchant}%"
-        
-        if category:
-            conditions.append("t.category = :category")
-            params["category"] = category
-        
-        if currency_code:
-            conditions.append("a.currency_code = :currency_code")
-            params["currency_code"] = currency_code
+        query = TRANSACTION_SELECT_SQL
+        conditions, params = build_transaction_filters(
+            current_user["user_id"], account_id, transaction_type, trip_id,
+            merchant, category, currency_code, start_date, end_date, has_trip
+        )
         
-        if start_date:
-            conditions.append("t.transaction_date >= :start_date")
-            params["start_date"] = start_date
-        
-        if end_date:
-            conditions.append("t.transaction_date <= :end_date")
-            params["end_date"] = end_date
+        if cursor:
+            params["cursor_date"], params["cursor_id"] = decode_transaction_cursor(cursor)
+            conditions.append("(t.transaction_date, t.transaction_id) < (:cursor_date, :cursor_id)")
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         
-        query += " ORDER BY t.transaction_date DESC, t.transaction_id DESC"
+        # One extra row tells whether another page follows
+        query += " ORDER BY t.transaction_date DESC, t.transaction_id DESC LIMIT :limit"
+        params["limit"] = limit + 1
+        
+        result = await conn.execute(text(query), params)
+        transactions = []
+        for row in result:
+            transactions.append(TransactionResponse(
+                transaction_id=row[0],
+                account_id=row[1],
+                amount=float(row[2]),
+                transaction_type=row[3],
+                category=row[4],
+                transaction_date=row[5],
+                description=row[6],
+                merchant=row[7] if row[7] else None,
+                trip_id=row[8] if row[8] else None,
+                account_name=row[9] if row[9] else None,
+                currency_code=row[10] if row[10] else None
+            ))
+        
+        next_cursor = None
+        if len(transactions) > limit:
+            transactions = transactions[:limit]
+            last = transactions[-1]
+            next_cursor = encode_transaction_cursor(last.transaction_date, last.transaction_id)
         
-        with engine.connect() as conn:
-            result = conn.execute(text(query), params)
-            transactions = []
-            for row in result:
-                transactions.append(TransactionResponse(
-                    transaction_id=row[0],
-                    account_id=row[1],
-                    amount=float(row[2]),
-                    transaction_type=row[3],
-                    category=row[4],
-                    transaction_date=row[5],
-                    description=row[6],
-                    merchant=row[7] if row[7] else None,
-                    trip_id=row[8] if row[8] else None,
-                    account_name=row[9] if row[9] else None,
-                    currency_code=row[10] if row[10] else None
-                ))
-            return transactions
+        return TransactionPageResponse(items=transactions, next_cursor=next_cursor)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _export_json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+async def stream_transaction_export(query: str, params: dict, export_format: str):
+    """
+    Yield the export body in chunks of EXPORT_BATCH_SIZE rows, read from a server-side cursor
+    so memory stays flat however large the ledger is. Uses its own connection because the
+    body is produced after the handler has returned.
+    """
+    async with async_engine.connect() as conn:
+        result = await conn.stream(text(query), params)
+        
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(TRANSACTION_COLUMNS)
+            yield buffer.getvalue()
+        
+        async for batch in result.partitions(EXPORT_BATCH_SIZE):
+            if export_format == 'csv':
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(batch)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(TRANSACTION_COLUMNS, row)), default=_export_json_default) + "\n"
+                    for row in batch
+                )
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = Query('ndjson', description="Export format: ndjson or csv"),
+    account_id: Optional[int] = Query(None, description="Filter by account ID"),
+    transaction_type: Optional[str] = Query(None, description="Filter by transaction type (income, expense, transfer)"),
+    trip_id: Optional[int] = Query(None, description="Filter by trip ID (for expense transactions)"),
+    has_trip: Optional[bool] = Query(None, description="Only transactions linked (true) or not linked (false) to a trip"),
+    merchant: Optional[str] = Query(None, description="Filter by merchant (for expense transactions)"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    currency_code: Optional[str] = Query(None, description="Filter by currency code"),
+    start_date: Optional[date] = Query(None, description="Filter by start date (inclusive)"),
+    end_date: Optional[date] = Query(None, description="Filter by end date (inclusive)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream all of the current user's matching transactions, newest first, as NDJSON or CSV."""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be: ndjson or csv")
+    
+    conditions, params = build_transaction_filters(
+        current_user["user_id"], account_id, transaction_type, trip_id,
+        merchant, category, currency_code, start_date, end_date, has_trip
+    )
+    query = TRANSACTION_SELECT_SQL + " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY t.transaction_date DESC, t.transaction_id DESC"
+    
+    return StreamingResponse(
+        stream_transaction_export(query, params, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'}
+    )
+
+
 @router.get("/categories", response_model=dict)
 async def get_categories():
     """Get available expense and income categories."""
@@ -243,137 +391,141 @@ async def get_categories():
 async def update_transaction(
     transaction_id: int, 
     transaction_update: TransactionUpdateRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Update an existing transaction (only if owned by current user). Cannot change transaction_type or account_id."""
     try:
         # First check if transaction exists and belongs to user
         check_query = text("""
-            SELECT transaction_id, transaction_type, account_id 
+            SELECT transaction_id, transaction_type, account_id, transaction_date 
             FROM transactions.ledger 
             WHERE transaction_id = :transaction_id AND user_id = :user_id
         """)
-        with engine.connect() as conn:
-            existing = conn.execute(check_query, {
-                "transaction_id": transaction_id,
-                "user_id": current_user["user_id"]
-            }).fetchone()
-            if not existing:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Transaction ID {transaction_id} not found or you don't have permission"
-                )
-            
-            existing_type = existing[1]
-            
-            # Build update query dynamically
-            updates = []
-            params = {"transaction_id": transaction_id}
-            
-            if transaction_update.amount is not None:
-                # Allow 0.00 for Initial Balance transactions, otherwise require != 0
-                existing_category_query = text("SELECT category FROM transactions.ledger WHERE transaction_id = :transaction_id")
-                existing_category = conn.execute(existing_category_query, {"transaction_id": transaction_id}).fetchone()
-                is_initial_balance = (existing_category and existing_category[0] == 'Initial Balance') or (transaction_update.category == 'Initial Balance')
-                
-                # Validation based on transaction type:
-                # - Expenses: can be negative (or zero for Initial Balance)
-                # - Income: must be positive (or zero for Initial Balance)
-                # - Transfers: can be negative or positive (depending on direction)
-                if transaction_update.amount == 0 and not is_initial_balance:
-                    raise HTTPException(status_code=400, detail="Amount must not be zero (except for Initial Balance transactions)")
-                
-                if existing_type == 'income' and transaction_update.amount < 0:
-                    raise HTTPException(status_code=400, detail="Income transactions cannot have negative amounts")
-                
-                # Expenses and transfers can have negative amounts (expenses are typically negative)
-                # No additional validation needed for expenses/transfers
-                
-                updates.append("amount = :amount")
-                params["amount"] = transaction_update.amount
-            
-            if transaction_update.category is not None:
-                new_category = transaction_update.category.strip() if transaction_update.category else None
-                # If changing to "Initial Balance", check if one already exists for this account
-                if new_category == 'Initial Balance':
-                    existing_account_id = existing[2]  # account_id from check_query
-                    check_existing_initial = text("""
-                        SELECT transaction_id 
-                        FROM transactions.ledger 
-                        WHERE account_id = :account_id 
-                        AND category = 'Initial Balance'
-                        AND transaction_id != :transaction_id
-                        LIMIT 1
-                    """)
-                    existing_initial = conn.execute(check_existing_initial, {
-                        "account_id": existing_account_id,
-                        "transaction_id": transaction_id
-                    }).fetchone()
-                    if existing_initial:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Account already has an Initial Balance transaction. Each account can only have one Initial Balance."
-                        )
-                updates.append("category = :category")
-                params["category"] = new_category
-            
-            if transaction_update.transaction_date is not None:
-                updates.append("transaction_date = :transaction_date")
-                params["transaction_date"] = transaction_update.transaction_date
-            
-            if transaction_update.description is not None:
-                updates.append("description = :description")
-                params["description"] = transaction_update.description.strip() if transaction_update.description else None
-            
-            # Merchant can be set for income and expense
-            if transaction_update.merchant is not None and existing_type in ['income', 'expense']:
-                updates.append("merchant = :merchant")
-                params["merchant"] = transaction_update.merchant.strip() if transaction_update.merchant else None
+        existing = (await conn.execute(check_query, {
+            "transaction_id": transaction_id,
+            "user_id": current_user["user_id"]
+        })).fetchone()
+        if not existing:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Transaction ID {transaction_id} not found or you don't have permission"
+            )
+        
+        existing_type = existing[1]
+        
+        # Build update query dynamically
+        updates = []
+        params = {"transaction_id": transaction_id}
+        
+        if transaction_update.amount is not None:
+            # Allow 0.00 for Initial Balance transactions, otherwise require != 0
+            existing_category_query = text("SELECT category FROM transactions.ledger WHERE transaction_id = :transaction_id")
+            existing_category = (await conn.execute(existing_category_query, {"transaction_id": transaction_id})).fetchone()
+            is_initial_balance = (existing_category and existing_category[0] == 'Initial Balance') or (transaction_update.category == 'Initial Balance')
             
-            # Trip ID only for expenses
-            if transaction_update.trip_id is not None:
-                if existing_type == 'expense':
-                    # Validate trip exists if provided
-                    if transaction_update.trip_id:
-                        check_trip = text("SELECT trip_id FROM trips.list WHERE trip_id = :trip_id")
-                        trip_result = conn.execute(check_trip, {"trip_id": transaction_update.trip_id}).fetchone()
-                        if not trip_result:
-                            raise HTTPException(status_code=404, detail=f"Trip ID {transaction_update.trip_id} does not exist")
-                    updates.append("trip_id = :trip_id")
-                    params["trip_id"] = transaction_update.trip_id
-                else:
-                    raise HTTPException(status_code=400, detail="trip_id can only be set for expense transactions")
+            # Validation based on transaction type:
+            # - Expenses: can be negative (or zero for Initial Balance)
+            # - Income: must be positive (or zero for Initial Balance)
+            # - Transfers: can be negative or positive (depending on direction)
+            if transaction_update.amount == 0 and not is_initial_balance:
+                raise HTTPException(status_code=400, detail="Amount must not be zero (except for Initial Balance transactions)")
             
-            if not updates:
-                raise HTTPException(status_code=400, detail="No fields to update")
+            if existing_type == 'income' and transaction_update.amount < 0:
+                raise HTTPException(status_code=400, detail="Income transactions cannot have negative amounts")
             
-            # Build update query (ensure user_id is in params)
-            params["user_id"] = current_user["user_id"]
-            update_query = text(f"""
-                UPDATE transactions.ledger
-                SET {', '.join(updates)}, updated_at = CURRENT_TIMESTAMP
-                WHERE transaction_id = :transaction_id AND user_id = :user_id
-                RETURNING transaction_id, account_id, amount, transaction_type, category, transaction_date, description, merchant, trip_id
-            """)
+            # Expenses and transfers can have negative amounts (expenses are typically negative)
+            # No additional validation needed for expenses/transfers
             
-            result = conn.execute(update_query, params)
-            conn.commit()
-            row = result.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=500, detail="Failed to update transaction")
-            
-            return TransactionResponse(
-                transaction_id=row[0],
-                account_id=row[1],
-                amount=float(row[2]),
-                transaction_type=row[3],
-                category=row[4],
-                transaction_date=row[5],
-                description=row[6],
-                merchant=row[7] if row[7] else None,
-                trip_id=row[8] if row[8] else None
-            )
+            updates.append("amount = :amount")
+            params["amount"] = transaction_update.amount
+        
+        if transaction_update.category is not None:
+            new_category = transaction_update.category.strip() if transaction_update.category else None
+            # If changing to "Initial Balance", check if one already exists for this account
+            if new_category == 'Initial Balance':
+                existing_account_id = existing[2]  # account_id from check_query
+                check_existing_initial = text("""
+                    SELECT transaction_id 
+                    FROM transactions.ledger 
+                    WHERE account_id = :account_id 
+                    AND category = 'Initial Balance'
+                    AND transaction_id != :transaction_id
+                    LIMIT 1
+                """)
+                existing_initial = (await conn.execute(check_existing_initial, {
+                    "account_id": existing_account_id,
+                    "transaction_id": transaction_id
+                })).fetchone()
+                if existing_initial:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Account already has an Initial Balance transaction. Each account can only have one Initial Balance."
+                    )
+            updates.append("category = :category")
+            params["category"] = new_category
+        
+        if transaction_update.transaction_date is not None:
+            updates.append("transaction_date = :transaction_date")
+            params["transaction_date"] = transaction_update.transaction_date
+        
+        if transaction_update.description is not None:
+            updates.append("description = :description")
+            params["description"] = transaction_update.description.strip() if transaction_update.description else None
+        
+        # Merchant can be set for income and expense
+        if transaction_update.merchant is not None and existing_type in ['income', 'expense']:
+            updates.append("merchant = :merchant")
+            params["merchant"] = transaction_update.merchant.strip() if transaction_update.merchant else None
+        
+        # Trip ID only for expenses
+        if transaction_update.trip_id is not None:
+            if existing_type == 'expense':
+                # Validate trip exists if provided
+                if transaction_update.trip_id:
+                    check_trip = text("SELECT trip_id FROM trips.list WHERE trip_id = :trip_id")
+                    trip_result = (await conn.execute(check_trip, {"trip_id": transaction_update.trip_id})).fetchone()
+                    if not trip_result:
+                        raise HTTPException(status_code=404, detail=f"Trip ID {transaction_update.trip_id} does not exist")
+                updates.append("trip_id = :trip_id")
+                params["trip_id"] = transaction_update.trip_id
+            else:
+                raise HTTPException(status_code=400, detail="trip_id can only be set for expense transactions")
+        
+        if not updates:
+            raise HTTPException(status_code=400, detail="No fields to update")
+        
+        # Build update query (ensure user_id is in params)
+        params["user_id"] = current_user["user_id"]
+        update_query = text(f"""
+            UPDATE transactions.ledger
+            SET {', '.join(updates)}, updated_at = CURRENT_TIMESTAMP
+            WHERE transaction_id = :transaction_id AND user_id = :user_id
+            RETURNING transaction_id, account_id, amount, transaction_type, category, transaction_date, description, merchant, trip_id
+        """)
+        
+        result = await conn.execute(update_query, params)
+        row = result.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=500, detail="Failed to update transaction")
+        
+        # Amount or date changes can move the account balance and its latest date
+        if "amount" in params or "transaction_date" in params:
+            await conn.run_sync(refresh_account_balances, [row[1]], since=min(existing[3], row[5]))
+        await commit_ledger_changes(conn)
+        
+        return TransactionResponse(
+            transaction_id=row[0],
+            account_id=row[1],
+            amount=float(row[2]),
+            transaction_type=row[3],
+            category=row[4],
+            transaction_date=row[5],
+            description=row[6],
+            merchant=row[7] if row[7] else None,
+            trip_id=row[8] if row[8] else None
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -381,7 +533,7 @@ async def update_transaction(
 
 
 @router.delete("/{transaction_id}")
-async def delete_transaction(transaction_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_transaction(transaction_id: int, current_user: dict = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Delete a transaction (only if owned by current user). If it's part of a transfer, delete both linked transactions."""
     try:
         # Check if transaction exists and belongs to user, get transfer_link_id if it's a transfer
@@ -390,59 +542,67 @@ async def delete_transaction(transaction_id: int, current_user: dict = Depends(g
             FROM transactions.ledger 
             WHERE transaction_id = :transaction_id AND user_id = :user_id
         """)
-        with engine.connect() as conn:
-            existing = conn.execute(check_query, {
+        existing = (await conn.execute(check_query, {
+            "transaction_id": transaction_id,
+            "user_id": current_user["user_id"]
+        })).fetchone()
+        if not existing:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Transaction ID {transaction_id} not found or you don't have permission"
+            )
+        
+        transfer_link_id = existing[1]
+        transaction_type = existing[2]
+        
+        # If this is a transfer transaction (has transfer_link_id), delete both linked transactions
+        if transfer_link_id is not None:
+            delete_query = text("""
+                DELETE FROM transactions.ledger 
+                WHERE transfer_link_id = :transfer_link_id AND user_id = :user_id
+                RETURNING transaction_id, account_id, transaction_date
+            """)
+            result = await conn.execute(delete_query, {
+                "transfer_link_id": transfer_link_id,
+                "user_id": current_user["user_id"]
+            })
+            deleted_transactions = result.fetchall()
+            
+            if not deleted_transactions:
+                raise HTTPException(status_code=500, detail="Failed to delete transfer transactions")
+            
+            await conn.run_sync(
+                refresh_account_balances,
+                [row[1] for row in deleted_transactions],
+                since=min(row[2] for row in deleted_transactions)
+            )
+            await commit_ledger_changes(conn)
+            
+            deleted_ids = [row[0] for row in deleted_transactions]
+            return {
+                "message": f"Transfer deleted successfully. Deleted transaction IDs: {deleted_ids}",
+                "deleted_transaction_ids": deleted_ids
+            }
+        else:
+            # Regular transaction (not a transfer), just delete it
+            delete_query = text("""
+                DELETE FROM transactions.ledger 
+                WHERE transaction_id = :transaction_id AND user_id = :user_id
+                RETURNING transaction_id, account_id, transaction_date
+            """)
+            result = await conn.execute(delete_query, {
                 "transaction_id": transaction_id,
                 "user_id": current_user["user_id"]
-            }).fetchone()
-            if not existing:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Transaction ID {transaction_id} not found or you don't have permission"
-                )
+            })
+            deleted = result.fetchone()
             
-            transfer_link_id = existing[1]
-            transaction_type = existing[2]
+            if not deleted:
+                raise HTTPException(status_code=500, detail="Failed to delete transaction")
             
-            # If this is a transfer transaction (has transfer_link_id), delete both linked transactions
-            if transfer_link_id is not None:
-                delete_query = text("""
-                    DELETE FROM transactions.ledger 
-                    WHERE transfer_link_id = :transfer_link_id AND user_id = :user_id
-                    RETURNING transaction_id
-                """)
-                result = conn.execute(delete_query, {
-                    "transfer_link_id": transfer_link_id,
-                    "user_id": current_user["user_id"]
-                })
-                deleted_transactions = result.fetchall()
-                conn.commit()
-                
-                if not deleted_transactions:
-                    raise HTTPException(status_code=500, detail="Failed to delete transfer transactions")
-                
-                deleted_ids = [row[0] for row in deleted_transactions]
-                return {
-                    "message": f"Transfer deleted successfully. Deleted transaction IDs: {deleted_ids}",
-                    "deleted_transaction_ids": deleted_ids
-                }
-            else:
-                # Regular transaction (not a transfer), just delete it
-                delete_query = text("""
-                    DELETE FROM transactions.ledger 
-                    WHERE transaction_id = :transaction_id AND user_id = :user_id
-                    RETURNING transaction_id
-                """)
-                result = conn.execute(delete_query, {
-                    "transaction_id": transaction_id,
-                    "user_id": current_user["user_id"]
-                })
-                conn.commit()
-                
-                if not result.fetchone():
-                    raise HTTPException(status_code=500, detail="Failed to delete transaction")
-                
-                return {"message": f"Transaction ID {transaction_id} deleted successfully"}
+            await conn.run_sync(refresh_account_balances, [deleted[1]], since=deleted[2])
+            await commit_ledger_changes(conn)
+            
+            return {"message": f"Transaction ID {transaction_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
@@ -1,18 +1,154 @@
 """
 Authentication utilities for verifying Supabase JWT tokens.
+
+Tokens are verified locally when possible: HS256 tokens against SUPABASE_JWT_SECRET and
+ES256/RS256 tokens against the project's JWKS, which is cached and refreshed every
+JWKS_REFRESH_SECONDS. Signature, expiry and audience are checked. Tokens that cannot be
+verified locally (no secret configured, unknown signing key) fall back to Supabase's
+/auth/v1/user endpoint.
 """
+import asyncio
+import hashlib
 import os
+import time
+from typing import Optional
 import httpx
+import jwt
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.cache import LRUCache, register_cache
+from app.http_client import get_http_client
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWT_ISSUER = os.getenv("SUPABASE_JWT_ISSUER")  # Optional, e.g. https://<ref>.supabase.co/auth/v1
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+# Minimum gap between refreshes triggered by an unknown key id
+JWKS_MIN_REFRESH_INTERVAL_SECONDS = 30.0
+
+ASYMMETRIC_ALGORITHMS = ["ES256", "RS256"]
+
+# Verified tokens are reused for at most this long, and never past their exp
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+
+token_cache = register_cache(LRUCache("tokens", TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS))
+_inflight_verifications = {}
 
 security = HTTPBearer()
 
+_jwks_keys = {}
+_jwks_fetched_at = 0.0
+_jwks_lock = None
+
+
+async def _fetch_jwks() -> dict:
+    """Download the project's signing keys as {kid: PyJWK}. Keys PyJWT cannot use are skipped."""
+    client = get_http_client()
+    response = await client.get(f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json", timeout=5.0)
+    response.raise_for_status()
+    keys = {}
+    for key_data in response.json().get("keys", []):
+        try:
+            key = jwt.PyJWK(key_data)
+        except jwt.PyJWKError:
+            continue
+        keys[key.key_id] = key
+    return keys
+
+
+async def get_signing_key(kid: Optional[str]) -> Optional[jwt.PyJWK]:
+    """
+    Cached JWKS lookup. The set is refreshed when older than JWKS_REFRESH_SECONDS, or
+    (at most every JWKS_MIN_REFRESH_INTERVAL_SECONDS) when a token names an unknown key.
+    Returns None when the key cannot be found or the JWKS is unreachable.
+    """
+    global _jwks_keys, _jwks_fetched_at, _jwks_lock
+    if not SUPABASE_URL:
+        return None
+
+    age = time.monotonic() - _jwks_fetched_at
+    if kid in _jwks_keys and age < JWKS_REFRESH_SECONDS:
+        return _jwks_keys[kid]
+    if kid not in _jwks_keys and age < JWKS_MIN_REFRESH_INTERVAL_SECONDS:
+        return None
+
+    if _jwks_lock is None:
+        _jwks_lock = asyncio.Lock()
+    async with _jwks_lock:
+        # Another request may have refreshed the set while this one waited
+        if time.monotonic() - _jwks_fetched_at >= JWKS_MIN_REFRESH_INTERVAL_SECONDS:
+            try:
+                _jwks_keys = await _fetch_jwks()
+            except (httpx.HTTPError, ValueError):
+                pass  # Keep serving the keys we have; unknown keys fall back to the remote check
+            _jwks_fetched_at = time.monotonic()
+    return _jwks_keys.get(kid)
+
+
+def _claims_to_token_data(claims: dict) -> dict:
+    return {
+        "sub": claims["sub"],
+        "email": claims.get("email"),
+        "user_metadata": claims.get("user_metadata", {}),
+        "app_metadata": claims.get("app_metadata", {}),
+        "raw_user": claims
+    }
+
+
+async def verify_token_locally(token: str) -> Optional[dict]:
+    """
+    Verify a JWT without a network call. Returns None when this process cannot verify the
+    token (no HS256 secret configured, unknown signing key) so the caller can fall back.
+    Raises 401 for tokens that are expired, for another audience, or badly signed.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.DecodeError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            return None
+        key = SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        signing_key = await get_signing_key(header.get("kid"))
+        if signing_key is None:
+            return None
+        key = signing_key.key
+    else:
+        return None
+
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=SUPABASE_JWT_AUDIENCE,
+            issuer=SUPABASE_JWT_ISSUER,
+            options={"require": ["exp", "sub"]}
+        )
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    return _claims_to_token_data(claims)
+
 
 async def verify_token(token: str) -> dict:
+    """
+    Verify a Supabase JWT, locally if possible (see verify_token_locally),
+    otherwise by calling the Supabase API.
+    """
+    token_data = await verify_token_locally(token)
+    if token_data is not None:
+        return token_data
+    return await verify_token_remotely(token)
+
+
+async def verify_token_remotely(token: str) -> dict:
     """
     Verify Supabase JWT token by calling Supabase API.
     This works with both legacy HS256 tokens and new ES256 tokens.
@@ -21,36 +157,36 @@ async def verify_token(token: str) -> dict:
         if not SUPABASE_URL or not SUPABASE_ANON_KEY:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "apikey": SUPABASE_ANON_KEY,
-                    "Authorization": f"Bearer {token}"
-                }
-            )
-            
-            if response.status_code != 200:
-                if response.status_code == 401:
-                    raise HTTPException(status_code=401, detail="Invalid or expired token")
-                error_data = response.json() if response.content else {}
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=error_data.get("message", "Token verification failed")
-                )
-            
-            user_data = response.json()
-            user_id = user_data.get("id")
-            if not user_id:
-                raise HTTPException(status_code=401, detail="Invalid token: no user ID")
-            
-            return {
-                "sub": user_id,
-                "email": user_data.get("email"),
-                "user_metadata": user_data.get("user_metadata", {}),
-                "app_metadata": user_data.get("app_metadata", {}),
-                "raw_user": user_data
+        client = get_http_client()
+        response = await client.get(
+            f"{SUPABASE_URL}/auth/v1/user",
+            headers={
+                "apikey": SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {token}"
             }
+        )
+        
+        if response.status_code != 200:
+            if response.status_code == 401:
+                raise HTTPException(status_code=401, detail="Invalid or expired token")
+            error_data = response.json() if response.content else {}
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=error_data.get("message", "Token verification failed")
+            )
+        
+        user_data = response.json()
+        user_id = user_data.get("id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Invalid token: no user ID")
+        
+        return {
+            "sub": user_id,
+            "email": user_data.get("email"),
+            "user_metadata": user_data.get("user_metadata", {}),
+            "app_metadata": user_data.get("app_metadata", {}),
+            "raw_user": user_data
+        }
     except HTTPException:
         raise
     except httpx.RequestError as e:
@@ -59,13 +195,53 @@ async def verify_token(token: str) -> dict:
         raise HTTPException(status_code=500, detail=f"Token verification error: {str(e)}")
 
 
+def _token_cache_ttl(token: str, token_data: dict) -> float:
+    """Seconds a verification result may be reused: TOKEN_CACHE_TTL_SECONDS capped by the token's exp."""
+    exp = token_data["raw_user"].get("exp")  # Present when verified locally
+    if exp is None:
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            exp = None
+    if exp is None:
+        return TOKEN_CACHE_TTL_SECONDS
+    return min(TOKEN_CACHE_TTL_SECONDS, exp - time.time())
+
+
+async def verify_token_cached(token: str) -> dict:
+    """
+    verify_token behind a TTL cache keyed by the token's SHA-256. Concurrent first-time
+    verifications of the same token share one in-flight verification (shielded, so one
+    cancelled request does not cancel it for the others). Failures are not cached.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
+    task = _inflight_verifications.get(key)
+    if task is None:
+        task = asyncio.ensure_future(verify_token(token))
+        _inflight_verifications[key] = task
+        try:
+            token_data = await asyncio.shield(task)
+        finally:
+            _inflight_verifications.pop(key, None)
+        ttl = _token_cache_ttl(token, token_data)
+        if ttl > 0:
+            token_cache.set(key, token_data, ttl_seconds=ttl)
+        return token_data
+
+    return await asyncio.shield(task)
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     FastAPI dependency to get the current authenticated user.
     Extracts and verifies the JWT token from the Authorization header.
     """
     token = credentials.credentials
-    token_data = await verify_token(token)
+    token_data = await verify_token_cached(token)
     
     return {
         "user_id": token_data["sub"],
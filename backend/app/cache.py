@@ -0,0 +1,172 @@
+"""
+In-process caches.
+
+LRUCache is a small thread-safe LRU map with an optional per-entry TTL and hit/miss
+counters. response_cache holds computed balances/metrics responses keyed by user,
+request parameters and the user's ledger version.
+
+The ledger version is a per-user counter bumped whenever a transaction that wrote to the
+user's ledger or accounts commits. Write paths call mark_ledger_changed (the balance
+store does this for every ledger write) and commit with commit_ledger_changes, which
+bumps the counters once the commit has succeeded. A request that reads the version
+before the bump may cache post-commit data under the old key; that entry is simply never
+hit again.
+
+Versions are per process: with several uvicorn workers, the workers that did not handle a
+write keep serving their cached responses for up to RESPONSE_CACHE_TTL_SECONDS.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+from sqlalchemy import event
+from app.db.database import engine, async_engine
+from app.db.rate_index import rate_index_version
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# Bounds staleness for ledger edits made outside the API (SQL editor, migration scripts)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an entry limit, optional TTL and hit/miss/eviction counters."""
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def values(self) -> list:
+        """Unexpired values, most recently used first (does not count as hits)."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                value for value, expires_at in reversed(self._entries.values())
+                if expires_at is None or expires_at > now
+            ]
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+response_cache = LRUCache("responses", RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+
+_caches = [response_cache]
+
+
+def register_cache(cache: LRUCache) -> LRUCache:
+    """Add a cache to the ones reported by cache_stats()."""
+    _caches.append(cache)
+    return cache
+
+
+def cache_stats() -> list[dict]:
+    return [cache.stats() for cache in _caches]
+
+
+# Per-user ledger versions
+
+_ledger_versions = {}
+_ledger_versions_lock = threading.Lock()
+_PENDING_KEY = "ledger_changed_users"
+
+
+def ledger_version(user_id: str) -> int:
+    """Current ledger version of a user (0 until their first write in this process)."""
+    return _ledger_versions.get(user_id, 0)
+
+
+def mark_ledger_changed(conn, user_ids: Iterable[str]):
+    """Record that the open transaction on `conn` changes these users' ledgers; commit_ledger_changes bumps them."""
+    conn.info.setdefault(_PENDING_KEY, set()).update(user_id for user_id in user_ids if user_id)
+
+
+def response_cache_key(endpoint: str, user_id: str, *params: Hashable) -> tuple:
+    """
+    Key for a cached per-user response. It includes the user's ledger version and the rate
+    index version, so entries computed before a write or a rate change are never hit again.
+    Read the key before computing the response.
+    """
+    return (endpoint, user_id, ledger_version(user_id), rate_index_version()) + params
+
+
+def _bump_ledger_versions(conn):
+    changed = conn.info.pop(_PENDING_KEY, None)
+    if changed:
+        with _ledger_versions_lock:
+            for user_id in changed:
+                _ledger_versions[user_id] = _ledger_versions.get(user_id, 0) + 1
+
+
+async def commit_ledger_changes(conn):
+    """
+    Commit `conn`, then bump the ledger versions recorded on it. SQLAlchemy's commit event fires
+    before the driver commits, so bumping there would let a concurrent request cache pre-commit
+    data under the new version. A failed commit raises and bumps nothing.
+    """
+    await conn.commit()
+    _bump_ledger_versions(conn)
+
+
+def _discard_ledger_changes(conn):
+    conn.info.pop(_PENDING_KEY, None)
+
+
+def _discard_uncommitted_ledger_changes(dbapi_connection, connection_record):
+    # Connections closed without commit are rolled back by the pool
+    connection_record.info.pop(_PENDING_KEY, None)
+
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "rollback", _discard_ledger_changes)
+    event.listen(_engine.pool, "checkin", _discard_uncommitted_ledger_changes)
@@ -0,0 +1,101 @@
+"""
+End-of-day balance rollups in balances.snapshot.
+
+Each row holds an account's balance at the end of a day on which it had ledger activity,
+so the balance at any date is the latest snapshot on or before it. Reads add the ledger
+rows dated after that snapshot, which keeps them correct for accounts whose rollup has
+not run yet (the delta is empty once snapshots are current).
+
+Ledger writes recompute only the suffix of an account's snapshots from the earliest
+affected date onwards; rollup_snapshots rebuilds everything.
+
+The balance_eur/usd/... columns are left NULL: conversions use the rate in effect at read time.
+"""
+from datetime import date, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import text
+
+
+# Balance of each account in accounts.list as of :as_of_date. Usable as a CTE body;
+# callers append their own filters on `a` (for example a user filter).
+AS_OF_BALANCES_SQL = """
+    SELECT
+        a.account_id,
+        COALESCE(s.amount, 0) + COALESCE(delta.amount, 0) AS amount,
+        GREATEST(s.balance_date, delta.balance_date) AS balance_date
+    FROM accounts.list a
+    LEFT JOIN LATERAL (
+        SELECT s.amount, s.balance_date
+        FROM balances.snapshot s
+        WHERE s.account_id = a.account_id AND s.balance_date <= :as_of_date
+        ORDER BY s.balance_date DESC
+        LIMIT 1
+    ) s ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT SUM(t.amount) AS amount, MAX(t.transaction_date) AS balance_date
+        FROM transactions.ledger t
+        WHERE t.account_id = a.account_id
+          AND t.transaction_date <= :as_of_date
+          AND t.transaction_date > COALESCE(s.balance_date, '-infinity'::date)
+    ) delta ON TRUE
+    WHERE (s.balance_date IS NOT NULL OR delta.balance_date IS NOT NULL)
+"""
+
+
+def refresh_snapshots(conn, account_ids: Iterable[int], since: Optional[date] = None):
+    """
+    Recompute the snapshots of the given accounts dated on or after `since`
+    (all of them when since is None). Earlier snapshots are left untouched.
+    """
+    account_ids = sorted(set(account_ids))
+    if not account_ids:
+        return
+    since = date.fromisoformat(str(since)) if since else date.min
+
+    conn.execute(text("""
+        DELETE FROM balances.snapshot
+        WHERE account_id = ANY(:account_ids) AND balance_date >= :since
+    """), {"account_ids": account_ids, "since": since})
+
+    # Opening balance for the suffix is the as-of balance on the day before `since`
+    query = text(f"""
+        WITH opening AS (
+            {AS_OF_BALANCES_SQL}
+              AND a.account_id = ANY(:account_ids)
+        ),
+        daily AS (
+            SELECT account_id, transaction_date, SUM(amount) AS day_amount
+            FROM transactions.ledger
+            WHERE account_id = ANY(:account_ids) AND transaction_date >= :since
+            GROUP BY account_id, transaction_date
+        )
+        INSERT INTO balances.snapshot (balance_date, account_id, amount)
+        SELECT
+            d.transaction_date,
+            d.account_id,
+            COALESCE(o.amount, 0) + SUM(d.day_amount) OVER (
+                PARTITION BY d.account_id
+                ORDER BY d.transaction_date
+            )
+        FROM daily d
+        LEFT JOIN opening o ON o.account_id = d.account_id
+    """)
+    conn.execute(query, {
+        "account_ids": account_ids,
+        "since": since,
+        "as_of_date": since - timedelta(days=1) if since > date.min else since
+    })
+
+
+def rollup_snapshots(conn, user_id: Optional[str] = None, since: Optional[date] = None) -> int:
+    """Rebuild snapshots for every account (or every account of one user) from `since` onwards."""
+    if user_id:
+        result = conn.execute(
+            text("SELECT account_id FROM accounts.list WHERE user_id = :user_id"),
+            {"user_id": user_id}
+        )
+    else:
+        result = conn.execute(text("SELECT account_id FROM accounts.list"))
+    account_ids = [row[0] for row in result]
+    refresh_snapshots(conn, account_ids, since=since)
+    return len(account_ids)
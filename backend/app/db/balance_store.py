@@ -0,0 +1,177 @@
+"""
+Maintained per-account current balances (balances.current).
+
+Every ledger write path calls into this module inside its own transaction so the
+stored balance stays in step with transactions.ledger. GET /api/balances (without
+a date) then reads one row per account instead of re-aggregating the whole ledger.
+
+Inserts are applied as deltas. Updates and deletes recompute the affected accounts
+from the ledger, because they can move an account's last transaction date backwards.
+Both also recompute the affected suffix of the account's end-of-day snapshots and bump
+the owners' ledger versions once the caller commits with commit_ledger_changes, which
+invalidates their cached responses.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import text
+from app.db.balance_snapshots import refresh_snapshots
+from app.cache import mark_ledger_changed
+
+
+def mark_accounts_changed(conn, account_ids: Iterable[int]):
+    """Bump the ledger version of the users owning these accounts when `conn` commits (commit_ledger_changes)."""
+    result = conn.execute(
+        text("SELECT DISTINCT user_id FROM accounts.list WHERE account_id = ANY(:account_ids)"),
+        {"account_ids": sorted(set(account_ids))}
+    )
+    mark_ledger_changed(conn, [row[0] for row in result])
+
+
+def apply_transaction_delta(conn, account_id: int, amount: float, transaction_date: date):
+    """Add a newly inserted ledger row to the stored balance of its account."""
+    apply_transaction_deltas(conn, [(account_id, amount, transaction_date)])
+
+
+def apply_transaction_deltas(conn, rows: Iterable[Tuple[int, float, date]]):
+    """
+    Add newly inserted ledger rows, given as (account_id, amount, transaction_date), to the store.
+    Rows are summed per account first so a bulk import costs one statement per account.
+    """
+    deltas = defaultdict(Decimal)
+    latest_dates = {}
+    earliest_dates = {}
+    for account_id, amount, transaction_date in rows:
+        deltas[account_id] += Decimal(str(amount))
+        # Dates arrive as date objects or ISO strings (CSV import); both compare correctly as ISO text
+        if account_id not in latest_dates or str(transaction_date) > str(latest_dates[account_id]):
+            latest_dates[account_id] = transaction_date
+        if account_id not in earliest_dates or str(transaction_date) < str(earliest_dates[account_id]):
+            earliest_dates[account_id] = transaction_date
+
+    if not deltas:
+        return
+
+    mark_accounts_changed(conn, deltas.keys())
+
+    update_query = text("""
+        UPDATE balances.current
+        SET amount = amount + :amount,
+            balance_date = GREATEST(balance_date, CAST(:balance_date AS DATE)),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE account_id = :account_id
+        RETURNING account_id
+    """)
+
+    # Row locks on balances.current are held until commit: take them in account_id order, as
+    # refresh_account_balances does, so an A->B and a B->A transfer cannot deadlock
+    missing = []
+    for account_id, amount in sorted(deltas.items()):
+        updated = conn.execute(update_query, {
+            "account_id": account_id,
+            "amount": amount,
+            "balance_date": latest_dates[account_id]
+        }).fetchone()
+        if not updated:
+            missing.append(account_id)
+
+    # No stored row yet (new account, or store not backfilled): the ledger already
+    # contains the new rows within this transaction, so recompute from it.
+    if missing:
+        refresh_account_balances(conn, missing, since=None)
+
+    accounts_by_since = defaultdict(list)
+    for account_id, since in sorted(earliest_dates.items()):
+        if account_id not in missing:
+            accounts_by_since[str(since)].append(account_id)
+    for since, account_ids in sorted(accounts_by_since.items()):
+        refresh_snapshots(conn, account_ids, since=since)
+
+
+def refresh_account_balances(conn, account_ids: Iterable[int], since: Optional[date] = None):
+    """
+    Recompute the stored balance of the given accounts from transactions.ledger, and their
+    snapshots from `since` (the earliest date touched by the change) onwards.
+    """
+    account_ids = sorted(set(account_ids))
+    if not account_ids:
+        return
+
+    query = text("""
+        INSERT INTO balances.current (account_id, amount, balance_date, updated_at)
+        SELECT
+            a.account_id,
+            COALESCE(SUM(t.amount), 0),
+            MAX(t.transaction_date),
+            CURRENT_TIMESTAMP
+        FROM accounts.list a
+        LEFT JOIN transactions.ledger t ON t.account_id = a.account_id
+        WHERE a.account_id = ANY(:account_ids)
+        GROUP BY a.account_id
+        ON CONFLICT (account_id) DO UPDATE
+        SET amount = EXCLUDED.amount,
+            balance_date = EXCLUDED.balance_date,
+            updated_at = EXCLUDED.updated_at
+    """)
+    conn.execute(query, {"account_ids": account_ids})
+    refresh_snapshots(conn, account_ids, since=since)
+    mark_accounts_changed(conn, account_ids)
+
+
+def rebuild_balance_store(conn, user_id: Optional[str] = None) -> int:
+    """Recompute the store from the ledger for every account (or every account of one user)."""
+    if user_id:
+        result = conn.execute(
+            text("SELECT account_id FROM accounts.list WHERE user_id = :user_id"),
+            {"user_id": user_id}
+        )
+    else:
+        result = conn.execute(text("SELECT account_id FROM accounts.list"))
+    account_ids = [row[0] for row in result]
+    refresh_account_balances(conn, account_ids)
+    return len(account_ids)
+
+
+def check_balance_store(conn, user_id: Optional[str] = None) -> list[dict]:
+    """Compare the store against the ledger and return one entry per inconsistent account."""
+    user_filter = ""
+    params = {}
+    if user_id:
+        user_filter = "AND a.user_id = :user_id"
+        params["user_id"] = user_id
+
+    query = text(f"""
+        WITH ledger_balances AS (
+            SELECT account_id, SUM(amount) AS amount, MAX(transaction_date) AS balance_date
+            FROM transactions.ledger
+            GROUP BY account_id
+        )
+        SELECT
+            a.account_id,
+            a.account_name,
+            c.amount AS stored_amount,
+            l.amount AS ledger_amount,
+            c.balance_date AS stored_date,
+            l.balance_date AS ledger_date
+        FROM accounts.list a
+        LEFT JOIN balances.current c ON c.account_id = a.account_id
+        LEFT JOIN ledger_balances l ON l.account_id = a.account_id
+        WHERE (c.account_id IS NULL AND l.account_id IS NOT NULL
+               OR COALESCE(c.amount, 0) <> COALESCE(l.amount, 0)
+               OR c.balance_date IS DISTINCT FROM l.balance_date)
+          {user_filter}
+        ORDER BY a.account_id
+    """)
+
+    mismatches = []
+    for row in conn.execute(query, params):
+        mismatches.append({
+            "account_id": row[0],
+            "account_name": row[1],
+            "stored_amount": float(row[2]) if row[2] is not None else None,
+            "ledger_amount": float(row[3]) if row[3] is not None else None,
+            "stored_date": row[4],
+            "ledger_date": row[5]
+        })
+    return mismatches
@@ -1,6 +1,12 @@
 import os
+import time
 from pathlib import Path
-from sqlalchemy import create_engine
+from typing import AsyncIterator, Optional
+import pandas as pd
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
 from dotenv import load_dotenv
 from urllib.parse import urlparse, urlunparse, quote_plus
 
@@ -71,12 +77,120 @@ else:
         f"Checked locations: {[str(p) for p in env_paths]}"
     )
 
-engine = create_engine(
-    connection_string,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+# Connection pool settings (shared by both engines; each engine has its own pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+# Seconds after which a connection is replaced on checkout (-1 keeps connections indefinitely)
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1"))
+# "always" tests every connection with a round-trip on checkout; "never" skips it
+# (pair it with DB_POOL_RECYCLE_SECONDS below the server/pooler idle timeout)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").lower()
+# Server-side statement timeout in milliseconds, set for each transaction (0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+if DB_POOL_PRE_PING not in ("always", "never"):
+    raise ValueError("DB_POOL_PRE_PING must be 'always' or 'never'")
+
+POOL_OPTIONS = {
+    "pool_pre_ping": DB_POOL_PRE_PING == "always",
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+    "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+}
+
+
+def _set_statement_timeout(conn):
+    # SET LOCAL at the start of every transaction: behind Supabase's transaction-mode pooler
+    # consecutive transactions can run on different server connections, so a session-level SET
+    # would not stick, and the pooler rejects startup options. Issued on the driver's cursor,
+    # which opens the transaction the rest of its statements run in.
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+    finally:
+        cursor.close()
+
+
+engine = create_engine(connection_string, **POOL_OPTIONS)
+
+# Async engine used by the API request handlers (psycopg 3). The synchronous engine above
+# remains for migration scripts and benchmarks.
+async_connection_string = make_url(connection_string).set(drivername="postgresql+psycopg")
+
+async_engine = create_async_engine(
+    async_connection_string,
+    **POOL_OPTIONS,
+    # Supabase's transaction-mode pooler (port 6543) cannot keep server-side prepared statements
+    connect_args={"prepare_threshold": None}
 )
 
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    event.listen(engine, "begin", _set_statement_timeout)
+    event.listen(async_engine.sync_engine, "begin", _set_statement_timeout)
 
+# Time request handlers spend waiting for a pooled connection (see get_db)
+_checkout_waits = {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
 
+
+def pool_status(target_engine) -> dict:
+    """Size, checked-out, idle and overflow connections of an engine's pool."""
+    pool = target_engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # Negative while the pool has not yet opened pool_size connections
+        "overflow": max(pool.overflow(), 0),
+        "status": pool.status()
+    }
+
+
+def pool_stats() -> dict:
+    """Pool status of both engines plus connection wait times of request handlers."""
+    checkouts = _checkout_waits["checkouts"]
+    return {
+        "settings": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout_seconds": DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle_seconds": DB_POOL_RECYCLE_SECONDS,
+            "pre_ping": DB_POOL_PRE_PING,
+            "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS
+        },
+        "async_pool": pool_status(async_engine.sync_engine),
+        "sync_pool": pool_status(engine),
+        "request_checkouts": {
+            **_checkout_waits,
+            "wait_seconds_avg": round(_checkout_waits["wait_seconds_total"] / checkouts, 6) if checkouts else 0.0
+        }
+    }
+
+
+async def read_sql(conn: AsyncConnection, query, params: Optional[dict] = None) -> pd.DataFrame:
+    """pd.read_sql over an async connection (pandas only drives synchronous connections)."""
+    return await conn.run_sync(lambda sync_conn: pd.read_sql(query, sync_conn, params=params or {}))
+
+
+async def get_db() -> AsyncIterator[AsyncConnection]:
+    """
+    FastAPI dependency providing a request-scoped async connection.
+    Work that is not committed by the handler is rolled back when the request ends.
+    """
+    started = time.perf_counter()
+    try:
+        conn = await async_engine.connect()
+    except PoolTimeoutError:
+        _checkout_waits["timeouts"] += 1
+        raise
+    waited = time.perf_counter() - started
+    _checkout_waits["checkouts"] += 1
+    _checkout_waits["wait_seconds_total"] += waited
+    _checkout_waits["wait_seconds_max"] = max(_checkout_waits["wait_seconds_max"], waited)
+    
+    try:
+        yield conn
+    finally:
+        await conn.close()
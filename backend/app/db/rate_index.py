@@ -0,0 +1,118 @@
+"""
+In-process as-of index over exchange_rates.rate_history.
+
+The whole rate history is small (one row per currency pair per day), so it is loaded once
+into sorted NumPy arrays per (base_currency, target_currency) pair and as-of lookups are
+answered with searchsorted instead of a correlated subquery per row.
+
+The index is invalidated when rates are written through the API and reloaded after
+RATE_INDEX_TTL_SECONDS so rates imported directly into the database are picked up too.
+Loading is async (ensure_rate_index, over the request's connection), so a first load or a
+reload never blocks the event loop; lookups only read the loaded arrays.
+"""
+import asyncio
+import os
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.db.database import read_sql
+
+RATE_INDEX_TTL_SECONDS = float(os.getenv("RATE_INDEX_TTL_SECONDS", "3600"))
+
+RATE_HISTORY_QUERY = text("""
+    SELECT base_currency, target_currency, rate_date, rate
+    FROM exchange_rates.rate_history
+    ORDER BY base_currency, target_currency, rate_date
+""")
+
+# Serializes reloads on the event loop; waiting requests do not block it
+_load_lock = asyncio.Lock()
+_index = None
+_loaded_at = 0.0
+_stale = False
+_version = 0
+
+
+def _to_day_array(dates) -> np.ndarray:
+    """Convert dates, ISO strings or timestamps to a datetime64[D] array."""
+    return pd.to_datetime(pd.Series(dates, dtype=object)).to_numpy(dtype='datetime64[D]')
+
+
+def _build_index(df: pd.DataFrame) -> dict:
+    index = {}
+    for (base, target), group in df.groupby(['base_currency', 'target_currency'], sort=False):
+        index[(base, target)] = (
+            _to_day_array(group['rate_date']),
+            group['rate'].astype(float).to_numpy()
+        )
+    return index
+
+
+def _needs_load() -> bool:
+    return _index is None or _stale or time.monotonic() - _loaded_at > RATE_INDEX_TTL_SECONDS
+
+
+async def ensure_rate_index(conn: AsyncConnection):
+    """
+    Load the index over `conn` if it is missing, invalidated or expired. Await this before
+    converting currencies; lookups themselves never query.
+    """
+    global _index, _loaded_at, _stale, _version
+    if not _needs_load():
+        return
+    async with _load_lock:
+        # Another request may have reloaded it while this one waited
+        if not _needs_load():
+            return
+        df = await read_sql(conn, RATE_HISTORY_QUERY)
+        if _index is not None and not _stale:
+            _version += 1  # Expiry reload; invalidation has already bumped the version
+        _index = _build_index(df)
+        _loaded_at = time.monotonic()
+        _stale = False
+
+
+def get_rate_index() -> dict:
+    """Return {(base, target): (sorted dates, rates)} as last loaded by ensure_rate_index."""
+    if _index is None:
+        raise RuntimeError("Rate index not loaded: await ensure_rate_index(conn) first")
+    return _index
+
+
+def invalidate_rate_index():
+    """
+    Reload the index on the next ensure_rate_index (call after writing rates). The current
+    index keeps answering lookups until then.
+    """
+    global _stale, _version
+    _stale = True
+    _version += 1
+
+
+def rate_index_version() -> int:
+    """Counter bumped on every invalidation or expiry reload, for caches that depend on rates."""
+    return _version
+
+
+def lookup_rates(base_currency: str, target_currency: str, dates) -> np.ndarray:
+    """
+    Vectorized as-of lookup: for each date, the latest base->target rate on or before it.
+    Returns NaN where no such rate exists. A currency converted to itself is always 1.0.
+    """
+    day_array = _to_day_array(dates)
+    base_currency = base_currency.upper()
+    target_currency = target_currency.upper()
+
+    if base_currency == target_currency:
+        return np.ones(len(day_array))
+
+    pair = get_rate_index().get((base_currency, target_currency))
+    if pair is None:
+        return np.full(len(day_array), np.nan)
+
+    rate_dates, rates = pair
+    positions = np.searchsorted(rate_dates, day_array, side='right') - 1
+    result = rates[np.clip(positions, 0, None)]
+    return np.where(positions >= 0, result, np.nan)
@@ -0,0 +1,90 @@
+"""
+Application-wide HTTP client for calls to Supabase (auth, JWKS).
+
+One httpx.AsyncClient with keep-alive pooling is opened in the FastAPI lifespan and closed on
+shutdown, so requests reuse TLS connections instead of handshaking per call. HTTP/2 is used
+when the optional `h2` package is installed (pip install "httpx[http2]").
+"""
+import os
+from typing import Optional
+import httpx
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+_counters = {"requests": 0, "responses": 0, "errors": 0}
+
+
+async def _on_request(request: httpx.Request):
+    _counters["requests"] += 1
+
+
+async def _on_response(response: httpx.Response):
+    _counters["responses"] += 1
+    if response.status_code >= 500:
+        _counters["errors"] += 1
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        event_hooks={"request": [_on_request], "response": [_on_response]}
+    )
+
+
+async def start_http_client():
+    """Open the shared client (called from the application lifespan)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+
+
+async def close_http_client():
+    """Close the shared client and its pooled connections (called on shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared client. Created on first use when running outside the application lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+def http_client_stats() -> dict:
+    """Request counters and the state of the connection pool."""
+    stats = {
+        "open": _client is not None and not _client.is_closed,
+        "http2_available": HTTP2_AVAILABLE,
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        **_counters
+    }
+    # httpcore's pool is not public API; report it when the attributes are there
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        stats["http2_connections"] = sum(1 for c in connections if "HTTP/2" in c.info())
+    return stats
@@ -1,11 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import balances, accounts, transactions, transfers, market_adjustments, exchange_rates, trips, expenses, budgets, goals, metrics, csv_import, categories, currency_exchange, auth
+from app.api import balances, accounts, transactions, transfers, market_adjustments, exchange_rates, trips, expenses, budgets, goals, metrics, csv_import, categories, currency_exchange, auth, internal
+from app.http_client import start_http_client, close_http_client
+from app.monitoring.metrics import MetricsMiddleware
+from app.monitoring.sql import SQLTimingMiddleware
+from app.monitoring.profiling import ProfilingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    yield
+    await close_http_client()
+
 
 app = FastAPI(
     title="Finance Dashboard API",
     description="Backend API for Finance Dashboard",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -17,6 +31,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request count/latency/in-flight metrics per route, served at /internal/metrics
+app.add_middleware(MetricsMiddleware)
+
+# Per-request query count and database time (Server-Timing header) and slow-query log
+app.add_middleware(SQLTimingMiddleware)
+
+# Opt-in profiling of single requests (X-Profile header plus the internal token)
+app.add_middleware(ProfilingMiddleware, authorize=internal.internal_token_matches)
+
 # Include routers
 app.include_router(auth.router)  # Auth endpoints (signup, signin) - no auth required
 app.include_router(balances.router)
@@ -33,6 +56,7 @@ app.include_router(goals.router)
 app.include_router(metrics.router)
 app.include_router(csv_import.router)
 app.include_router(categories.router)
+app.include_router(internal.router)  # Monitoring endpoints - X-Internal-Token required
 
 
 @app.get("/")
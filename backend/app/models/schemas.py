@@ -129,6 +129,11 @@ class TransactionResponse(BaseModel):
     currency_code: Optional[str] = None  # Currency code from accounts.list
 
 
+class TransactionPageResponse(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str] = None  # Pass as `cursor` to get the next page; None on the last page
+
+
 class ExchangeRateRequest(BaseModel):
     base_currency: str
     target_currency: str
@@ -153,6 +158,15 @@ class BalanceHistoryResponse(BaseModel):
         from_attributes = True
 
 
+class BalanceHistorySeriesResponse(BaseModel):
+    account_id: int
+    account_name: str
+    account_type: str
+    institution: str
+    currency_code: str
+    history: List[BalanceHistoryResponse]
+
+
 class TripResponse(BaseModel):
     trip_id: int
     trip_name: str
@@ -0,0 +1,2 @@
+# Monitoring (metrics, SQL instrumentation, profiling)
+
@@ -0,0 +1,197 @@
+"""
+Request metrics in the Prometheus text exposition format.
+
+MetricsMiddleware records, per HTTP method and route template (for example
+/api/balances/history/{account_name}, so path parameters do not multiply series):
+request counts by status, latency histograms, unhandled exceptions and in-flight requests.
+Requests that match no route are grouped under the "<unmatched>" template.
+
+The registry is a deliberately small in-process implementation (counters, gauges and
+histograms with labels). It is served by GET /internal/metrics.
+"""
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *labelvalues: str, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, *labelvalues: str, value: float):
+        self._values[labelvalues] = value
+
+    def expose(self) -> List[str]:
+        lines = super().expose()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            # [per-bucket counts (non-cumulative), sum, count]
+            series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bucket_labelnames = self.labelnames + ("le",)
+        for labelvalues, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_labelnames, labelvalues + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+_metrics: list = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def register(metric):
+    """Add a metric to the exposition."""
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Callable[[], Iterable[str]]):
+    """Add a callable producing exposition lines at scrape time (for values owned elsewhere)."""
+    _collectors.append(collector)
+    return collector
+
+
+def generate_latest() -> str:
+    """The whole registry in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.expose())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4"  # PlainTextResponse appends the charset
+
+REQUESTS = register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ("method", "route", "status")
+))
+REQUEST_DURATION = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last response byte, by method and route template.",
+    ("method", "route")
+))
+REQUEST_EXCEPTIONS = register(Counter(
+    "http_request_exceptions_total", "Requests that raised an unhandled exception, by method and route template.",
+    ("method", "route")
+))
+REQUESTS_IN_PROGRESS = register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served, by method.",
+    ("method",)
+))
+
+
+_route_templates: Dict[Callable, str] = {}
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request (e.g. /api/trips/{trip_id})."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    template = _route_templates.get(endpoint)
+    if template is None:
+        template = UNMATCHED_ROUTE
+        for route in getattr(scope.get("app"), "routes", []):
+            if getattr(route, "endpoint", None) is endpoint:
+                template = route.path
+                break
+        _route_templates[endpoint] = template
+    return template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no response buffering, so streamed responses are timed to the end)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc(method)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            REQUEST_EXCEPTIONS.inc(method, route_template(scope))
+            raise
+        finally:
+            REQUESTS_IN_PROGRESS.dec(method)
+            route = route_template(scope)
+            REQUESTS.inc(method, route, str(status_code))
+            REQUEST_DURATION.observe(time.perf_counter() - started, method, route)
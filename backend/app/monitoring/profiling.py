@@ -0,0 +1,278 @@
+"""
+Opt-in sampling profiler for single requests.
+
+A request sent with `X-Profile: 1` (or `?_profile=1`) and a valid X-Internal-Token header is
+profiled while profiling is switched on (REQUEST_PROFILING_ENABLED, or PUT /internal/profiling).
+Other requests are untouched. A background thread samples the request's stacks every
+PROFILE_SAMPLE_INTERVAL_SECONDS until the response has been sent:
+
+- while the request's task runs on the event loop, the loop thread's stack (stitched across
+  the greenlets SQLAlchemy's async layer runs sync code in);
+- while it is suspended, the coroutine chain it is awaiting in (marked "(waiting)"), so time
+  spent waiting for the database or Supabase shows up as well;
+- threadpool work started by the request (anyio worker threads running in its context).
+
+Each sample is also attributed to auth, sql, pandas, pydantic, app or framework code by its
+innermost recognised frame. The response carries an X-Profile-Id header; the profile is kept in
+memory and served by GET /internal/profiles/{id} (summary) and /internal/profiles/{id}/folded
+(folded stacks for flamegraph.pl or speedscope). Only one request is profiled at a time.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as CounterDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+import greenlet
+from starlette.datastructures import MutableHeaders
+from app.cache import LRUCache, register_cache
+
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.005"))
+# Sampling stops after this long even if the request is still running
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_STORE_MAX_ENTRIES = int(os.getenv("PROFILE_STORE_MAX_ENTRIES", "20"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = "_profile=1"
+TOKEN_HEADER = b"x-internal-token"
+
+# Switched at runtime by PUT /internal/profiling (per process)
+profiling_settings = {"enabled": REQUEST_PROFILING_ENABLED}
+
+profile_store = register_cache(LRUCache("profiles", PROFILE_STORE_MAX_ENTRIES, ttl_seconds=3600))
+
+_active_profile: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("active_profile", default=None)
+_profile_lock = threading.Lock()
+
+# Innermost matching frame decides a sample's category
+CATEGORY_PATHS = [
+    ("sql", ("/sqlalchemy/", "/psycopg/", "/psycopg2/", "/psycopg_binary/")),
+    ("pandas", ("/pandas/", "/numpy/")),
+    ("pydantic", ("/pydantic/", "/pydantic_core/", "/fastapi/encoders.py", "/json/")),
+    ("auth", ("/jwt/", "/cryptography/", "/httpx/", "/httpcore/", "/app/auth.py")),
+    ("app", ("/app/",)),
+    ("framework", ("/fastapi/", "/starlette/", "/anyio/", "/uvicorn/", "/asyncio/")),
+]
+
+
+def _frame_category(filename: str) -> Optional[str]:
+    filename = filename.replace("\\", "/")
+    for category, paths in CATEGORY_PATHS:
+        if any(path in filename for path in paths):
+            return category
+    return None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename.replace("\\", "/")
+    if "site-packages/" in filename:
+        filename = filename.rsplit("site-packages/", 1)[1]
+    elif "/app/" in filename:
+        filename = "app/" + filename.rsplit("/app/", 1)[1]
+    else:
+        filename = filename.rsplit("/", 1)[-1]
+    # ';' separates frames in the folded format
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _thread_stack(frame, current_greenlet) -> list:
+    """Frames root-first, continuing into the parent greenlet when the stack starts inside a greenlet."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+        if frame is None and current_greenlet is not None and current_greenlet.parent is not None:
+            current_greenlet = current_greenlet.parent
+            frame = current_greenlet.gr_frame
+    frames.reverse()
+    return frames
+
+
+def _awaiting_stack(coro) -> list:
+    """Frames of a suspended coroutine and everything it is awaiting, root-first."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def _from_frame(frames: list, root_frame) -> list:
+    """The part of a stack from root_frame (the profiled request's middleware) down."""
+    for i, frame in enumerate(frames):
+        if frame is root_frame:
+            return frames[i:]
+    return []
+
+
+class RequestProfile:
+    """Samples one request from a background thread."""
+
+    def __init__(self, profile_id: str, method: str, path: str, root_frame, task: asyncio.Task):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.root_frame = root_frame
+        self.task = task
+        self.loop = task.get_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.current_greenlet = None
+        self.stacks = CounterDict()
+        self.categories = CounterDict()
+        self.samples = 0
+        self.status_code = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._previous_greenlet_trace = None
+
+    def _trace_greenlet(self, event, args):
+        # Runs on the loop thread; remembers which greenlet is running there
+        if event in ("switch", "throw"):
+            self.current_greenlet = args[1]
+        if self._previous_greenlet_trace is not None:
+            self._previous_greenlet_trace(event, args)
+
+    def start(self):
+        self._previous_greenlet_trace = greenlet.settrace(self._trace_greenlet)
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        greenlet.settrace(self._previous_greenlet_trace)
+        self.duration = time.perf_counter() - self._started
+
+    def _record(self, frames: list, suffix: str = ""):
+        if not frames:
+            return
+        labels = [_frame_label(frame) for frame in frames]
+        if suffix:
+            labels.append(suffix)
+        self.stacks[";".join(labels)] += 1
+        category = "other"
+        for frame in reversed(frames):
+            frame_category = _frame_category(frame.f_code.co_filename)
+            if frame_category:
+                category = frame_category
+                break
+        self.categories[category + (" (waiting)" if suffix else "")] += 1
+
+    def _sample(self):
+        self.samples += 1
+        thread_frames = sys._current_frames()
+
+        in_threadpool = False
+        for thread_id, frame in thread_frames.items():
+            if thread_id in (self.loop_thread_id, threading.get_ident()):
+                continue
+            stack = _thread_stack(frame, None)
+            # anyio's WorkerThread.run holds the context the function runs in
+            for i, worker_frame in enumerate(stack):
+                if worker_frame.f_code.co_name == "run" and "/anyio/" in worker_frame.f_code.co_filename.replace("\\", "/"):
+                    work = stack[i + 1:]
+                    # An idle worker waits on its queue and still holds its previous context
+                    if not work or work[0].f_code.co_filename.endswith("queue.py"):
+                        break
+                    context = worker_frame.f_locals.get("context")
+                    if isinstance(context, contextvars.Context) and context.get(_active_profile) == self.profile_id:
+                        self._record([self.root_frame] + work)
+                        in_threadpool = True
+                    break
+
+        if asyncio.current_task(self.loop) is self.task:
+            loop_frame = thread_frames.get(self.loop_thread_id)
+            self._record(_from_frame(_thread_stack(loop_frame, self.current_greenlet), self.root_frame))
+        elif not in_threadpool and not self.task.done():
+            # Waiting on a worker thread is already covered by the worker's sample
+            self._record(_from_frame(_awaiting_stack(self.task.get_coro()), self.root_frame), "(waiting)")
+
+    def _run(self):
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL_SECONDS) and time.monotonic() < deadline:
+            try:
+                self._sample()
+            except Exception:
+                # Frames can change under the sampler; skip the sample
+                pass
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        interval_ms = PROFILE_SAMPLE_INTERVAL_SECONDS * 1000
+        recorded = sum(self.categories.values())
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "sample_interval_ms": interval_ms,
+            "samples": self.samples,
+            # The request's duration split by each category's share of the samples
+            "categories_ms": {
+                category: round(count / recorded * self.duration * 1000, 1)
+                for category, count in self.categories.most_common()
+            },
+            "top_stacks": [
+                {"stack": stack.split(";")[-3:], "samples": count} for stack, count in self.stacks.most_common(10)
+            ]
+        }
+
+
+def _wants_profile(scope) -> bool:
+    if any(name == PROFILE_HEADER and value not in (b"", b"0") for name, value in scope["headers"]):
+        return True
+    return PROFILE_QUERY_FLAG in scope.get("query_string", b"").decode("latin-1")
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling requests that ask for it. `authorize` receives the
+    X-Internal-Token header value and decides whether the caller may profile.
+    """
+
+    def __init__(self, app, authorize: Callable[[Optional[str]], bool]):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_settings["enabled"] or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        token = next((value.decode("latin-1") for name, value in scope["headers"] if name == TOKEN_HEADER), None)
+        if not self.authorize(token) or not _profile_lock.acquire(blocking=False):
+            # Not allowed, or another profile is running: serve the request normally
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(uuid.uuid4().hex, scope["method"], scope["path"], sys._getframe(), asyncio.current_task())
+        context_token = _active_profile.set(profile.profile_id)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile.profile_id)
+            await send(message)
+
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.stop()
+            _active_profile.reset(context_token)
+            _profile_lock.release()
+            profile_store.set(profile.profile_id, profile)
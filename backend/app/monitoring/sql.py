@@ -0,0 +1,122 @@
+"""
+SQL statement instrumentation.
+
+Cursor execute events on both engines time every statement and attribute it to the HTTP
+request being served (tracked in a context variable, which follows the request into
+run_sync greenlets and threadpool calls). SQLTimingMiddleware reports the request's query
+count and database time in a Server-Timing header, e.g.
+
+    Server-Timing: db;dur=12.4;desc="7 queries"
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged with their normalized SQL
+(literals and bound parameters replaced by ?) on the "app.sql" logger.
+"""
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from app.db.database import engine, async_engine
+
+# Statements taking at least this long are logged (0 disables the slow-query log)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_MAX_SQL_LENGTH = 2000
+
+logger = logging.getLogger("app.sql")
+
+_request_queries: ContextVar[Optional[dict]] = ContextVar("request_queries", default=None)
+_START_TIMES_KEY = "query_start_times"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BOUND_PARAMETER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement with literals and parameters replaced by ?, IN lists collapsed and whitespace squashed."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _BOUND_PARAMETER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(...)", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    if len(statement) > SLOW_QUERY_MAX_SQL_LENGTH:
+        statement = statement[:SLOW_QUERY_MAX_SQL_LENGTH] + "..."
+    return statement
+
+
+def current_request_queries() -> Optional[dict]:
+    """Query count and database seconds of the request being served (None outside a request)."""
+    return _request_queries.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get(_START_TIMES_KEY)
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+
+    queries = _request_queries.get()
+    if queries is not None:
+        queries["count"] += 1
+        queries["seconds"] += elapsed
+
+    if SLOW_QUERY_THRESHOLD_MS > 0 and elapsed * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            "Slow query (%.1f ms%s): %s",
+            elapsed * 1000,
+            f", {queries['request']}" if queries is not None else "",
+            normalize_sql(statement)
+        )
+
+
+def _discard_start_time(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_START_TIMES_KEY):
+        conn.info[_START_TIMES_KEY].pop()
+
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(_engine, "handle_error", _discard_start_time)
+
+
+class SQLTimingMiddleware:
+    """Pure ASGI middleware adding the request's query count and database time as Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # A mutable dict, so statements run in copied contexts (threadpool, greenlets) still count
+        queries = {"count": 0, "seconds": 0.0, "request": f"{scope['method']} {scope['path']}"}
+        token = _request_queries.set(queries)
+
+        async def send_with_server_timing(message):
+            if message["type"] == "http.response.start":
+                # Streamed responses report the queries run before their first byte
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={queries["seconds"] * 1000:.1f};desc="{queries["count"]} queries"'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            _request_queries.reset(token)
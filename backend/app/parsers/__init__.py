@@ -0,0 +1 @@
+# Bank statement CSV parsing (row-by-row and columnar)
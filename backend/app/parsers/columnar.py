@@ -0,0 +1,374 @@
+"""
+Columnar parsing of bank statement CSV rows.
+
+parse_statement_rows takes a batch of csv.DictReader rows and returns, row for row, what the
+parsers in app.parsers.rows return for them, but works a column at a time. The date format is
+inferred from the column's first value, checked against the whole column with one regular
+expression match and applied with pandas; amounts are converted in one pass. Descriptions are
+factorized, so keyword matching, learned patterns, account matching and merchant extraction
+run once per distinct description and transaction types and categories are assigned with
+array operations.
+
+pandas' string methods on object columns call Python per value, so per-value work is written
+as plain comprehensions. Dates outside the fast path (unpadded fields, out-of-range values)
+go through the same strptime conversions the row parsers use, so the output is identical.
+"""
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.parsers.rows import (
+    CATEGORY_KEYWORDS, LearnedPatterns, extract_merchant, match_account, match_account_name_in_description
+)
+
+# Rows the CSV import hands to parse_statement_rows at a time
+PARSE_CHUNK_SIZE = 5000
+
+# Date formats in the order each row parser tries them; date-only formats have no transaction_time
+STATEMENT_DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%d/%m/%Y']
+EXPENSE_DATE_FORMATS = ['%d/%m/%Y %H:%M', '%d/%m/%Y']
+
+# The zero-padded spelling of each format (which pandas parses exactly like strptime, given
+# in-range times: pandas rolls second 60 over to the next minute) and whether it is day first.
+# The shapes are mutually exclusive, so the order they are tried in does not matter.
+_DATE = r'[0-9]{4}-[0-9]{2}-[0-9]{2}'
+_DAY_FIRST_DATE = r'[0-9]{2}/[0-9]{2}/[0-9]{4}'
+_HOUR_MINUTE = r'(?:[01][0-9]|2[0-3]):[0-5][0-9]'
+_CANONICAL_DATES = {
+    fmt: (re.compile(pattern), day_first) for fmt, pattern, day_first in [
+        ('%Y-%m-%d %H:%M:%S', _DATE + ' ' + _HOUR_MINUTE + ':[0-5][0-9]', False),
+        ('%Y-%m-%d %H:%M', _DATE + ' ' + _HOUR_MINUTE, False),
+        ('%Y-%m-%d', _DATE, False),
+        ('%d/%m/%Y %H:%M', _DAY_FIRST_DATE + ' ' + _HOUR_MINUTE, True),
+        ('%d/%m/%Y', _DAY_FIRST_DATE, True),
+    ]
+}
+# A whole column (values joined by newlines) in one format's canonical shape
+_CANONICAL_COLUMNS = {
+    fmt: re.compile(f'(?:{pattern.pattern}\\n)*{pattern.pattern}') for fmt, (pattern, _) in _CANONICAL_DATES.items()
+}
+
+# One alternation per category: a match means one of its keywords occurs in the description
+_CATEGORY_PATTERNS = [
+    (category, re.compile('|'.join(re.escape(keyword) for keyword in keywords)))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+]
+
+
+def _text_column(values: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stripped values (missing ones empty) and which rows had a string; short CSV rows have None,
+    which the row parsers fail on.
+    """
+    try:
+        return np.array([value.strip() for value in values], dtype=object), np.ones(len(values), dtype=bool)
+    except AttributeError:
+        present = np.array([isinstance(value, str) for value in values], dtype=bool)
+        return np.array([value.strip() if isinstance(value, str) else '' for value in values], dtype=object), present
+
+
+def _per_distinct(keys: np.ndarray, compute: Callable[[int], object]) -> np.ndarray:
+    """compute(row) for the first row with each distinct key, spread over every row with that key."""
+    codes, distinct = pd.factorize(keys)
+    first_rows = np.unique(codes, return_index=True)[1]
+    values = np.empty(len(distinct), dtype=object)
+    for code, row in enumerate(first_rows.tolist()):
+        values[code] = compute(row)
+    return values[codes]
+
+
+def _contains(values: np.ndarray, substring: str) -> np.ndarray:
+    return np.array([substring in value for value in values], dtype=bool)
+
+
+def _parse_amounts(values: list) -> Tuple[np.ndarray, np.ndarray]:
+    """float() of every value without commas, as the row parsers convert amounts, and which values it accepted."""
+    try:
+        return np.array([float(value.replace(',', '').strip()) for value in values]), np.ones(len(values), dtype=bool)
+    except Exception:
+        pass
+    amounts = np.full(len(values), np.nan)
+    parsed = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            amounts[i] = float(value.replace(',', '').strip())
+            parsed[i] = True
+        except Exception:
+            pass
+    return amounts, parsed
+
+
+def _strptime_first(date_str: str, formats: List[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """ISO date and HH:MM time by the first format strptime accepts, as the row parsers do."""
+    for fmt in formats:
+        try:
+            dt = datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+        return dt.date().isoformat(), dt.time().strftime('%H:%M') if '%H' in fmt else None
+    return None
+
+
+def _has_shape_throughout(values: list, fmt: str) -> bool:
+    """Whether every value has the canonical shape of fmt, checked with one match over the joined column."""
+    joined = '\n'.join(values)
+    # A value spanning lines would pass for several values
+    return joined.count('\n') == len(values) - 1 and _CANONICAL_COLUMNS[fmt].fullmatch(joined) is not None
+
+
+def _parse_dates(values: np.ndarray, formats: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ISO dates, HH:MM times (None for date-only values) and which values parsed."""
+    dates = np.full(len(values), None, dtype=object)
+    times = np.full(len(values), None, dtype=object)
+    pending = np.ones(len(values), dtype=bool)
+
+    # Columns normally use one format throughout: try the one the first value has first
+    first_value = next((value for value in values if value), '')
+    ordered = sorted(formats, key=lambda fmt: _CANONICAL_DATES[fmt][0].fullmatch(first_value) is None)
+
+    for fmt in ordered:
+        pattern, day_first = _CANONICAL_DATES[fmt]
+        if fmt == ordered[0] and _has_shape_throughout(values.tolist(), fmt):
+            candidates = pending.copy()
+        else:
+            candidates = pending & np.array([pattern.fullmatch(value) is not None for value in values], dtype=bool)
+        if not candidates.any():
+            continue
+        # Invalid dates (e.g. 31/02) and years pandas cannot represent stay pending
+        index = np.flatnonzero(candidates)
+        valid = pd.to_datetime(values[index], format=fmt, errors='coerce').notna()
+        index = index[valid]
+        subset = values[index].tolist()
+        if day_first:
+            dates[index] = [f'{value[6:10]}-{value[3:5]}-{value[:2]}' for value in subset]
+        else:
+            dates[index] = [value[:10] for value in subset]
+        if '%H' in fmt:
+            times[index] = [value[11:16] for value in subset]
+        pending[index] = False
+        if not pending.any():
+            break
+
+    # Other spellings (unpadded fields, extra spaces) and invalid dates: the row parsers' path
+    for i in np.flatnonzero(pending):
+        parsed = _strptime_first(values[i], formats)
+        if parsed:
+            dates[i], times[i] = parsed
+            pending[i] = False
+
+    return dates, times, ~pending
+
+
+def _learned_values(patterns: Optional[LearnedPatterns], pattern_type: str, desc_lower: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Which descriptions have a confident (> 0.7) learned pattern of this type, and its value."""
+    learned = {
+        value: pattern['value'] for (kind, value), pattern in (patterns or {}).items()
+        if kind == pattern_type and value and pattern.get('confidence', 0) > 0.7
+    }
+    found = np.array([value in learned for value in desc_lower], dtype=bool)
+    values = np.full(len(desc_lower), None, dtype=object)
+    values[found] = [learned[value] for value in desc_lower[found]]
+    return found, values
+
+
+def _classify_statement_types(tx_types: np.ndarray, desc_codes: np.ndarray, desc_lower: np.ndarray, amounts: np.ndarray,
+                              patterns: Optional[LearnedPatterns]) -> np.ndarray:
+    """
+    classify_transaction_type for every row. desc_lower holds the distinct lowercased
+    descriptions and desc_codes each row's index into it.
+    """
+    type_codes, distinct_types = pd.factorize(tx_types)
+    distinct_types = np.array([tx_type.lower() for tx_type in distinct_types], dtype=object)
+    is_income_type = np.isin(distinct_types, ['topup', 'rev payment'])[type_codes]
+    is_transfer = (distinct_types == 'transfer')[type_codes]
+    types = np.select(
+        [
+            is_income_type | _contains(desc_lower, 'payment from')[desc_codes],
+            is_transfer & (_contains(desc_lower, 'to ') | _contains(desc_lower, 'transfer to'))[desc_codes],
+            is_transfer & (_contains(desc_lower, 'from ') | _contains(desc_lower, 'transfer from'))[desc_codes],
+            is_transfer,
+        ],
+        ['income', 'transfer', 'income', 'transfer'],
+        # Card payments, exchanges and everything else by sign
+        default=np.where(amounts < 0, 'expense', 'income')
+    ).astype(object)
+
+    learned, values = _learned_values(patterns, 'transaction_type', desc_lower)
+    learned = learned[desc_codes]
+    types[learned] = values[desc_codes][learned]
+    return types
+
+
+def _classify_categories(desc_codes: np.ndarray, desc_lower: np.ndarray, types: np.ndarray,
+                         patterns: Optional[LearnedPatterns]) -> np.ndarray:
+    """classify_category for every row (desc_codes and desc_lower as for _classify_statement_types)."""
+    categories = np.full(len(desc_lower), 'Other', dtype=object)
+    # Lowest priority first, so the category classify_category checks first wins
+    for category, pattern in reversed(_CATEGORY_PATTERNS):
+        categories[[pattern.search(value) is not None for value in desc_lower]] = category
+
+    learned, values = _learned_values(patterns, 'category', desc_lower)
+    categories[learned] = values[learned]
+    categories = categories[desc_codes]
+    categories[types == 'transfer'] = 'Transfer'
+    return categories
+
+
+def _parse_revolut_statements(rows: List[Dict], accounts: List[Dict], default_account_id: Optional[int],
+                              patterns: Optional[LearnedPatterns]) -> List[Optional[Dict]]:
+    """parse_revolut_statement for every row."""
+    tx_types, readable = _text_column([row.get('Type', '') for row in rows])
+    descriptions, present = _text_column([row.get('Description', '') for row in rows])
+    readable &= present
+    amount_strs = [row.get('Amount', '0') for row in rows]
+    readable &= np.array([value is not None for value in amount_strs], dtype=bool)
+    currencies, present = _text_column([row.get('Currency', 'EUR') for row in rows])
+    readable &= present
+    started_dates, present = _text_column([row.get('Started Date', '') for row in rows])
+    readable &= present
+    completed_dates, present = _text_column([row.get('Completed Date', '') for row in rows])
+    readable &= present
+    states, present = _text_column([row.get('State', '') for row in rows])
+    readable &= present
+
+    # Started Date if available, otherwise Completed Date
+    date_strs = np.where(started_dates != '', started_dates, completed_dates)
+    # Skip REVERTED transactions and rows without a date
+    positions = np.flatnonzero(readable & (states != 'REVERTED') & (date_strs != ''))
+
+    amounts, parsed = _parse_amounts([amount_strs[i] for i in positions.tolist()])
+    positions, amounts = positions[parsed], amounts[parsed]
+    dates, times, parsed = _parse_dates(date_strs[positions], STATEMENT_DATE_FORMATS)
+    positions, amounts, dates, times = positions[parsed], amounts[parsed], dates[parsed], times[parsed]
+    descriptions, currencies = descriptions[positions], currencies[positions]
+
+    # Text classification runs once per distinct description
+    desc_codes, distinct_descriptions = pd.factorize(descriptions)
+    desc_lower = np.array([description.lower() for description in distinct_descriptions], dtype=object)
+    types = _classify_statement_types(tx_types[positions], desc_codes, desc_lower, amounts, patterns)
+    categories = _classify_categories(desc_codes, desc_lower, types, patterns)
+    is_transfer = types == 'transfer'
+
+    # For transfers, check if the description mentions another account
+    transfer_to_ids = np.full(len(positions), None, dtype=object)
+    transfer_descriptions = descriptions[is_transfer]
+    transfer_to_ids[is_transfer] = _per_distinct(
+        desc_codes[is_transfer], lambda i: match_account_name_in_description(transfer_descriptions[i], accounts)
+    )
+
+    # Transfers out come from the default account; transfers in from the account the
+    # description names, if any; everything else is matched
+    outgoing = is_transfer & (amounts < 0)
+    incoming = is_transfer & (amounts > 0) & np.array([bool(target) for target in transfer_to_ids], dtype=bool)
+    needs_match = ~(outgoing | incoming)
+    account_matches = np.empty(len(positions), dtype=object)
+    match_descriptions, match_currencies = descriptions[needs_match], currencies[needs_match]
+    account_matches[needs_match] = _per_distinct(
+        desc_codes[needs_match] * len(currencies) + pd.factorize(currencies)[0][needs_match],
+        lambda i: match_account(match_descriptions[i], match_currencies[i], accounts, default_account_id, patterns)
+    )
+    account_matches[outgoing] = [{'account_id': default_account_id, 'confidence': 0.95} for _ in range(outgoing.sum())]
+    account_matches[incoming] = [{'account_id': target, 'confidence': 0.85} for target in transfer_to_ids[incoming]]
+
+    # extract_merchant only distinguishes transfers from other types
+    merchants = _per_distinct(desc_codes * 2 + is_transfer, lambda i: extract_merchant(descriptions[i], types[i]))
+
+    results = [None] * len(rows)
+    for position, transaction_type, account_match, amount, currency, tx_date, tx_time, description, merchant, category, transfer_to_id in zip(
+        positions.tolist(), types.tolist(), account_matches.tolist(), amounts.tolist(), currencies.tolist(), dates.tolist(),
+        times.tolist(), descriptions.tolist(), merchants.tolist(), categories.tolist(), transfer_to_ids.tolist()
+    ):
+        results[position] = {
+            'transaction_type': transaction_type,
+            'account_id': account_match['account_id'],
+            'account_confidence': account_match['confidence'],
+            'amount': amount,
+            'currency': currency,
+            'transaction_date': tx_date,
+            'transaction_time': tx_time,
+            'description': description,
+            'merchant': merchant,
+            'category': category,
+            'transfer_to_account_id': transfer_to_id,
+            'confidence': min(account_match['confidence'], 0.8),
+            'raw_data': rows[position]
+        }
+    return results
+
+
+def _parse_revolut_expenses(rows: List[Dict], accounts: List[Dict], default_account_id: Optional[int],
+                            patterns: Optional[LearnedPatterns], trips: Optional[Dict[str, int]]) -> List[Optional[Dict]]:
+    """parse_revolut_expense for every row."""
+    date_strs, readable = _text_column([row.get('date', '') for row in rows])
+    amount_strs = [row.get('total_amt', row.get('amount', '0')) for row in rows]
+    readable &= np.array([value is not None for value in amount_strs], dtype=bool)
+    merchants, present = _text_column([row.get('merchandiser', row.get('merchant', '')) for row in rows])
+    readable &= present
+    currencies, present = _text_column([row.get('currency', 'EUR') for row in rows])
+    readable &= present
+    provided_categories, present = _text_column([row.get('expense_category', row.get('category', '')) for row in rows])
+    readable &= present
+    trip_names, present = _text_column([row.get('Trip', row.get('trip', '')) for row in rows])
+    readable &= present
+    positions = np.flatnonzero(readable)
+
+    amounts, parsed = _parse_amounts([amount_strs[i] for i in positions.tolist()])
+    positions, amounts = positions[parsed], amounts[parsed]
+    dates, times, parsed = _parse_dates(date_strs[positions], EXPENSE_DATE_FORMATS)
+    positions, amounts, dates, times = positions[parsed], amounts[parsed], dates[parsed], times[parsed]
+    merchants, currencies = merchants[positions], currencies[positions]
+
+    # Expense exports are usually expenses
+    types = np.where(amounts < 0, 'expense', 'income').astype(object)
+    # Use the provided category or classify
+    categories = provided_categories[positions]
+    missing = categories == ''
+    merchant_codes, distinct_merchants = pd.factorize(merchants[missing])
+    categories[missing] = _classify_categories(
+        merchant_codes, np.array([merchant.lower() for merchant in distinct_merchants], dtype=object), types[missing], patterns
+    )
+
+    account_matches = _per_distinct(
+        pd.factorize(merchants)[0] * len(currencies) + pd.factorize(currencies)[0],
+        lambda i: match_account(merchants[i], currencies[i], accounts, default_account_id, patterns)
+    )
+    trips_by_name = trips or {}
+
+    results = [None] * len(rows)
+    for position, transaction_type, account_match, amount, currency, tx_date, tx_time, merchant, category, trip_name in zip(
+        positions.tolist(), types.tolist(), account_matches.tolist(), amounts.tolist(), currencies.tolist(),
+        dates.tolist(), times.tolist(), merchants.tolist(), categories.tolist(), trip_names[positions].tolist()
+    ):
+        results[position] = {
+            'transaction_type': transaction_type,
+            'account_id': account_match['account_id'],
+            'account_confidence': account_match['confidence'],
+            'amount': amount,
+            'currency': currency,
+            'transaction_date': tx_date,
+            'transaction_time': tx_time,
+            'description': merchant,
+            'merchant': merchant,
+            'category': category,
+            'trip_id': trips_by_name.get(trip_name.lower()) if trip_name else None,
+            'trip_name': trip_name if trip_name else None,
+            'confidence': min(account_match['confidence'], 0.8),
+            'raw_data': rows[position]
+        }
+    return results
+
+
+def parse_statement_rows(rows: List[Dict], format_type: str, accounts: List[Dict], default_account_id: Optional[int] = None,
+                         patterns: Optional[LearnedPatterns] = None, trips: Optional[Dict[str, int]] = None) -> List[Optional[Dict]]:
+    """
+    Parse a batch of rows of one CSV format. Returns one entry per row: the parsed transaction,
+    or None where the row parser returns None (unreadable, reverted or undated rows).
+    """
+    if not rows:
+        return []
+    if format_type == 'revolut_statement':
+        return _parse_revolut_statements(rows, accounts, default_account_id, patterns)
+    if format_type in ('revolut_expense', 'monzo'):
+        return _parse_revolut_expenses(rows, accounts, default_account_id, patterns, trips)
+    return [None] * len(rows)
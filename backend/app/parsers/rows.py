@@ -0,0 +1,458 @@
+"""
+Row-by-row parsing of bank statement CSV rows into transactions for the CSV import.
+
+Each parser takes one csv.DictReader row and returns the parsed transaction dict, or None if
+the row cannot be imported. Learned patterns and trips are passed in as preloaded
+dictionaries (see app.api.csv_import), so nothing here touches the database.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def detect_csv_format(headers: List[str]) -> str:
+    """Detect which CSV format we're dealing with"""
+    headers_lower = [h.lower().strip() for h in headers]
+    
+    if 'type' in headers_lower and 'product' in headers_lower:
+        return 'revolut_statement'
+    elif 'merchandiser' in headers_lower or ('merchant' in headers_lower and 'date' in headers_lower):
+        return 'revolut_expense'
+    elif 'date' in headers_lower and 'total_amt' in headers_lower:
+        return 'monzo'
+    else:
+        return 'unknown'
+
+
+# Learned import patterns keyed by (pattern_type, lowercased pattern_value)
+LearnedPatterns = Dict[Tuple[str, str], Dict]
+
+
+def check_learned_pattern(patterns: Optional[LearnedPatterns], pattern_type: str, pattern_value: str) -> Optional[Dict]:
+    """Check if we have a learned pattern for this"""
+    if not patterns or not pattern_value:
+        return None
+    return patterns.get((pattern_type, pattern_value.lower()))
+
+
+def classify_transaction_type(tx_type: str, description: str, amount: float, patterns: Optional[LearnedPatterns] = None) -> str:
+    """Classify transaction as income, expense, or transfer"""
+    tx_type_lower = tx_type.lower()
+    desc_lower = description.lower()
+    
+    # Check learned patterns first
+    learned_type = check_learned_pattern(patterns, 'transaction_type', description)
+    if learned_type and learned_type.get('confidence', 0) > 0.7:
+        return learned_type['value']
+    
+    # Pattern matching
+    if tx_type_lower in ['topup', 'rev payment'] or 'payment from' in desc_lower:
+        return 'income'
+    elif tx_type_lower == 'transfer':
+        if 'to ' in desc_lower or 'transfer to' in desc_lower:
+            return 'transfer'
+        elif 'from ' in desc_lower or 'transfer from' in desc_lower:
+            return 'income'  # Money coming in
+        else:
+            return 'transfer'
+    elif tx_type_lower in ['card payment', 'exchange']:
+        return 'expense' if amount < 0 else 'income'
+    else:
+        # Default based on amount
+        return 'expense' if amount < 0 else 'income'
+
+
+def match_account_name_in_description(description: str, accounts: List[Dict]) -> Optional[int]:
+    """Try to match account name from description (for transfers)"""
+    if not description or not accounts:
+        return None
+    
+    desc_lower = description.lower()
+    
+    # Common patterns: "To X", "From X", "Transfer to X", "Transfer from X"
+    patterns = [
+        ('to ', 'after'),
+        ('from ', 'before'),
+        ('transfer to ', 'after'),
+        ('transfer from ', 'after'),
+    ]
+    
+    for pattern, position in patterns:
+        if pattern in desc_lower:
+            # Extract the account name part
+            parts = desc_lower.split(pattern, 1)
+            if len(parts) > 1 and parts[1]:
+                # Get the part after the pattern
+                after_pattern = parts[1].strip()
+                if not after_pattern:
+                    continue
+                
+                # Split by comma and take first part, then split by space and take first 3 words
+                account_name_parts = after_pattern.split(',')[0].strip()
+                if account_name_parts:
+                    words = account_name_parts.split(' ')
+                    account_name_part = words[0:min(3, len(words))]  # Take first few words, max 3
+                    account_name_candidate = ' '.join(account_name_part).strip()
+                    
+                    if account_name_candidate:
+                        # Try to match against account names (fuzzy matching)
+                        for account in accounts:
+                            account_name_lower = account['account_name'].lower()
+                            # Check if any part of the account name matches
+                            candidate_words = [w for w in account_name_candidate.split() if len(w) > 2]
+                            if candidate_words and any(word in account_name_lower for word in candidate_words):
+                                return account['account_id']
+                            # Also check if account name contains the candidate
+                            if account_name_candidate in account_name_lower or account_name_lower in account_name_candidate:
+                                return account['account_id']
+    
+    return None
+
+
+def match_account(description: str, currency: str, accounts: List[Dict], default_account_id: Optional[int] = None,
+                  patterns: Optional[LearnedPatterns] = None) -> Dict:
+    """Match transaction to an account"""
+    # Check learned patterns
+    learned_account = check_learned_pattern(patterns, 'account_match', description)
+    if learned_account and learned_account.get('confidence', 0) > 0.7:
+        return {
+            'account_id': learned_account['account_id'],
+            'confidence': learned_account['confidence']
+        }
+    
+    # Pattern matching
+    desc_lower = description.lower()
+    
+    # For transfers, try to match the other account from description
+    if 'transfer' in desc_lower or 'to ' in desc_lower or 'from ' in desc_lower:
+        matched_account_id = match_account_name_in_description(description, accounts)
+        if matched_account_id:
+            return {
+                'account_id': matched_account_id,
+                'confidence': 0.8
+            }
+    
+    # Match by currency first
+    matching_accounts = [a for a in accounts if a['currency_code'] == currency]
+    
+    # Try to match by description keywords
+    for account in matching_accounts:
+        account_name_lower = account['account_name'].lower()
+        institution_lower = account['institution'].lower()
+        
+        # Check if account name or institution appears in description
+        if account_name_lower in desc_lower or institution_lower in desc_lower:
+            return {
+                'account_id': account['account_id'],
+                'confidence': 0.9
+            }
+    
+    # Use default account if provided (the account the CSV is from)
+    if default_account_id:
+        # Verify it matches currency
+        default_account = next((a for a in accounts if a['account_id'] == default_account_id), None)
+        if default_account and default_account['currency_code'] == currency:
+            return {
+                'account_id': default_account_id,
+                'confidence': 0.9  # High confidence since user selected it
+            }
+    
+    # Default to first matching currency account
+    if matching_accounts:
+        return {
+            'account_id': matching_accounts[0]['account_id'],
+            'confidence': 0.5  # Low confidence, needs review
+        }
+    
+    # No match found
+    return {
+        'account_id': default_account_id,  # Fallback to selected account
+        'confidence': 0.3  # Very low confidence
+    }
+
+
+# Checked in order; the first category with a keyword in the description wins
+CATEGORY_KEYWORDS = {
+    'Groceries': ['tesco', 'lidl', 'aldi', 'dunnes', 'supermarket', 'groceries', 'boots', 'costcutter'],
+    'Restaurants': ['restaurant', 'cafe', 'mcdonald', 'burger king', 'pizza', 'food', 'wetherspoon', 'fratelli'],
+    'Transport': ['uber', 'bolt', 'free now', 'trainline', 'stagecoach', 'transport', 'taxi', 'dsb', 'rhônexpress'],
+    'Shopping': ['amazon', 'temu', 'shopping', 'store', 'tenpin'],
+    'Travel': ['ryanair', 'hotel', 'airbnb', 'travel', 'flight', 'expedia'],
+    'Entertainment': ['movies', 'cinema', 'entertainment', 'patreon'],
+    'Bills': ['giffgaff', 'phone', 'bill'],
+    'Fitness': ['fitness', 'gym', 'badminton', 'anytime fitness'],
+    'Education': ['education', 'italki'],
+    'General': ['general', 'register office'],
+}
+
+
+def classify_category(description: str, transaction_type: str, patterns: Optional[LearnedPatterns] = None) -> Optional[str]:
+    """Classify transaction category"""
+    if transaction_type == 'transfer':
+        return 'Transfer'
+    
+    # Check learned patterns
+    learned_category = check_learned_pattern(patterns, 'category', description)
+    if learned_category and learned_category.get('confidence', 0) > 0.7:
+        return learned_category['value']
+    
+    # Pattern matching
+    desc_lower = description.lower()
+    
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in desc_lower for keyword in keywords):
+            return category
+    
+    return 'Other'
+
+
+def extract_merchant(description: str, transaction_type: str) -> Optional[str]:
+    """Extract merchant name from description"""
+    if not description:
+        return None
+    
+    if transaction_type == 'transfer':
+        # For transfers, merchant is the other account/person
+        desc_lower = description.lower()
+        if 'to ' in desc_lower:
+            # Case-insensitive split
+            parts = description.split('to ', 1) if 'to ' in description else description.split('To ', 1)
+            if len(parts) > 1 and parts[1]:
+                merchant = parts[1].split(',')[0].strip()
+                return merchant if merchant else None
+        elif 'from ' in desc_lower:
+            # Case-insensitive split
+            parts = description.split('from ', 1) if 'from ' in description else description.split('From ', 1)
+            if len(parts) > 1 and parts[1]:
+                merchant = parts[1].split(',')[0].strip()
+                return merchant if merchant else None
+        return None
+    
+    # For expenses, merchant is usually the first part of description
+    # Remove common prefixes
+    desc = description
+    prefixes = ['Card Payment', 'Payment', 'Rev Payment']
+    for prefix in prefixes:
+        if desc.startswith(prefix):
+            desc = desc[len(prefix):].strip()
+    
+    # Take first part before comma or dash
+    if desc:
+        merchant = desc.split(',')[0].split('-')[0].strip()
+        return merchant if merchant else None
+    
+    return None
+
+
+def parse_revolut_statement(row: Dict, accounts: List[Dict], default_account_id: Optional[int] = None,
+                            patterns: Optional[LearnedPatterns] = None) -> Optional[Dict]:
+    """Parse Revolut statement format"""
+    try:
+        # Extract data
+        tx_type = row.get('Type', '').strip()
+        description = row.get('Description', '').strip()
+        amount_str = row.get('Amount', '0').replace(',', '').strip()
+        currency = row.get('Currency', 'EUR').strip()
+        started_date = row.get('Started Date', '').strip()  # Use Started Date instead of Completed Date
+        completed_date = row.get('Completed Date', '').strip()
+        state = row.get('State', '').strip()
+        
+        # Skip REVERTED transactions
+        if state == 'REVERTED':
+            return None
+        
+        # Use Started Date if available, otherwise fallback to Completed Date
+        date_str = started_date if started_date else completed_date
+        if not date_str:
+            return None
+        
+        # Parse amount
+        try:
+            amount = float(amount_str)
+        except:
+            return None
+        
+        # Parse date and time - handle formats: "2025-12-08 12:38:09", "2025-12-08", "01/09/2025 13:31", "01/09/2025"
+        tx_date = None
+        tx_time = None
+        
+        try:
+            # Try YYYY-MM-DD HH:MM:SS format first
+            try:
+                dt = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+                tx_date = dt.date()
+                tx_time = dt.time().strftime('%H:%M')
+            except:
+                # Try YYYY-MM-DD HH:MM format
+                try:
+                    dt = datetime.strptime(date_str, '%Y-%m-%d %H:%M')
+                    tx_date = dt.date()
+                    tx_time = dt.time().strftime('%H:%M')
+                except:
+                    # Try YYYY-MM-DD format (date only)
+                    try:
+                        tx_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+                    except:
+                        # Try DD/MM/YYYY HH:MM format
+                        try:
+                            dt = datetime.strptime(date_str, '%d/%m/%Y %H:%M')
+                            tx_date = dt.date()
+                            tx_time = dt.time().strftime('%H:%M')
+                        except:
+                            # Fallback to DD/MM/YYYY format (date only)
+                            tx_date = datetime.strptime(date_str, '%d/%m/%Y').date()
+        except:
+            return None
+        
+        # Determine transaction type
+        transaction_type = classify_transaction_type(tx_type, description, amount, patterns)
+        
+        # For transfers, check if we can identify the other account
+        transfer_to_account_id = None
+        if transaction_type == 'transfer':
+            # Check if description mentions another account
+            transfer_to_account_id = match_account_name_in_description(description, accounts)
+        
+        # Match account - use default_account_id as the source account
+        # For transfers OUT (negative), use default_account_id
+        # For transfers IN (positive), try to match the "to" account
+        if transaction_type == 'transfer' and amount < 0:
+            # Money going out - this is from the default account
+            account_match = {
+                'account_id': default_account_id,
+                'confidence': 0.95
+            }
+        elif transaction_type == 'transfer' and amount > 0:
+            # Money coming in - try to match the "from" account, otherwise use default
+            if transfer_to_account_id:
+                account_match = {
+                    'account_id': transfer_to_account_id,
+                    'confidence': 0.85
+                }
+            else:
+                account_match = match_account(description, currency, accounts, default_account_id, patterns)
+        else:
+            # Regular transaction - use default account
+            account_match = match_account(description, currency, accounts, default_account_id, patterns)
+        
+        # Classify category
+        category = classify_category(description, transaction_type, patterns)
+        
+        # Get merchant
+        merchant = extract_merchant(description, transaction_type)
+        
+        return {
+            'transaction_type': transaction_type,
+            'account_id': account_match['account_id'],
+            'account_confidence': account_match['confidence'],
+            'amount': amount,
+            'currency': currency,
+            'transaction_date': tx_date.isoformat(),
+            'transaction_time': tx_time,  # HH:MM format or None if not available
+            'description': description,
+            'merchant': merchant,
+            'category': category,
+            'transfer_to_account_id': transfer_to_account_id,  # For creating linked transfers
+            'confidence': min(account_match['confidence'], 0.8),  # Overall confidence
+            'raw_data': row
+        }
+    except Exception as e:
+        import traceback
+        print(f"Error parsing revolut statement row: {e}")
+        print(f"Row data: {row}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return None
+
+
+def match_trip(trips: Optional[Dict[str, int]], trip_name: str) -> Optional[int]:
+    """Match trip name to trip_id"""
+    if not trip_name or not trips:
+        return None
+    return trips.get(trip_name.lower())
+
+
+def parse_revolut_expense(row: Dict, accounts: List[Dict], default_account_id: Optional[int] = None,
+                          patterns: Optional[LearnedPatterns] = None, trips: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+    """Parse Revolut expense format (with merchandiser column)"""
+    try:
+        date_str = row.get('date', '').strip()
+        amount_str = row.get('total_amt', row.get('amount', '0')).replace(',', '').strip()
+        merchant = row.get('merchandiser', row.get('merchant', '')).strip()
+        currency = row.get('currency', 'EUR').strip()
+        category = row.get('expense_category', row.get('category', '')).strip()
+        trip_name = row.get('Trip', row.get('trip', '')).strip()
+        
+        # Parse amount
+        try:
+            amount = float(amount_str)
+        except:
+            return None
+        
+        # Parse date and time
+        tx_date = None
+        tx_time = None
+        
+        try:
+            # Try DD/MM/YYYY HH:MM format first
+            try:
+                dt = datetime.strptime(date_str, '%d/%m/%Y %H:%M')
+                tx_date = dt.date()
+                tx_time = dt.time().strftime('%H:%M')
+            except:
+                # Fallback to DD/MM/YYYY format (date only)
+                try:
+                    tx_date = datetime.strptime(date_str, '%d/%m/%Y').date()
+                except:
+                    return None
+        except:
+            return None
+        
+        # Determine transaction type (expense format is usually expenses)
+        transaction_type = 'expense' if amount < 0 else 'income'
+        
+        # Match account
+        account_match = match_account(merchant, currency, accounts, default_account_id, patterns)
+        
+        # Use provided category or classify
+        if not category:
+            category = classify_category(merchant, transaction_type, patterns)
+        
+        # Match trip
+        trip_id = match_trip(trips, trip_name) if trip_name else None
+        
+        return {
+            'transaction_type': transaction_type,
+            'account_id': account_match['account_id'],
+            'account_confidence': account_match['confidence'],
+            'amount': amount,
+            'currency': currency,
+            'transaction_date': tx_date.isoformat(),
+            'transaction_time': tx_time,  # HH:MM format or None
+            'description': merchant,
+            'merchant': merchant,
+            'category': category,
+            'trip_id': trip_id,
+            'trip_name': trip_name if trip_name else None,
+            'confidence': min(account_match['confidence'], 0.8),
+            'raw_data': row
+        }
+    except Exception as e:
+        print(f"Error parsing revolut expense row: {e}")
+        return None
+
+
+def parse_monzo(row: Dict, accounts: List[Dict], default_account_id: Optional[int] = None,
+                patterns: Optional[LearnedPatterns] = None, trips: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+    """Parse Monzo format (similar to revolut expense)"""
+    return parse_revolut_expense(row, accounts, default_account_id, patterns, trips)
+
+
+def parse_row(row: Dict, format_type: str, accounts: List[Dict], account_id: Optional[int] = None,
+              patterns: Optional[LearnedPatterns] = None, trips: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+    """Parse one row with the row parser for its format."""
+    if format_type == 'revolut_statement':
+        return parse_revolut_statement(row, accounts, account_id, patterns)
+    elif format_type == 'revolut_expense':
+        return parse_revolut_expense(row, accounts, account_id, patterns, trips)
+    elif format_type == 'monzo':
+        return parse_monzo(row, accounts, account_id, patterns, trips)
+    return None
@@ -0,0 +1 @@
+# Benchmarks (synthetic ledgers and the runner: python -m benchmarks.run --help)
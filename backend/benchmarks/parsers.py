@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+CSV import parser benchmark.
+
+Parses real Revolut statements (expenses/account-statement_*.csv at the repository root by
+default) with the row-by-row parsers (app.parsers.rows) and the columnar engine
+(app.parsers.columnar), checks that both produce the same transactions and reports timings.
+Statements are small, so their rows are repeated --scale times to get a measurable workload.
+No database is needed: accounts are made up from the statement's currencies.
+
+Usage (from backend/):
+    python -m benchmarks.parsers --scale 100 --output parser-results.json
+    python -m benchmarks.parsers --files ~/Downloads/account-statement_*.csv --scale 1
+"""
+
+import argparse
+import csv
+import glob
+import json
+import math
+import platform
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Make the app package importable when run from backend/ or backend/benchmarks/
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from benchmarks.run import git_commit, summarize
+
+DEFAULT_FILES = str(backend_dir.parent / "expenses" / "account-statement_*.csv")
+
+
+def statement_accounts(rows: list[dict]) -> list[dict]:
+    """A current and a savings account per currency in the statement."""
+    accounts = []
+    for currency in sorted({row.get("Currency") or "EUR" for row in rows}):
+        accounts.append({"account_name": f"Current {currency}", "institution": "Revolut", "currency_code": currency})
+        accounts.append({"account_name": f"{currency} Savings", "institution": "Revolut", "currency_code": currency})
+    for account_id, account in enumerate(accounts, start=1):
+        account["account_id"] = account_id
+    return accounts
+
+
+def parse_rows_one_by_one(rows, format_type, accounts, default_account_id):
+    from app.parsers.rows import parse_row
+
+    return [parse_row(row, format_type, accounts, default_account_id) for row in rows]
+
+
+def parse_rows_columnar(rows, format_type, accounts, default_account_id):
+    from app.parsers.columnar import PARSE_CHUNK_SIZE, parse_statement_rows
+
+    parsed = []
+    for start in range(0, len(rows), PARSE_CHUNK_SIZE):
+        parsed.extend(parse_statement_rows(rows[start:start + PARSE_CHUNK_SIZE], format_type, accounts, default_account_id))
+    return parsed
+
+
+def same_transaction(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    if list(a) != list(b):
+        return False
+    for key, value in a.items():
+        other = b[key]
+        if isinstance(value, float) and isinstance(other, float) and math.isnan(value) and math.isnan(other):
+            continue
+        if type(value) is not type(other) or value != other:
+            return False
+    return True
+
+
+def time_parser(parse, repeat: int, warmup: int):
+    """Time `parse` (a callable returning the parsed rows); returns the stats and the last result."""
+    import time
+
+    samples = []
+    for iteration in range(warmup + repeat):
+        started = time.perf_counter()
+        result = parse()
+        elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            samples.append(elapsed)
+    return summarize(samples), result
+
+
+def benchmark_file(path: str, scale: int, repeat: int, warmup: int) -> dict:
+    from app.parsers.rows import detect_csv_format
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        format_type = detect_csv_format(reader.fieldnames or [])
+        rows = list(reader)
+    rows = rows * scale
+    accounts = statement_accounts(rows)
+    # The statement is imported into the current account of its most common currency
+    currency = Counter(row.get("Currency") or "EUR" for row in rows).most_common(1)[0][0]
+    default_account_id = next(a["account_id"] for a in accounts if a["currency_code"] == currency)
+
+    row_stats, expected = time_parser(
+        lambda: parse_rows_one_by_one(rows, format_type, accounts, default_account_id), repeat, warmup
+    )
+    columnar_stats, parsed = time_parser(
+        lambda: parse_rows_columnar(rows, format_type, accounts, default_account_id), repeat, warmup
+    )
+    mismatches = sum(not same_transaction(a, b) for a, b in zip(expected, parsed))
+
+    return {
+        "file": Path(path).name,
+        "format": format_type,
+        "rows": len(rows),
+        "parsed": sum(transaction is not None for transaction in expected),
+        "mismatches": mismatches,
+        "row_by_row": row_stats,
+        "columnar": columnar_stats,
+        "speedup": round(row_stats["median_ms"] / columnar_stats["median_ms"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CSV import parsers on bank statements")
+    parser.add_argument("--files", nargs="+", default=[DEFAULT_FILES], help="Statement CSVs or glob patterns")
+    parser.add_argument("--scale", type=int, default=100, help="Times each statement's rows are repeated")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed iterations per parser")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed iterations before timing")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.files for path in glob.glob(str(Path(pattern).expanduser()))})
+    if not paths:
+        parser.error(f"no statements match {' '.join(args.files)}")
+    if args.scale < 1:
+        parser.error("--scale must be at least 1")
+
+    results = [benchmark_file(path, args.scale, args.repeat, args.warmup) for path in paths]
+
+    for result in results:
+        print(f"\n{result['file']} ({result['format']}): {result['rows']} rows, {result['parsed']} parsed")
+        for name in ("row_by_row", "columnar"):
+            stats = result[name]
+            print(f"  {name:<12} median {stats['median_ms']:>10.2f} ms   p95 {stats['p95_ms']:>10.2f} ms")
+        print(f"  speedup {result['speedup']:.2f}x, {result['mismatches']} rows differ")
+
+    if args.output:
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "settings": {"scale": args.scale, "repeat": args.repeat, "warmup": args.warmup},
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+    if any(result["mismatches"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
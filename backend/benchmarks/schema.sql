@@ -0,0 +1,106 @@
+-- Schema for a local benchmark database (python -m benchmarks.run --init-schema)
+--
+-- The tables and columns the API reads and writes, as they exist in Supabase after all
+-- migrations (including the per-user user_id columns). Safe to run repeatedly.
+
+CREATE SCHEMA IF NOT EXISTS accounts;
+CREATE SCHEMA IF NOT EXISTS balances;
+CREATE SCHEMA IF NOT EXISTS exchange_rates;
+CREATE SCHEMA IF NOT EXISTS transactions;
+CREATE SCHEMA IF NOT EXISTS trips;
+
+CREATE TABLE IF NOT EXISTS accounts.list (
+    account_id SERIAL PRIMARY KEY,
+    account_name VARCHAR(255) NOT NULL,
+    account_type VARCHAR(100) NOT NULL,
+    institution VARCHAR(255) NOT NULL,
+    currency_code VARCHAR(3) NOT NULL,
+    user_id UUID,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS trips.list (
+    trip_id SERIAL PRIMARY KEY,
+    trip_name VARCHAR(255) NOT NULL,
+    start_date DATE,
+    end_date DATE,
+    location VARCHAR(255),
+    description TEXT,
+    user_id UUID,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS transactions.ledger (
+    transaction_id SERIAL PRIMARY KEY,
+    account_id INTEGER NOT NULL REFERENCES accounts.list(account_id) ON DELETE CASCADE,
+    amount DECIMAL(15, 2) NOT NULL,
+    transaction_type VARCHAR(20) DEFAULT 'expense'
+        CHECK (transaction_type IN ('income', 'expense', 'transfer')),
+    category VARCHAR(100),
+    transaction_date DATE NOT NULL,
+    transfer_link_id INTEGER,
+    description TEXT,
+    merchant VARCHAR(255),
+    trip_id INTEGER REFERENCES trips.list(trip_id) ON DELETE SET NULL,
+    user_id UUID,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE SEQUENCE IF NOT EXISTS transactions.transfer_link_seq;
+
+CREATE TABLE IF NOT EXISTS balances.current (
+    account_id INTEGER PRIMARY KEY REFERENCES accounts.list(account_id) ON DELETE CASCADE,
+    amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    balance_date DATE,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS balances.snapshot (
+    snapshot_id SERIAL PRIMARY KEY,
+    balance_date DATE NOT NULL,
+    account_id INTEGER NOT NULL REFERENCES accounts.list(account_id) ON DELETE CASCADE,
+    amount DECIMAL(15, 2) NOT NULL,
+    balance_eur DECIMAL(15, 2),
+    balance_usd DECIMAL(15, 2),
+    balance_gbp DECIMAL(15, 2),
+    balance_chf DECIMAL(15, 2),
+    balance_cad DECIMAL(15, 2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(balance_date, account_id)
+);
+
+CREATE TABLE IF NOT EXISTS exchange_rates.rate_history (
+    rate_id SERIAL PRIMARY KEY,
+    base_currency VARCHAR(3) NOT NULL,
+    target_currency VARCHAR(3) NOT NULL,
+    rate DECIMAL(15, 6) NOT NULL,
+    rate_date DATE NOT NULL,
+    user_id UUID,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(base_currency, target_currency, rate_date)
+);
+
+CREATE TABLE IF NOT EXISTS import_patterns (
+    pattern_id SERIAL PRIMARY KEY,
+    pattern_type VARCHAR(50) NOT NULL,
+    pattern_value TEXT NOT NULL,
+    matched_account_id INTEGER REFERENCES accounts.list(account_id) ON DELETE SET NULL,
+    matched_category VARCHAR(100),
+    matched_transaction_type VARCHAR(20),
+    confidence_score DECIMAL(3,2) DEFAULT 0.5 CHECK (confidence_score >= 0 AND confidence_score <= 1),
+    usage_count INTEGER DEFAULT 1,
+    last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_accounts_name ON accounts.list(account_name);
+CREATE INDEX IF NOT EXISTS idx_balances_account_date ON balances.snapshot(account_id, balance_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions.ledger(account_id, transaction_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_transfer_link ON transactions.ledger(transfer_link_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+    ON transactions.ledger(user_id, transaction_date DESC, transaction_id DESC);
+CREATE INDEX IF NOT EXISTS idx_exchange_rates_currencies ON exchange_rates.rate_history(base_currency, target_currency);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pattern_type_value_unique ON import_patterns(pattern_type, LOWER(pattern_value));
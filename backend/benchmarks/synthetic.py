@@ -0,0 +1,277 @@
+"""
+Synthetic ledgers for the benchmarks.
+
+generate_ledger builds one user's data the way the app would have written it: accounts
+across EUR, GBP, CHF, USD and CAD, an Initial Balance per account, daily card spending and
+monthly salaries on current accounts, monthly transfers to savings/investment accounts as
+linked pairs (converted at the day's rate), monthly market adjustments on investment accounts,
+and a daily EUR rate history for every currency. Everything is derived from `seed`, so a size
+always produces the same ledger.
+
+load_ledger writes a generated ledger into the database for a user (replacing what that user
+had) and rebuilds the maintained balance store and snapshots. It imports the app package, so
+SUPABASE_DB_URL must point at the benchmark database first (benchmarks.run does this).
+"""
+import csv
+import io
+import uuid
+from datetime import date, timedelta
+from typing import Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+CURRENCIES = ('EUR', 'GBP', 'CHF', 'USD', 'CAD')
+# EUR -> currency rates the daily random walk starts from
+START_RATES = {'GBP': 0.86, 'CHF': 0.95, 'USD': 1.09, 'CAD': 1.47}
+ACCOUNT_TYPES = ('Current', 'Savings', 'Investment', 'Current', 'Pension', 'Cash')
+INSTITUTIONS = ('Revolut', 'Monzo', 'Wise', 'Barclays', 'Vanguard', 'Trading 212')
+SPENDING_TYPES = ('Current', 'Cash')
+SAVING_TYPES = ('Savings', 'Investment', 'Pension')
+INVESTMENT_TYPES = ('Investment', 'Pension')
+EXPENSE_CATEGORIES = ('Groceries', 'Restaurants', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Health', 'Travel')
+MERCHANTS = (
+    'Tesco', 'Lidl', 'Aldi', 'Sainsbury\'s', 'Pret A Manger', 'Starbucks', 'Uber', 'TfL',
+    'Amazon', 'Netflix', 'Spotify', 'Boots', 'Ryanair', 'Airbnb', 'Deliveroo', 'Zara'
+)
+
+LEDGER_COLUMNS = [
+    'account_index', 'amount', 'transaction_type', 'category', 'transaction_date',
+    'transfer_link', 'description', 'merchant'
+]
+
+
+def benchmark_user_id(name: str) -> str:
+    """Stable user id for a named benchmark dataset."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"finance-dashboard-benchmark/{name}"))
+
+
+def generate_rates(start_date: date, end_date: date, seed: int = 0) -> pd.DataFrame:
+    """Daily EUR -> currency rates between two dates (a small multiplicative random walk)."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start_date, end_date, freq='D')
+    frames = []
+    for currency, start_rate in START_RATES.items():
+        walk = np.exp(np.cumsum(rng.normal(0.0, 0.003, len(days))))
+        frames.append(pd.DataFrame({
+            'base_currency': 'EUR',
+            'target_currency': currency,
+            'rate_date': days.date,
+            'rate': np.round(start_rate * walk, 6)
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _eur_rates(rates: pd.DataFrame, currency: str, days: pd.DatetimeIndex) -> np.ndarray:
+    if currency == 'EUR':
+        return np.ones(len(days))
+    pair = rates[rates['target_currency'] == currency]
+    series = pd.Series(pair['rate'].to_numpy(), index=pd.to_datetime(pair['rate_date']))
+    return series.reindex(days).ffill().bfill().to_numpy()
+
+
+def _day_of_month(months: pd.DatetimeIndex, day: int, end_date: date) -> pd.DatetimeIndex:
+    """The given day of each month, capped at end_date."""
+    days = months + pd.Timedelta(days=day - 1)
+    return days.where(days <= pd.Timestamp(end_date), pd.Timestamp(end_date))
+
+
+def generate_ledger(
+    n_accounts: int,
+    years: float,
+    daily_transactions: float = 1.5,
+    end_date: Optional[date] = None,
+    seed: int = 0
+) -> dict:
+    """
+    Generate one user's accounts, ledger rows and rate history.
+    Returns {"accounts", "transactions", "rates"} DataFrames; transactions reference accounts by
+    position (account_index) and transfer pairs share a transfer_link number.
+    """
+    rng = np.random.default_rng(seed)
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=int(round(years * 365)))
+    days = pd.date_range(start_date, end_date, freq='D')
+    months = pd.date_range(start_date, end_date, freq='MS')
+    rates = generate_rates(start_date, end_date, seed)
+
+    accounts = pd.DataFrame({
+        'account_type': [ACCOUNT_TYPES[i % len(ACCOUNT_TYPES)] for i in range(n_accounts)],
+        'currency_code': [CURRENCIES[i % len(CURRENCIES)] for i in range(n_accounts)],
+        'institution': [INSTITUTIONS[i % len(INSTITUTIONS)] for i in range(n_accounts)]
+    })
+    accounts['account_name'] = [
+        f"{row.institution} {row.account_type} {row.currency_code} {i + 1}"
+        for i, row in enumerate(accounts.itertuples())
+    ]
+
+    frames = [pd.DataFrame({
+        'account_index': accounts.index,
+        'amount': np.round(rng.uniform(1000, 20000, n_accounts), 2),
+        'transaction_type': 'income',
+        'category': 'Initial Balance',
+        'transaction_date': start_date,
+        'description': 'Initial Balance'
+    })]
+
+    spending = accounts.index[accounts['account_type'].isin(SPENDING_TYPES)]
+    saving = accounts.index[accounts['account_type'].isin(SAVING_TYPES)]
+    investment = accounts.index[accounts['account_type'].isin(INVESTMENT_TYPES)]
+    # Spending is split over the spending accounts so the total matches daily_transactions
+    per_account = daily_transactions / max(len(spending), 1)
+
+    next_link = 1
+    for account_index in spending:
+        counts = rng.poisson(per_account, len(days))
+        n = int(counts.sum())
+        merchants = rng.choice(MERCHANTS, n)
+        frames.append(pd.DataFrame({
+            'account_index': account_index,
+            'amount': -np.round(np.clip(rng.lognormal(3.0, 1.0, n), 0.5, 2000), 2),
+            'transaction_type': 'expense',
+            'category': rng.choice(EXPENSE_CATEGORIES, n),
+            'transaction_date': np.repeat(days.date, counts),
+            'description': merchants,
+            'merchant': merchants
+        }))
+
+        if accounts.at[account_index, 'account_type'] == 'Current':
+            frames.append(pd.DataFrame({
+                'account_index': account_index,
+                'amount': np.round(rng.normal(3500, 150, len(months)), 2),
+                'transaction_type': 'income',
+                'category': 'Salary',
+                'transaction_date': _day_of_month(months, 25, end_date).date,
+                'description': 'Salary'
+            }))
+
+            if len(saving):
+                # Monthly transfer to a savings account, as the linked pair the transfers API writes
+                targets = rng.choice(saving, len(months))
+                transfer_days = _day_of_month(months, 26, end_date)
+                source_currency = accounts.at[account_index, 'currency_code']
+                amounts = np.round(rng.uniform(200, 1500, len(months)), 2)
+                source_rates = _eur_rates(rates, source_currency, transfer_days)
+                target_amounts = np.empty(len(months))
+                for target in np.unique(targets):
+                    mask = targets == target
+                    target_rates = _eur_rates(rates, accounts.at[target, 'currency_code'], transfer_days[mask])
+                    target_amounts[mask] = np.round(amounts[mask] / source_rates[mask] * target_rates, 2)
+                links = np.arange(next_link, next_link + len(months))
+                next_link += len(months)
+                descriptions = [
+                    f"Transfer (from {accounts.at[account_index, 'account_name']} to {accounts.at[target, 'account_name']})"
+                    for target in targets
+                ]
+                frames.append(pd.DataFrame({
+                    'account_index': account_index, 'amount': -amounts, 'transaction_type': 'transfer',
+                    'category': 'Transfer', 'transaction_date': transfer_days.date, 'transfer_link': links,
+                    'description': descriptions, 'merchant': accounts.loc[targets, 'account_name'].to_numpy()
+                }))
+                frames.append(pd.DataFrame({
+                    'account_index': targets, 'amount': target_amounts, 'transaction_type': 'transfer',
+                    'category': 'Transfer', 'transaction_date': transfer_days.date, 'transfer_link': links,
+                    'description': descriptions, 'merchant': accounts.at[account_index, 'account_name']
+                }))
+
+    for account_index in investment:
+        adjustments = np.round(rng.normal(60, 400, len(months)), 2)
+        frames.append(pd.DataFrame({
+            'account_index': account_index,
+            'amount': adjustments,
+            'transaction_type': 'income',
+            'category': np.where(adjustments > 0, 'Market Gain', 'Market Loss'),
+            'transaction_date': _day_of_month(months, 28, end_date).date,
+            'description': 'Market adjustment'
+        }))
+
+    transactions = pd.concat(frames, ignore_index=True).reindex(columns=LEDGER_COLUMNS)
+    transactions = transactions.sort_values(['transaction_date', 'account_index'], kind='stable', ignore_index=True)
+    transactions['transfer_link'] = transactions['transfer_link'].astype('Int64')
+    return {'accounts': accounts, 'transactions': transactions, 'rates': rates}
+
+
+def generate_revolut_statement(n_rows: int, end_date: Optional[date] = None, currency: str = 'EUR', seed: int = 0) -> bytes:
+    """A Revolut account statement CSV (the format detected as 'revolut_statement') with n_rows rows."""
+    rng = np.random.default_rng(seed)
+    end_date = end_date or date.today()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Type', 'Product', 'Started Date', 'Completed Date', 'Description', 'Amount', 'Fee', 'Currency', 'State', 'Balance'])
+    balance = 5000.0
+    for i in range(n_rows):
+        started = pd.Timestamp(end_date) - pd.Timedelta(minutes=int(rng.integers(0, 90 * 24 * 60)))
+        if i % 20 == 0:
+            tx_type, description, amount = 'Topup', 'Payment from Employer Ltd', round(float(rng.normal(3500, 150)), 2)
+        else:
+            tx_type, description, amount = 'Card Payment', str(rng.choice(MERCHANTS)), -round(float(np.clip(rng.lognormal(3.0, 1.0), 0.5, 2000)), 2)
+        balance += amount
+        timestamp = started.strftime('%Y-%m-%d %H:%M:%S')
+        writer.writerow([tx_type, 'Current', timestamp, timestamp, description, f"{amount:.2f}", '0.00', currency, 'COMPLETED', f"{balance:.2f}"])
+    return output.getvalue().encode('utf-8')
+
+
+def _copy_rows(conn, table: str, columns: list[str], df: pd.DataFrame):
+    """Bulk-load a DataFrame with COPY (psycopg2 connection)."""
+    buffer = io.StringIO()
+    df[columns].to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    cursor.close()
+
+
+def load_ledger(conn, user_id: str, data: dict):
+    """
+    Replace a user's accounts and ledger with a generated one (on a synchronous psycopg2
+    connection), add missing rates, and rebuild balances.current and balances.snapshot.
+    Returns the account ids in account_index order. The caller commits.
+    """
+    from app.db.balance_store import rebuild_balance_store
+
+    # Ledger, balance store and snapshot rows go with the accounts (ON DELETE CASCADE)
+    conn.execute(text("DELETE FROM accounts.list WHERE user_id = :user_id"), {"user_id": user_id})
+
+    accounts = data['accounts']
+    account_ids = [
+        conn.execute(text("""
+            INSERT INTO accounts.list (account_name, account_type, institution, currency_code, user_id)
+            VALUES (:account_name, :account_type, :institution, :currency_code, :user_id)
+            RETURNING account_id
+        """), {**row, "user_id": user_id}).scalar()
+        for row in accounts[['account_name', 'account_type', 'institution', 'currency_code']].to_dict('records')
+    ]
+
+    transactions = data['transactions'].copy()
+    transactions['account_id'] = np.asarray(account_ids)[transactions['account_index'].to_numpy()]
+    transactions['user_id'] = user_id
+    links = transactions['transfer_link'].dropna().unique()
+    if len(links):
+        link_ids = conn.execute(
+            text("SELECT nextval('transactions.transfer_link_seq') FROM generate_series(1, :n)"),
+            {"n": len(links)}
+        ).scalars().all()
+        transactions['transfer_link_id'] = transactions['transfer_link'].map(dict(zip(links, link_ids))).astype('Int64')
+    else:
+        transactions['transfer_link_id'] = pd.array([pd.NA] * len(transactions), dtype='Int64')
+    _copy_rows(conn, 'transactions.ledger', [
+        'account_id', 'amount', 'transaction_type', 'category', 'transaction_date',
+        'transfer_link_id', 'description', 'merchant', 'user_id'
+    ], transactions)
+
+    # Rates are shared by all users; keep the ones already there
+    conn.execute(text("""
+        CREATE TEMPORARY TABLE benchmark_rates (
+            base_currency VARCHAR(3), target_currency VARCHAR(3), rate_date DATE, rate DECIMAL(15, 6)
+        ) ON COMMIT DROP
+    """))
+    _copy_rows(conn, 'benchmark_rates', ['base_currency', 'target_currency', 'rate_date', 'rate'], data['rates'])
+    conn.execute(text("""
+        INSERT INTO exchange_rates.rate_history (base_currency, target_currency, rate_date, rate)
+        SELECT base_currency, target_currency, rate_date, rate FROM benchmark_rates
+        ON CONFLICT (base_currency, target_currency, rate_date) DO NOTHING
+    """))
+
+    # Also rebuilds the accounts' snapshots
+    rebuild_balance_store(conn, user_id=user_id)
+    return account_ids
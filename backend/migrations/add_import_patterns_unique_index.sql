@@ -0,0 +1,36 @@
+-- Migration: One learned pattern per (pattern_type, lowercased pattern_value)
+-- Run this in Supabase SQL Editor
+--
+-- Confirming a CSV import upserts its learned patterns in one
+-- INSERT ... ON CONFLICT (pattern_type, (LOWER(pattern_value))) statement, which needs this
+-- unique index. Existing duplicates are merged into the most used row first.
+
+WITH ranked AS (
+    SELECT
+        pattern_id,
+        FIRST_VALUE(pattern_id) OVER w AS keep_id,
+        SUM(usage_count) OVER (PARTITION BY pattern_type, LOWER(pattern_value)) AS total_usage,
+        MAX(confidence_score) OVER (PARTITION BY pattern_type, LOWER(pattern_value)) AS max_confidence,
+        MAX(last_used) OVER (PARTITION BY pattern_type, LOWER(pattern_value)) AS latest_use
+    FROM import_patterns
+    WINDOW w AS (
+        PARTITION BY pattern_type, LOWER(pattern_value)
+        ORDER BY usage_count DESC, confidence_score DESC, pattern_id
+    )
+),
+merged AS (
+    UPDATE import_patterns p
+    SET usage_count = r.total_usage,
+        confidence_score = r.max_confidence,
+        last_used = r.latest_use
+    FROM ranked r
+    WHERE p.pattern_id = r.pattern_id AND r.pattern_id = r.keep_id
+)
+DELETE FROM import_patterns p
+USING ranked r
+WHERE p.pattern_id = r.pattern_id AND r.pattern_id <> r.keep_id;
+
+-- The unique index also serves the lookups the plain one did
+DROP INDEX IF EXISTS idx_pattern_type_value;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pattern_type_value_unique
+    ON import_patterns(pattern_type, LOWER(pattern_value));
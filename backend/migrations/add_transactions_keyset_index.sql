@@ -0,0 +1,9 @@
+-- Migration: Index for keyset pagination of GET /api/transactions
+-- Run this in Supabase SQL Editor
+--
+-- Pages are ordered by (transaction_date DESC, transaction_id DESC) per user and continue
+-- after the last row of the previous page, so with this index every page is a short
+-- index range scan no matter how deep it is.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+    ON transactions.ledger(user_id, transaction_date DESC, transaction_id DESC);
@@ -0,0 +1,38 @@
+-- Migration: Maintained current balance per account
+-- Run this in Supabase SQL Editor
+--
+-- balances.current holds one row per account with the sum of its ledger rows and the
+-- date of its latest transaction. The API keeps it up to date on every ledger write, so
+-- GET /api/balances no longer aggregates the whole ledger.
+--
+-- If the ledger is modified outside the API (SQL editor, scripts), re-sync with:
+--   python migrations/rebuild_balance_store.py
+
+CREATE SCHEMA IF NOT EXISTS balances;
+
+CREATE TABLE IF NOT EXISTS balances.current (
+    account_id INTEGER PRIMARY KEY REFERENCES accounts.list(account_id) ON DELETE CASCADE,
+    amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    balance_date DATE,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Backfill from the existing ledger
+INSERT INTO balances.current (account_id, amount, balance_date)
+SELECT
+    a.account_id,
+    COALESCE(SUM(t.amount), 0),
+    MAX(t.transaction_date)
+FROM accounts.list a
+LEFT JOIN transactions.ledger t ON t.account_id = a.account_id
+GROUP BY a.account_id
+ON CONFLICT (account_id) DO UPDATE
+SET amount = EXCLUDED.amount,
+    balance_date = EXCLUDED.balance_date,
+    updated_at = CURRENT_TIMESTAMP;
+
+COMMENT ON TABLE balances.current IS 'Current balance per account, maintained on every ledger write';
+COMMENT ON COLUMN balances.current.balance_date IS 'Date of the latest transaction in the account (NULL if it has none)';
+
+-- Verify
+SELECT COUNT(*) AS accounts_with_balance FROM balances.current;
@@ -12,7 +12,7 @@ CREATE TABLE IF NOT EXISTS import_patterns (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX IF NOT EXISTS idx_pattern_type_value ON import_patterns(pattern_type, LOWER(pattern_value));
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pattern_type_value_unique ON import_patterns(pattern_type, LOWER(pattern_value));
 CREATE INDEX IF NOT EXISTS idx_pattern_merchant ON import_patterns(pattern_type, LOWER(pattern_value)) WHERE pattern_type = 'merchant';
 CREATE INDEX IF NOT EXISTS idx_pattern_account ON import_patterns(matched_account_id) WHERE matched_account_id IS NOT NULL;
 
@@ -0,0 +1,34 @@
+-- Migration: Use balances.snapshot for end-of-day balance rollups
+-- Run this in Supabase SQL Editor
+--
+-- balances.snapshot is left over from the snapshot-based balances system and nothing
+-- writes to it any more. From now on it holds, for every account and every day with
+-- ledger activity, the account's balance at the end of that day. The API keeps it up
+-- to date on every ledger write; GET /api/balances?date=... reads from it.
+--
+-- To rebuild it later (e.g. after editing the ledger outside the API):
+--   python migrations/rollup_balance_snapshots.py
+
+-- Step 1: Keep any legacy snapshot rows in a side table
+CREATE TABLE IF NOT EXISTS balances.snapshot_legacy AS
+SELECT * FROM balances.snapshot;
+
+-- Step 2: Replace the contents with rollups computed from the ledger
+DELETE FROM balances.snapshot;
+
+INSERT INTO balances.snapshot (balance_date, account_id, amount)
+SELECT
+    transaction_date,
+    account_id,
+    SUM(SUM(amount)) OVER (PARTITION BY account_id ORDER BY transaction_date)
+FROM transactions.ledger
+GROUP BY account_id, transaction_date;
+
+-- Step 3: As-of lookups search by (account_id, balance_date DESC)
+CREATE INDEX IF NOT EXISTS idx_balances_account_date ON balances.snapshot(account_id, balance_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions.ledger(account_id, transaction_date);
+
+COMMENT ON TABLE balances.snapshot IS 'End-of-day balance per account for each day with ledger activity, maintained on every ledger write';
+
+-- Verify
+SELECT COUNT(*) AS snapshots, COUNT(DISTINCT account_id) AS accounts FROM balances.snapshot;
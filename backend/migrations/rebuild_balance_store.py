@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Check or rebuild balances.current (and the balances.snapshot rollups) from transactions.ledger.
+
+The API keeps balances.current up to date on every ledger write. Run this after
+editing the ledger outside the API (SQL editor, other migration scripts), or with
+--check to verify the store without changing it.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Make the app package importable when run from backend/ or backend/migrations/
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.db.database import engine
+from app.db.balance_store import check_balance_store, rebuild_balance_store
+
+
+def main(check_only=False, user_id=None):
+    """Report inconsistencies between balances.current and the ledger, then rebuild unless check_only."""
+    print("=" * 60)
+    print("Balance Store Consistency Check")
+    print("=" * 60)
+    print()
+
+    try:
+        with engine.connect() as conn:
+            mismatches = check_balance_store(conn, user_id=user_id)
+
+            if not mismatches:
+                print("✅ balances.current matches the ledger.")
+            else:
+                print(f"⚠️  {len(mismatches)} account(s) out of sync:")
+                for m in mismatches:
+                    print(f"    - {m['account_id']} ({m['account_name']}): "
+                          f"stored {m['stored_amount']} @ {m['stored_date']}, "
+                          f"ledger {m['ledger_amount']} @ {m['ledger_date']}")
+            print()
+
+            if check_only:
+                if mismatches:
+                    sys.exit(1)
+                return
+
+            print("🔄 Rebuilding balances.current from the ledger...")
+            rebuilt = rebuild_balance_store(conn, user_id=user_id)
+            conn.commit()
+            print(f"✅ Rebuilt {rebuilt} account balance(s).")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check or rebuild the maintained balance store')
+    parser.add_argument('--check', action='store_true', help='Only report inconsistencies (exit code 1 if any)')
+    parser.add_argument('--user-id', help='Limit to the accounts of one user')
+    args = parser.parse_args()
+    main(check_only=args.check, user_id=args.user_id)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Rebuild the end-of-day balance rollups in balances.snapshot from transactions.ledger.
+
+The API updates snapshots on every ledger write, so this only needs to run after the
+ledger was changed outside the API, or periodically as a safety net. With --since only
+the snapshots on or after that date are recomputed.
+"""
+
+import sys
+import argparse
+from datetime import date
+from pathlib import Path
+
+# Make the app package importable when run from backend/ or backend/migrations/
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.db.database import engine
+from app.db.balance_snapshots import rollup_snapshots
+
+
+def main(user_id=None, since=None):
+    """Recompute balance snapshots for all accounts (or one user's accounts)."""
+    print("=" * 60)
+    print("Balance Snapshot Rollup")
+    print("=" * 60)
+    print()
+
+    try:
+        with engine.connect() as conn:
+            scope = f"user {user_id}" if user_id else "all users"
+            period = f"from {since}" if since else "full history"
+            print(f"🔄 Rolling up snapshots for {scope} ({period})...")
+
+            accounts = rollup_snapshots(conn, user_id=user_id, since=since)
+            conn.commit()
+
+            print(f"✅ Rolled up snapshots for {accounts} account(s).")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild end-of-day balance snapshots')
+    parser.add_argument('--user-id', help='Limit to the accounts of one user')
+    parser.add_argument('--since', type=date.fromisoformat, help='Only recompute snapshots on or after this date (YYYY-MM-DD)')
+    args = parser.parse_args()
+    main(user_id=args.user_id, since=args.since)
@@ -44,13 +44,11 @@ export const useComparisonExpenses = (options: UseComparisonExpensesOptions) =>
       
       // If date range is provided, load expenses directly for that range
       if (dateRangeStart && dateRangeEnd) {
-        const allTransactions = await api.getTransactions(
-          undefined, // account_id - get all accounts
-          'expense', // transaction_type
-          undefined, // category
-          dateRangeStart, // start_date
-          dateRangeEnd    // end_date
-        );
+        const allTransactions = await api.getTransactions({
+          transactionType: 'expense',
+          startDate: dateRangeStart,
+          endDate: dateRangeEnd,
+        });
         setAllComparisonExpenses(allTransactions);
         setLoading(false);
         return;
@@ -129,24 +127,20 @@ export const useComparisonExpenses = (options: UseComparisonExpensesOptions) =>
         }
       }
 
-      // Load transactions for all periods using server-side date filtering
-      const allTransactions: Transaction[] = [];
-      
-      // Load transactions for each period using date range filters
-      for (const period of periods) {
-        const startDate = period.start.toISOString().split('T')[0];
-        const endDate = period.end.toISOString().split('T')[0];
-        
-        const periodExpenses = await api.getTransactions(
-          undefined, // account_id - get all accounts
-          'expense', // transaction_type
-          undefined, // category
-          startDate, // start_date
-          endDate    // end_date
-        );
-        
-        allTransactions.push(...periodExpenses);
+      if (periods.length === 0) {
+        setAllComparisonExpenses([]);
+        return;
       }
+
+      // The periods are consecutive, so one server-side date range from the first period's start
+      // to the last period's end covers them all
+      const startDate = periods[0].start.toISOString().split('T')[0];
+      const endDate = periods[periods.length - 1].end.toISOString().split('T')[0];
+      const allTransactions = await api.getTransactions({
+        transactionType: 'expense',
+        startDate,
+        endDate,
+      });
       
       setAllComparisonExpenses(allTransactions);
     } catch (err) {
@@ -10,8 +10,9 @@ interface UseExpenseDataOptions {
   filterAccountId?: number | '';
   filterCategory?: string;
   filterCurrency?: string;
-  // For trips, we need all expenses regardless of date
-  includeAllForTrips?: boolean;
+  // Explicit date range (YYYY-MM-DD) used instead of the selectedMonth period;
+  // a missing bound leaves that side open
+  dateRange?: { start?: string; end?: string };
 }
 
 export const useExpenseData = (options: UseExpenseDataOptions) => {
@@ -22,8 +23,11 @@ export const useExpenseData = (options: UseExpenseDataOptions) => {
     filterAccountId,
     filterCategory,
     filterCurrency,
-    includeAllForTrips = false,
+    dateRange,
   } = options;
+  const rangeStart = dateRange?.start;
+  const rangeEnd = dateRange?.end;
+  const hasDateRange = dateRange !== undefined;
 
   const [expenses, setExpenses] = useState<Transaction[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
@@ -38,21 +42,24 @@ export const useExpenseData = (options: UseExpenseDataOptions) => {
       let startDate: string | undefined;
       let endDate: string | undefined;
       
-      if (!includeAllForTrips) {
+      if (hasDateRange) {
+        startDate = rangeStart;
+        endDate = rangeEnd;
+      } else {
         const { start, end } = getPeriodDates(selectedMonth, frequency, startDay);
         startDate = start.toISOString().split('T')[0];
         endDate = end.toISOString().split('T')[0];
       }
       
       // Get all transactions with type 'expense' using server-side filtering
-      const transactions = await api.getTransactions(
-        filterAccountId || undefined,
-        'expense',
-        filterCategory || undefined,
+      const transactions = await api.getTransactions({
+        accountId: filterAccountId || undefined,
+        transactionType: 'expense',
+        category: filterCategory || undefined,
         startDate,
         endDate,
-        filterCurrency || undefined
-      );
+        currencyCode: filterCurrency || undefined,
+      });
       
       setExpenses(transactions);
     } catch (err) {
@@ -60,7 +67,7 @@ export const useExpenseData = (options: UseExpenseDataOptions) => {
     } finally {
       setLoading(false);
     }
-  }, [selectedMonth, frequency, startDay, filterAccountId, filterCategory, filterCurrency, includeAllForTrips]);
+  }, [selectedMonth, frequency, startDay, filterAccountId, filterCategory, filterCurrency, hasDateRange, rangeStart, rangeEnd]);
 
   useEffect(() => {
     loadExpenses();
@@ -3,7 +3,7 @@ import { Transaction } from '../../../services/api';
 import { api } from '../../../services/api';
 
 /**
- * Hook to load ALL expenses for trips (independent of date filters)
+ * Hook to load all expenses linked to a trip (independent of date filters)
  * This should be used sparingly and only when trips section is visible
  */
 export const useTripExpenses = (enabled: boolean = false) => {
@@ -20,12 +20,12 @@ export const useTripExpenses = (enabled: boolean = false) => {
     try {
       setLoading(true);
       setError(null);
-      // Load all expense transactions from all accounts (no date filter)
-      const allTransactions = await api.getTransactions(
-        undefined, // account_id - get all accounts
-        'expense'  // transaction_type
-      );
-      setTripExpenses(allTransactions);
+      // Load the trip-linked expense transactions from all accounts (no date filter)
+      const tripTransactions = await api.getTransactions({
+        transactionType: 'expense',
+        hasTrip: true,
+      });
+      setTripExpenses(tripTransactions);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to load trip expenses');
     } finally {
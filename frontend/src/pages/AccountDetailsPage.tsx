@@ -38,6 +38,8 @@ const AccountDetailsPage: React.FC = () => {
   const [account, setAccount] = useState<Account | null>(null);
   const [balanceHistory, setBalanceHistory] = useState<BalanceHistory[]>([]);
   const [transactions, setTransactions] = useState<Transaction[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [trips, setTrips] = useState<Trip[]>([]);
   const [currentBalance, setCurrentBalance] = useState<Balance | null>(null);
   const [loading, setLoading] = useState(true);
@@ -93,11 +95,11 @@ const AccountDetailsPage: React.FC = () => {
       setLoading(true);
       setError(null);
 
-      // Load account details, current balance, transactions (includes expenses), trips, categories, and all accounts (for transfers)
-      const [accounts, balancesData, txs, tripsData, categoriesData, allAccountsData] = await Promise.all([
+      // Load account details, current balance, the first page of transactions (includes expenses), trips, categories, and all accounts (for transfers)
+      const [accounts, balancesData, txPage, tripsData, categoriesData, allAccountsData] = await Promise.all([
         api.getAccounts(),
         api.getBalances(selectedCurrency),
-        api.getTransactions(id),
+        api.getTransactionPage({ accountId: id }),
         api.getTrips(),
         api.getCategories(),
         api.getAccounts(), // Load all accounts for transfer dropdown
@@ -109,8 +111,10 @@ const AccountDetailsPage: React.FC = () => {
         return;
       }
 
+      const txs = txPage.items;
       setAccount(accountData);
       setTransactions(txs);
+      setNextCursor(txPage.next_cursor);
       setTrips(tripsData);
       setCategories(categoriesData);
       setAllAccounts(allAccountsData);
@@ -441,6 +445,23 @@ const AccountDetailsPage: React.FC = () => {
     }
   };
 
+  const handleLoadMoreTransactions = async () => {
+    if (!accountId || !nextCursor) return;
+
+    try {
+      setLoadingMore(true);
+      setError(null);
+
+      const page = await api.getTransactionPage({ accountId: parseInt(accountId) }, nextCursor);
+      setTransactions(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load more transactions');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const availableCategories = editingTransaction
     ? editingTransaction.transaction_type === 'expense'
       ? categories.expense_categories
@@ -790,7 +811,7 @@ const AccountDetailsPage: React.FC = () => {
                     fontFamily: 'Inter, -apple-system, sans-serif',
                   }}
                 >
-                  Transactions ({transactions.length})
+                  Transactions ({transactions.length}{nextCursor ? '+' : ''})
                 </Typography>
                 <Box sx={{ display: 'flex', gap: 2 }}>
                   {account?.account_type === 'Investment' && (
@@ -842,6 +863,26 @@ const AccountDetailsPage: React.FC = () => {
                 onDelete={handleDeleteClick}
                 colors={colors}
               />
+              {nextCursor && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                  <Button
+                    onClick={handleLoadMoreTransactions}
+                    disabled={loadingMore}
+                    variant="outlined"
+                    startIcon={loadingMore ? <CircularProgress size={16} /> : undefined}
+                    sx={{
+                      borderColor: colors.card_accent,
+                      color: colors.card_accent,
+                      '&:hover': {
+                        borderColor: colors.card_accent,
+                        backgroundColor: hexToRgba(colors.card_accent, 0.1),
+                      },
+                    }}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </Button>
+                </Box>
+              )}
             </CardContent>
           </Card>
         </Box>
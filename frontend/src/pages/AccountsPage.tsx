@@ -133,10 +133,10 @@ const AccountsPage: React.FC = () => {
       
       // Fetch existing initial balance transaction if it exists
       try {
-        const transactions = await api.getTransactions(selectedAccount.account_id);
-        const initialBalanceTx = transactions.find(
-          tx => tx.category === 'Initial Balance'
+        const { items } = await api.getTransactionPage(
+          { accountId: selectedAccount.account_id, category: 'Initial Balance' }, null, 1
         );
+        const initialBalanceTx = items[0];
         if (initialBalanceTx) {
           setEditingInitialBalance(initialBalanceTx.amount);
           setEditingInitialBalanceDate(initialBalanceTx.transaction_date);
@@ -203,10 +203,10 @@ const AccountsPage: React.FC = () => {
       // Handle initial balance if provided
       if (editingInitialBalance !== null) {
         // Check if initial balance transaction exists
-        const transactions = await api.getTransactions(editingAccountId);
-        const existingInitialBalance = transactions.find(
-          tx => tx.category === 'Initial Balance'
+        const { items } = await api.getTransactionPage(
+          { accountId: editingAccountId, category: 'Initial Balance' }, null, 1
         );
+        const existingInitialBalance = items[0];
         
         if (existingInitialBalance) {
           // Update existing initial balance transaction
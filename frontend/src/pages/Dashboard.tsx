@@ -63,7 +63,6 @@ const Dashboard: React.FC = () => {
   const [accounts, setAccounts] = useState<Account[]>([]);
   const [budgets, setBudgets] = useState<Budget[]>([]);
   const [transactions, setTransactions] = useState<Transaction[]>([]);
-  const [allTransactions, setAllTransactions] = useState<Transaction[]>([]); // All transactions for daily chart
   const [selectedBudgetId, setSelectedBudgetId] = useState<string>(() => {
     const stored = localStorage.getItem('dashboardSelectedBudgetId');
     return stored || '';
@@ -92,20 +91,26 @@ const Dashboard: React.FC = () => {
     try {
       setLoading(true);
       setError(null);
-      const [currenciesData, accountTypesData, accountsData, budgetsData, transactionsData, allTransactionsData] = await Promise.all([
+      // The spending, cash flow and budget cards only cover the current 24th-23rd period,
+      // so only that period's expenses are fetched
+      const now = new Date();
+      const periodStartMonth = now.getDate() >= 24 ? now.getMonth() : now.getMonth() - 1;
+      const toDateString = (d: Date) =>
+        `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+      const periodStart = toDateString(new Date(now.getFullYear(), periodStartMonth, 24));
+      const periodEnd = toDateString(new Date(now.getFullYear(), periodStartMonth + 1, 23));
+      const [currenciesData, accountTypesData, accountsData, budgetsData, transactionsData] = await Promise.all([
         api.getCurrencies().catch(() => ['EUR', 'GBP', 'USD', 'CHF']),
         api.getAccountTypeCategories().catch(() => ({ cash_types: ['Cash', 'Current', 'Checking', 'Savings'], investment_types: ['Investment', 'Stocks', 'Crypto', 'Pension'] })),
         api.getAccounts(),
         api.getBudgets().catch(() => []),
-        api.getTransactions(undefined, 'expense').catch(() => []),
-        api.getTransactions() // Get all transactions for daily chart calculation
+        api.getTransactions({ transactionType: 'expense', startDate: periodStart, endDate: periodEnd }).catch(() => [])
       ]);
       setCurrencies(currenciesData);
       setAccountTypes(accountTypesData);
       setAccounts(accountsData);
       setBudgets(budgetsData);
       setTransactions(transactionsData);
-      setAllTransactions(allTransactionsData);
       await loadLatestData();
     } catch (err) {
       console.error('Error loading initial data:', err);
@@ -113,7 +113,7 @@ const ExpenseTracking: React.FC = () => {
     return stored || '';
   });
   
-  // Load all expenses (no period filtering, we'll filter by date range client-side)
+  // Load the expenses in the selected date range (server-side filtered)
   const { expenses, loading: expensesLoading, error: expensesError, reload: reloadExpenses } = useExpenseData({
     selectedMonth: '', // Not used anymore
     frequency: 'monthly', // Not used anymore
@@ -121,10 +121,10 @@ const ExpenseTracking: React.FC = () => {
     filterAccountId: filterAccountId || undefined,
     filterCategory: filterCategory || undefined,
     filterCurrency: filterCurrency || undefined,
-    includeAllForTrips: true, // Load all expenses for date range filtering
+    dateRange: { start: filterStartDate || undefined, end: filterEndDate || undefined },
   });
 
-  // Load trip expenses separately (all expenses, independent of date filter)
+  // Load trip expenses separately (all trip-linked expenses, independent of date filter)
   // Only load when trips section might be visible
   const { tripExpenses, loading: tripExpensesLoading } = useTripExpenses(true); // Always load for trips
 
@@ -566,7 +566,7 @@ const ExpenseTracking: React.FC = () => {
   }, [filteredExpenses, colorPalette, displayCurrency, exchangeRates, categoryView, colors.donut_colors, convertAmount]);
 
   // Calculate trip data separately (independent of date filter)
-  // Use tripExpenses from useTripExpenses hook (all expenses, not period-filtered)
+  // Use tripExpenses from useTripExpenses hook (trip-linked expenses, not period-filtered)
   const tripData = useMemo(() => {
     // Only include expenses with trip_id (filter out null, undefined, and 0)
     const tripExpensesFiltered = tripExpenses.filter(expense => 
@@ -28,6 +28,15 @@ export interface BalanceHistory {
   balance_cad?: number;
 }
 
+export interface BalanceHistorySeries {
+  account_id: number;
+  account_name: string;
+  account_type: string;
+  institution: string;
+  currency_code: string;
+  history: BalanceHistory[];
+}
+
 export interface Account {
   account_id: number;
   account_name: string;
@@ -50,6 +59,23 @@ export interface Transaction {
   currency_code?: string | null;  // Currency code from accounts.list
 }
 
+export interface TransactionPage {
+  items: Transaction[];
+  next_cursor: string | null;
+}
+
+// Server-side filters of GET /api/transactions
+export interface TransactionFilters {
+  accountId?: number;
+  transactionType?: string;
+  category?: string;
+  startDate?: string;
+  endDate?: string;
+  currencyCode?: string;
+  tripId?: number;
+  hasTrip?: boolean;
+}
+
 export interface Trip {
   trip_id: number;
   trip_name: string;
@@ -90,6 +116,10 @@ export interface Metrics {
   cash_investment_ratio: number;
 }
 
+export interface MetricsHistoryPoint extends Metrics {
+  date: string;
+}
+
 export interface Budget {
   budget_id: number;
   name: string;
@@ -231,6 +261,38 @@ async function fetchAPI<T>(endpoint: string, options?: RequestInit): Promise<T>
   return data;
 }
 
+export const TRANSACTION_PAGE_SIZE = 100;
+const MAX_TRANSACTION_PAGE_SIZE = 1000;
+
+const transactionFilterParams = (filters: TransactionFilters): URLSearchParams => {
+  const params = new URLSearchParams();
+  if (filters.accountId) {
+    params.append('account_id', filters.accountId.toString());
+  }
+  if (filters.transactionType) {
+    params.append('transaction_type', filters.transactionType);
+  }
+  if (filters.category) {
+    params.append('category', filters.category);
+  }
+  if (filters.startDate) {
+    params.append('start_date', filters.startDate);
+  }
+  if (filters.endDate) {
+    params.append('end_date', filters.endDate);
+  }
+  if (filters.currencyCode) {
+    params.append('currency_code', filters.currencyCode);
+  }
+  if (filters.tripId) {
+    params.append('trip_id', filters.tripId.toString());
+  }
+  if (filters.hasTrip !== undefined) {
+    params.append('has_trip', filters.hasTrip.toString());
+  }
+  return params;
+};
+
 export const api = {
   getBalances: async (currency: string = 'EUR', date?: string): Promise<Balance[]> => {
     const params = new URLSearchParams({ currency });
@@ -240,50 +302,55 @@ export const api = {
 
   getAccountBalanceHistory: async (
     accountName: string,
-    currency: string = 'EUR'
+    currency: string = 'EUR',
+    currencies?: string[]  // Fetch several balance_<currency> columns in one call
   ): Promise<BalanceHistory[]> => {
     const encodedName = encodeURIComponent(accountName.replace(/ /g, '_').replace(/\//g, '_'));
     const params = new URLSearchParams({ currency });
+    if (currencies && currencies.length > 0) params.append('currencies', currencies.join(','));
     return fetchAPI<BalanceHistory[]>(`/api/balances/history/${encodedName}?${params}`);
   },
 
+  getBalanceHistories: async (
+    accountNames?: string[],  // Defaults to all accounts
+    currency: string = 'EUR',
+    currencies?: string[]
+  ): Promise<BalanceHistorySeries[]> => {
+    const params = new URLSearchParams({ currency });
+    accountNames?.forEach(name => params.append('accounts', name));
+    if (currencies && currencies.length > 0) params.append('currencies', currencies.join(','));
+    return fetchAPI<BalanceHistorySeries[]>(`/api/balances/history?${params}`);
+  },
+
   getAccounts: async (): Promise<Account[]> => {
     return fetchAPI<Account[]>('/api/accounts');
   },
 
-  getTransactions: async (
-    accountId?: number, 
-    transactionType?: string, 
-    category?: string,
-    startDate?: string,
-    endDate?: string,
-    currencyCode?: string,
-    tripId?: number
-  ): Promise<Transaction[]> => {
-    const params = new URLSearchParams();
-    if (accountId) {
-      params.append('account_id', accountId.toString());
-    }
-    if (transactionType) {
-      params.append('transaction_type', transactionType);
+  // One page of transactions, newest first; pass the previous page's next_cursor for the next one
+  getTransactionPage: async (
+    filters: TransactionFilters = {},
+    cursor?: string | null,
+    limit: number = TRANSACTION_PAGE_SIZE
+  ): Promise<TransactionPage> => {
+    const params = transactionFilterParams(filters);
+    params.append('limit', limit.toString());
+    if (cursor) {
+      params.append('cursor', cursor);
     }
-    if (category) {
-      params.append('category', category);
-    }
-    if (startDate) {
-      params.append('start_date', startDate);
-    }
-    if (endDate) {
-      params.append('end_date', endDate);
-    }
-    if (currencyCode) {
-      params.append('currency_code', currencyCode);
-    }
-    if (tripId) {
-      params.append('trip_id', tripId.toString());
-    }
-    const queryString = params.toString();
-    return fetchAPI<Transaction[]>(`/api/transactions${queryString ? '?' + queryString : ''}`);
+    return fetchAPI<TransactionPage>(`/api/transactions?${params}`);
+  },
+
+  // Every transaction matching the filters. Only for bounded reads (a date range, a trip, a category):
+  // list views page through getTransactionPage instead of loading the whole ledger.
+  getTransactions: async (filters: TransactionFilters): Promise<Transaction[]> => {
+    const transactions: Transaction[] = [];
+    let cursor: string | null = null;
+    do {
+      const page: TransactionPage = await api.getTransactionPage(filters, cursor, MAX_TRANSACTION_PAGE_SIZE);
+      transactions.push(...page.items);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return transactions;
   },
 
   getAccountBalance: async (accountName: string, currency: string = 'EUR'): Promise<Balance | null> => {
@@ -438,6 +505,13 @@ export const api = {
     return fetchAPI<Metrics>(`/api/metrics?${params}`);
   },
 
+  getMetricsHistory: async (currency: string = 'EUR', from?: string, to?: string, interval: 'day' | 'week' | 'month' = 'day'): Promise<MetricsHistoryPoint[]> => {
+    const params = new URLSearchParams({ currency, interval });
+    if (from) params.append('from', from);
+    if (to) params.append('to', to);
+    return fetchAPI<MetricsHistoryPoint[]>(`/api/metrics/history?${params}`);
+  },
+
   // Budgets
   getBudgets: async (): Promise<Budget[]> => {
     return fetchAPI<Budget[]>('/api/budgets');
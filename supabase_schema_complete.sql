@@ -27,7 +27,7 @@ CREATE TABLE IF NOT EXISTS accounts.list (
 );
 
 -- ============================================
--- Balances Schema (Snapshot - Legacy)
+-- Balances Schema (Snapshot - end-of-day rollups maintained from the ledger)
 -- ============================================
 CREATE TABLE IF NOT EXISTS balances.snapshot (
     snapshot_id SERIAL PRIMARY KEY,
@@ -43,6 +43,16 @@ CREATE TABLE IF NOT EXISTS balances.snapshot (
     UNIQUE(balance_date, account_id)
 );
 
+-- ============================================
+-- Balances Schema (Current - maintained on every ledger write)
+-- ============================================
+CREATE TABLE IF NOT EXISTS balances.current (
+    account_id INTEGER PRIMARY KEY REFERENCES accounts.list(account_id) ON DELETE CASCADE,
+    amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    balance_date DATE,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ============================================
 -- Transactions Schema (New Transaction Ledger)
 -- ============================================
@@ -141,6 +151,7 @@ CREATE INDEX IF NOT EXISTS idx_accounts_name ON accounts.list(account_name);
 CREATE INDEX IF NOT EXISTS idx_balances_account_date ON balances.snapshot(account_id, balance_date);
 CREATE INDEX IF NOT EXISTS idx_balances_date ON balances.snapshot(balance_date);
 CREATE INDEX IF NOT EXISTS idx_transactions_account_id ON transactions.ledger(account_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions.ledger(account_id, transaction_date);
 CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions.ledger(transaction_date);
 CREATE INDEX IF NOT EXISTS idx_transactions_transfer_link ON transactions.ledger(transfer_link_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions.ledger(category);
@@ -156,6 +167,7 @@ CREATE INDEX IF NOT EXISTS idx_goals_type ON goals.list(goal_type);
 -- ============================================
 -- Add Comments
 -- ============================================
+COMMENT ON TABLE balances.current IS 'Current balance per account, maintained on every ledger write';
 COMMENT ON TABLE transactions.ledger IS 'Transaction ledger system - replaces snapshot-based balances';
 COMMENT ON COLUMN transactions.ledger.transfer_link_id IS 'Links two transactions for transfers between accounts. Both transactions share the same transfer_link_id.';
 COMMENT ON COLUMN transactions.ledger.category IS 'Transaction category (e.g., "Initial Balance", "Transfer", "Market Gain", "Expense", etc.)';